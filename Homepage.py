@@ -85,7 +85,7 @@ This project demonstrates the power of natural language processing techniques. T
 **Limitations:**
 
 The project has a limited list of news source which are openly available. The list doesn't not include a lot of news outlets that are behind a paywall or require a subscription. The sentiment analysis is based on a pre-trained model, which may not capture the nuances of specific news articles or the context in which they are written. The project does not account for potential biases in the news sources, which could affect the overall sentiment analysis.
-Due to the nature of the project as a showcase of the approach the data is kept for the last 30 days and the articles are update manually in the last sub-page entitled "Update News". This can lead to the dataset being out of date, but further development and fine tuning is out of the scope of this project.     
+Due to the nature of the project as a showcase of the approach articles older than 30 days are moved to a Parquet archive kept for two years, and the articles are update manually in the last sub-page entitled "Update News". This can lead to the dataset being out of date, but further development and fine tuning is out of the scope of this project.     
             
             """
     )
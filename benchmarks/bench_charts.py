@@ -0,0 +1,176 @@
+"""
+Measure the server CPU time and payload of a page view with the charts
+drawn in the browser from Vega-Lite specs against rendered on the server
+with matplotlib.
+
+Every page view runs the page script through Streamlit's AppTest in a fresh
+process, in a scratch directory with the bundled data and a synthetic news
+archive (the one benchmarks.bench_views builds). The first view fills the
+data caches and the figure cache; the repeat views are what every later
+viewer costs. The payload is the size of the chart elements sent to the
+browser: specs and their Arrow data, or the images.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_charts --articles 1000000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_views import build, KEYWORD
+
+
+# (page, view) pairs measured
+VIEWS = [
+    ("pages/1_African_Crises_EDA.py", "Correlation Heatmap"),
+    ("pages/1_African_Crises_EDA.py", "Inflation Graphs"),
+    ("pages/1_African_Crises_EDA.py", "Adjusted Inflation Graphs"),
+    ("pages/2_Employee_Attrition_Prediction.py", "Data Overview"),
+    ("pages/3_Sentiment-Analyzed_News_by_Topic.py", "News Sources Overview"),
+    ("pages/3_Sentiment-Analyzed_News_by_Topic.py", "Filter by Topic"),
+]
+CHART_ELEMENTS = ("vega_lite_chart", "arrow_vega_lite_chart", "image")
+
+
+def workdir(directory, database):
+    """
+    A scratch copy of the app's layout in `directory`: the bundled data and
+    `database` as the news archive, linked, and an empty figure cache.
+    """
+    root = os.getcwd()
+    os.symlink(os.path.join(root, "data"), os.path.join(directory, "data"))
+    os.makedirs(os.path.join(directory, "news"))
+    os.symlink(database, os.path.join(directory, "news", "news.db"))
+
+
+def payload(at, images):
+    # Chart elements of the page as sent to the browser; images are sent as
+    # media files the elements only link to
+    size = sum(images)
+
+    def walk(node):
+        nonlocal size
+        if getattr(node, "type", None) in CHART_ELEMENTS:
+            size += node.proto.ByteSize()
+        children = getattr(node, "children", None)
+        for child in children.values() if isinstance(children, dict) else []:
+            walk(child)
+
+    walk(at._tree)
+    return size
+
+
+def view(at, name, keyword):
+    at.sidebar.selectbox[0].select(name)
+    if name == "Filter by Topic":
+        at.run()
+        at.text_input[0].input(keyword)
+        next(s for s in at.selectbox if s.label == "Search in").select("content")
+        at.button[0].click()
+
+
+def measure(page, name, backend, repeat, keyword):
+    """
+    View `name` of `page` `repeat` + 1 times in this process and print the
+    CPU time of the first view, the median CPU time of the others and the
+    payload.
+    """
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.testing.v1 import AppTest
+
+    import eda.charts
+
+    eda.charts.BACKEND = backend
+    images = []
+    load = MemoryMediaFileStorage.load_and_get_id
+
+    def counted(self, path_or_data, *args, **kwargs):
+        if isinstance(path_or_data, bytes):
+            images.append(len(path_or_data))
+        return load(self, path_or_data, *args, **kwargs)
+
+    MemoryMediaFileStorage.load_and_get_id = counted
+
+    at = AppTest.from_file(page, default_timeout=600)
+    at.run()
+    times = []
+    for _ in range(repeat + 1):
+        view(at, name, keyword)
+        images.clear()
+        start = time.process_time()
+        at.run()
+        times.append(time.process_time() - start)
+        assert not at.exception, at.exception
+    print(
+        json.dumps(
+            {
+                "first_ms": times[0] * 1000,
+                "repeat_ms": statistics.median(times[1:]) * 1000,
+                "payload_kb": payload(at, images) / 1024,
+            }
+        )
+    )
+
+
+def spawn(page, name, backend, repeat, keyword, directory):
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_charts", "--repeat", str(repeat)]
+        + ["--keyword", keyword, "--measure", os.path.abspath(page), name, backend],
+        cwd=directory,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--articles", type=int, default=1000000)
+    parser.add_argument("--words", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--keyword", default=KEYWORD, help="searched for in Filter by Topic"
+    )
+    parser.add_argument(
+        "--database",
+        help="archive to use, built if it does not exist "
+        "(default: the one benchmarks.bench_views caches in the temp directory)",
+    )
+    parser.add_argument("--measure", nargs=3, metavar=("PAGE", "VIEW", "BACKEND"))
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(*args.measure, args.repeat, args.keyword)
+        sys.exit()
+
+    database = os.path.abspath(
+        args.database
+        or os.path.join(tempfile.gettempdir(), f"news_bench_views_{args.articles}.db")
+    )
+    if not os.path.exists(database):
+        start = time.perf_counter()
+        build(database, args.articles, args.words)
+        print(f"built {args.articles} articles in {time.perf_counter() - start:.0f}s")
+
+    print(
+        f"{'view':<26} {'backend':<10} {'first ms':>9} {'repeat ms':>10} "
+        f"{'payload KB':>11}"
+    )
+    for page, name in VIEWS:
+        for backend in ("matplotlib", "vega-lite"):
+            with tempfile.TemporaryDirectory() as tmp:
+                workdir(tmp, database)
+                r = spawn(page, name, backend, args.repeat, args.keyword, tmp)
+            print(
+                f"{name:<26} {backend:<10} {r['first_ms']:9.0f} "
+                f"{r['repeat_ms']:10.0f} {r['payload_kb']:11.1f}"
+            )
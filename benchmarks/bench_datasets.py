@@ -0,0 +1,93 @@
+"""
+Measure the cold-start load of the bundled datasets from their CSV files
+against their memory-mapped Feather snapshots.
+
+Each load runs in a fresh process, as a new app server process would, and
+reports its time and the RSS it added on top of the imports. --scale
+repeats the rows of each dataset to see how both grow with the data.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_datasets --scale 1,100
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_views import peak_rss_mb
+
+
+def make_copies(directory, scale):
+    """
+    The bundled datasets with their rows repeated `scale` times, and their
+    snapshots, in `directory`. Returns {name: path}.
+    """
+    import pandas as pd
+    from eda.datasets import DATASETS, write_snapshot
+
+    paths = {}
+    for source, parse in DATASETS.items():
+        path = os.path.join(directory, os.path.basename(source))
+        rows = pd.read_csv(source)
+        pd.concat([rows] * scale).to_csv(path, index=False)
+        write_snapshot(parse(path), path)
+        paths[parse.__name__.removeprefix("parse_")] = path
+    return paths
+
+
+def measure(name, variant, path):
+    """
+    Load one dataset in this process and print the load time and the peak
+    RSS it added on top of the imports.
+    """
+    import pandas  # noqa: F401
+    from eda import datasets
+
+    parse = getattr(datasets, f"parse_{name}")
+    base = peak_rss_mb()
+    start = time.perf_counter()
+    if variant == "csv":
+        df = parse(path)
+    else:
+        df = datasets.read_dataset(path, parse)
+    elapsed = time.perf_counter() - start
+    peak = peak_rss_mb()
+    assert len(df)
+    print(json.dumps({"ms": elapsed * 1000, "added_mb": peak - base}))
+
+
+def spawn(name, variant, path):
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_datasets"]
+        + ["--measure", name, variant, path],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", default="1,100")
+    parser.add_argument("--measure", nargs=3, metavar=("NAME", "VARIANT", "PATH"))
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(*args.measure)
+        sys.exit()
+
+    print(f"{'dataset':<10} {'scale':>6} {'variant':<9} {'ms':>8} {'added MB':>9}")
+    for scale in map(int, args.scale.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, path in make_copies(tmp, scale).items():
+                for variant in ("csv", "snapshot"):
+                    r = spawn(name, variant, path)
+                    print(
+                        f"{name:<10} {scale:>6} {variant:<9} {r['ms']:8.1f} "
+                        f"{r['added_mb']:9.1f}"
+                    )
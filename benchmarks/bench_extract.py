@@ -0,0 +1,173 @@
+"""
+Measure parse CPU time and peak memory per article of newspaper's full
+parse() against the text-only extractor, on a corpus of saved HTML pages.
+
+Pass --corpus a directory of .html files saved from news sites (e.g. with
+`curl -o`) to measure real pages. Without one, synthetic pages are written
+to a temp directory: an article of --words words inside the kind of page
+news sites serve, with inline scripts and JSON state, navigation, figures,
+related-article lists and meta tags.
+
+Each variant runs in a fresh process so its peak RSS is not shared with
+the other; lxml's tree lives outside Python's allocator, so tracemalloc
+would not see it.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_extract --pages 300
+    python -m benchmarks.bench_extract --corpus ~/saved_pages
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_views import peak_rss_mb
+from benchmarks.synthetic import make_text
+
+
+def make_page(rng, i, words):
+    paragraphs = "".join(
+        f"<p>{make_text(rng, words // 10)}</p>"
+        + (
+            f"<figure><img src='/img/{i}_{j}.jpg'>"
+            f"<figcaption>{make_text(rng, 12)}</figcaption></figure>"
+            if j % 4 == 3
+            else ""
+        )
+        for j in range(10)
+    )
+    state = json.dumps(
+        {"items": [{"id": k, "headline": make_text(rng, 12)} for k in range(400)]}
+    )
+    menu = "".join(f"<li><a href='/section/{k}'>Section {k}</a></li>" for k in range(60))
+    related = "".join(
+        f"<li><a href='/article/{k}'>{make_text(rng, 10)}</a></li>" for k in range(30)
+    )
+    meta = "".join(
+        f"<meta property='og:tag{k}' content='{make_text(rng, 6)}'>" for k in range(40)
+    )
+    return (
+        f"<!DOCTYPE html><html><head><title>Article {i}</title>{meta}"
+        f"<script>window.__STATE__ = {state};</script>"
+        f"<style>{'.c{color:#333;margin:0 auto}' * 500}</style></head><body>"
+        f"<header><nav><ul>{menu}</ul></nav></header>"
+        f"<main><article><h1>Article {i}</h1><p class='byline'>By Staff</p>"
+        f"{paragraphs}</article>"
+        f"<aside><h2>Related</h2><ul>{related}</ul></aside></main>"
+        f"<footer><ul>{menu}</ul></footer>"
+        f"<script src='/app.js'></script></body></html>"
+    )
+
+
+def make_corpus(directory, pages, words, seed=0):
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    for i in range(pages):
+        with open(os.path.join(directory, f"{i}.html"), "w", encoding="utf-8") as f:
+            f.write(make_page(rng, i, words))
+
+
+def read_corpus(directory):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.htm*"))):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            pages.append(f.read())
+    return pages
+
+
+def parser(variant):
+    import newspaper
+    from news.fetcher import make_config, parse_article
+
+    config = make_config()
+
+    def parse(html):
+        article = newspaper.Article("http://localhost/article", config=config)
+        article.download(input_html=html)
+        return parse_article(article, text_only=variant == "text-only")
+
+    return parse
+
+
+def measure(variant, corpus):
+    """
+    Parse the corpus in this process and print the CPU time per article and
+    the peak RSS parsing added on top of the imports and the corpus.
+    """
+    pages = read_corpus(corpus)
+    parse = parser(variant)
+    parse(pages[0])  # load newspaper's stopword lists and lxml
+    base = peak_rss_mb()
+    start = time.process_time()
+    for html in pages:
+        parse(html)
+    cpu = time.process_time() - start
+    peak = peak_rss_mb()
+    print(json.dumps({"cpu_ms": cpu / len(pages) * 1000, "added_mb": peak - base}))
+
+
+def spawn(variant, corpus):
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_extract", "--corpus", corpus]
+        + ["--measure", variant],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def overlap(pages):
+    # Share of the words newspaper extracts that the text-only parse also
+    # extracts, so a faster parse is not faster by dropping the article
+    full = parser("newspaper")
+    light = parser("text-only")
+    shares = []
+    for html in pages:
+        expected = re.findall(r"\w+", full(html).lower())
+        if expected:
+            got = set(re.findall(r"\w+", light(html).lower()))
+            shares.append(sum(w in got for w in expected) / len(expected))
+    return sum(shares) / len(shares) if shares else float("nan")
+
+
+if __name__ == "__main__":
+    parser_ = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser_.add_argument("--corpus", help="directory of saved .html pages")
+    parser_.add_argument("--pages", type=int, default=300)
+    parser_.add_argument("--words", type=int, default=800)
+    parser_.add_argument("--measure", metavar="VARIANT")
+    args = parser_.parse_args()
+
+    if args.measure:
+        measure(args.measure, args.corpus)
+        sys.exit()
+
+    from news.extract import extract_text
+    from news.fetcher import MIN_TEXT_WORDS
+
+    corpus = args.corpus
+    if corpus is None:
+        corpus = os.path.join(
+            tempfile.gettempdir(), f"news_bench_extract_{args.pages}_{args.words}"
+        )
+        if not os.path.isdir(corpus):
+            make_corpus(corpus, args.pages, args.words)
+    pages = read_corpus(corpus)
+    size = sum(len(html.encode()) for html in pages) / len(pages) / 1024
+    print(f"{len(pages)} pages, {size:.0f} KB on average")
+
+    print(f"{'variant':<10} {'CPU ms/article':>15} {'peak MB':>8}")
+    for variant in ("newspaper", "text-only"):
+        r = spawn(variant, corpus)
+        print(f"{variant:<10} {r['cpu_ms']:15.1f} {r['added_mb']:8.1f}")
+    print(f"text-only keeps {overlap(pages[:50]):.0%} of newspaper's words")
+    fallbacks = sum(len(extract_text(html).split()) < MIN_TEXT_WORDS for html in pages)
+    print(f"text-only falls back to newspaper on {fallbacks} of {len(pages)} pages")
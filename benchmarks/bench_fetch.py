@@ -0,0 +1,141 @@
+"""
+Compare article downloads with a new connection per URL (newspaper's own
+download) against the pooled HTTP client, and a second pass served from the
+response cache, against a local HTTP server.
+
+The server sleeps for --handshake-ms on every new connection to stand in
+for the TCP and TLS handshake of a real news site, and counts connections
+and requests.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_fetch --articles 500 --hosts 5
+"""
+import argparse
+import gzip
+import random
+import tempfile
+import threading
+import time
+import newspaper
+
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.synthetic import make_text
+from news.fetcher import fetch_articles, make_config
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    pages = {}
+    handshake = 0.0
+    counts = {"connections": 0, "requests": 0, "bytes": 0}
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with self.lock:
+            self.counts["connections"] += 1
+        time.sleep(self.handshake)
+
+    def do_GET(self):
+        body = self.pages[self.path.split("?")[0]]
+        headers = {"Content-Type": "text/html; charset=utf-8"}
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        with self.lock:
+            self.counts["requests"] += 1
+            self.counts["bytes"] += len(body)
+        self.send_response(200)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_pages(n, words, seed=0):
+    rng = random.Random(seed)
+    pages = {}
+    for i in range(n):
+        paragraphs = "".join(
+            f"<p>{make_text(rng, words // 8)}</p>" for _ in range(8)
+        )
+        pages[f"/article/{i}"] = (
+            f"<html><head><title>Article {i}</title></head><body>"
+            f"<nav><a href='/'>Home</a></nav><article><h1>Article {i}</h1>"
+            f"{paragraphs}</article><footer>Footer</footer></body></html>"
+        ).encode()
+    return pages
+
+
+def per_url(links, workers, timeout):
+    # The download news_backend used before the pooled client
+    config = make_config(timeout)
+
+    def download(link):
+        article = newspaper.Article(link, config=config)
+        article.download()
+        article.parse()
+        return article.text
+
+    with ThreadPoolExecutor(workers) as pool:
+        return list(pool.map(download, links))
+
+
+def pooled(links, workers, timeout, cache_dir):
+    results = list(fetch_articles(links, workers, 0, timeout, cache_dir))
+    errors = [error for _, _, error in results if error is not None]
+    assert not errors, errors[0]
+    return results
+
+
+def run(name, fetch):
+    for key in Handler.counts:
+        Handler.counts[key] = 0
+    start = time.perf_counter()
+    fetch()
+    elapsed = time.perf_counter() - start
+    c = Handler.counts
+    print(
+        f"{name:<12} {elapsed:8.2f}s {c['connections']:>12} {c['requests']:>9} "
+        f"{c['bytes'] / 1e6:9.1f}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--articles", type=int, default=500)
+    parser.add_argument("--hosts", type=int, default=5)
+    parser.add_argument("--words", type=int, default=800)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--handshake-ms", type=float, default=30)
+    args = parser.parse_args()
+
+    Handler.pages = make_pages(args.articles, args.words)
+    Handler.handshake = args.handshake_ms / 1000
+    servers = [
+        ThreadingHTTPServer(("127.0.0.1", 0), Handler) for _ in range(args.hosts)
+    ]
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    links = [
+        f"http://127.0.0.1:{servers[i % args.hosts].server_port}{path}"
+        for i, path in enumerate(Handler.pages)
+    ]
+
+    print(
+        f"{'variant':<12} {'time':>9} {'connections':>12} {'requests':>9} "
+        f"{'MB sent':>9}"
+    )
+    run("per-url", lambda: per_url(links, args.workers, 10))
+    with tempfile.TemporaryDirectory() as cache_dir:
+        run("pooled", lambda: pooled(links, args.workers, 10, cache_dir))
+        run("cached", lambda: pooled(links, args.workers, 10, cache_dir))
+    for server in servers:
+        server.shutdown()
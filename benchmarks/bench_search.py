@@ -0,0 +1,108 @@
+"""
+Compare "Filter by Topic" search latency of the old LIKE scan with the BM25
+search index as the archive grows.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_search --sizes 10000,100000,1000000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from news.database import connect
+from news.search import rebuild_index, compact_index, search
+
+
+VOCABULARY = 50000
+# Rare, mid-frequency and common words of the Zipf-like vocabulary
+QUERIES = ["w45123", "w2500 w31000", "w30 w777", "w3"]
+
+
+def fill(conn, n, words):
+    """
+    n articles of `words` words each; low word numbers are far more common.
+    """
+    conn.execute(
+        """
+        CREATE OR REPLACE TEMP TABLE generated AS
+        SELECT
+            'Title ' || i AS title,
+            'https://example.com/article/' || i AS link,
+            TIMESTAMP '2025-01-01' + INTERVAL (i) MINUTE AS published,
+            'Source ' || (i % 20) AS source,
+            array_to_string(
+                list_transform(
+                    range(?), x -> 'w' || floor(? * pow(random(), 4))::INTEGER
+                ),
+                ' '
+            ) AS content,
+            random() * 2 - 1 AS sentiment,
+            random() AS subjectivity,
+        FROM range(?) t(i)
+        """,
+        (words, VOCABULARY, n),
+    )
+    conn.execute("ALTER TABLE generated ADD COLUMN hash VARCHAR")
+    conn.execute("UPDATE generated SET hash = content_hash(content)")
+    conn.execute(
+        """
+        INSERT INTO article_bodies
+        SELECT DISTINCT ON (hash) hash, compress_body(content), sentiment, subjectivity
+        FROM generated
+        """
+    )
+    conn.execute(
+        """
+        INSERT INTO articles
+        SELECT title, link, published, source, hash, sentiment, subjectivity
+        FROM generated
+        """
+    )
+    conn.execute("DROP TABLE generated")
+
+
+def like(conn, keyword):
+    # The query the page used before the search index, on the bodies table
+    return conn.execute(
+        f"""
+        SELECT * FROM articles a
+        JOIN article_bodies b ON b.hash = a.content_hash
+        WHERE LOWER(body_text(b.content)) LIKE LOWER('%{keyword}%')
+        """
+    ).fetchdf()
+
+
+def latency(query, conn, keyword, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        query(conn, keyword)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--words", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'articles':>9} {'query':<14} {'LIKE ms':>9} {'index ms':>9} {'hits':>8}")
+    for n in map(int, args.sizes.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = connect(os.path.join(tmp, "bench.db"))
+            fill(conn, n, args.words)
+            start = time.perf_counter()
+            rebuild_index(conn)
+            compact_index(conn)
+            print(f"{n:>9} indexed in {time.perf_counter() - start:.1f}s")
+            for keyword in QUERIES:
+                scan = latency(like, conn, keyword.split()[0], args.repeat)
+                indexed = latency(search, conn, keyword, args.repeat)
+                hits = len(search(conn, keyword))
+                print(f"{n:>9} {keyword:<14} {scan:9.1f} {indexed:9.1f} {hits:>8}")
+            conn.close()
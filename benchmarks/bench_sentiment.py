@@ -0,0 +1,82 @@
+"""
+Measure sentiment scoring throughput in articles/sec per core and check that
+SentimentEngine scores match news_backend.get_sentiment_from_text within the
+scorer's tolerance.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_sentiment --articles 2000 --processes 4
+    python -m benchmarks.bench_sentiment --scorer textblob
+    python -m benchmarks.bench_sentiment --prose
+
+The synthetic texts hold words and sentence ends only. --prose scores
+English prose with all its punctuation instead (the docstrings
+benchmarks.bench_storage cuts into bodies), which is where TextBlob's
+tokenizer and its emoticons come into play.
+"""
+import argparse
+import os
+import time
+import numpy as np
+
+from benchmarks.bench_storage import docstrings, make_bodies
+from benchmarks.synthetic import make_texts
+from news.news_backend import get_sentiment_from_text
+from news.lexicon import LexiconScorer
+from news.sentiment import SentimentEngine, SCORERS, get_scorer
+
+
+def reference(texts):
+    scores = [get_sentiment_from_text(text) for text in texts]
+    return np.array([p for p, _ in scores]), np.array([s for _, s in scores])
+
+
+def timed(score, texts):
+    start = time.perf_counter()
+    result = score(texts)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--articles", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=400)
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--scorer", choices=sorted(SCORERS), default=LexiconScorer.name)
+    parser.add_argument(
+        "--prose", action="store_true", help="score prose instead of synthetic texts"
+    )
+    args = parser.parse_args()
+
+    if args.prose:
+        # About 6 characters per word
+        length = args.words * 6
+        texts = make_bodies(docstrings(args.articles * length), args.articles, length)
+    else:
+        texts = make_texts(args.articles, args.words)
+    (ref_polarity, ref_subjectivity), elapsed = timed(reference, texts)
+    baseline = len(texts) / elapsed
+    print(f"{'baseline':<22} {baseline:9.1f} articles/sec  (1 core)")
+
+    with SentimentEngine(args.scorer, processes=1) as engine:
+        engine.score(texts[:1])  # start the worker
+        _, elapsed = timed(engine.score, texts)
+        single = len(texts) / elapsed
+    print(f"{args.scorer + ' x1':<22} {single:9.1f} articles/sec  (1 core)")
+
+    with SentimentEngine(args.scorer, processes=args.processes) as engine:
+        engine.score(texts[: args.processes])
+        (polarity, subjectivity), elapsed = timed(engine.score, texts)
+    rate = len(texts) / elapsed
+    print(
+        f"{args.scorer + ' x' + str(args.processes):<22} {rate:9.1f} articles/sec"
+        f"  ({rate / args.processes:.1f} per core)"
+    )
+
+    diff = max(
+        np.abs(polarity - ref_polarity).max(),
+        np.abs(subjectivity - ref_subjectivity).max(),
+    )
+    tolerance = get_scorer(args.scorer).tolerance
+    print(f"max abs difference from TextBlob: {diff:.2e} (tolerance {tolerance:.0e})")
+    assert diff <= tolerance + 1e-12, "scores do not match get_sentiment_from_text"
@@ -0,0 +1,147 @@
+"""
+Measure the database size of article bodies stored zlib-compressed, as
+article_bodies keeps them, against plain text in DuckDB's default storage
+version and in a newer one, for several body lengths.
+
+The bodies are English prose rather than benchmarks.synthetic's texts,
+whose vocabulary of a few dozen words compresses far better than articles
+do: consecutive, non-overlapping cuts of the docstrings of the Python
+standard library and installed packages, or of a text file given with
+--text (e.g. a dump of real article bodies). Every run fills a fresh
+article_bodies table, checkpoints it and reports the file size and the
+compression DuckDB chose for the content column.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_storage --bodies 5000 --lengths 500,2000,6000
+
+The default storage version leaves strings of more than a few KB
+uncompressed. Versions from v1.2.0 on compress them with ZSTD, but only
+from about 5 KB, and files in them cannot be opened by older DuckDB
+releases. With DuckDB 1.5.6 on 5000 docstring bodies (MB):
+
+    length    500   2000   3000   4000   5000   6000
+    raw      2.50  10.04  15.04  20.04  25.04  30.08
+    default  2.11   6.83  16.00  40.38  42.74  47.72
+    v1.2.0   2.11   6.83  16.00  40.38  10.24  11.55
+    zlib     2.11   4.99   6.57   8.40   9.97  11.28
+"""
+import argparse
+import ast
+import os
+import sysconfig
+import tempfile
+import duckdb
+
+from news.bodies import compress_body, create_body_table
+
+
+NEWER_VERSION = "v1.2.0"
+
+
+def docstrings(chars):
+    """
+    About `chars` characters of docstrings of at least a few sentences,
+    whitespace collapsed, or all there are if fewer.
+    """
+    parts = []
+    total = 0
+    paths = sysconfig.get_paths()
+    for root in dict.fromkeys([paths["stdlib"], paths["purelib"]]):
+        for directory, subdirectories, files in os.walk(root):
+            subdirectories[:] = sorted(d for d in subdirectories if "test" not in d)
+            for name in sorted(f for f in files if f.endswith(".py")):
+                try:
+                    with open(os.path.join(directory, name), encoding="utf-8") as f:
+                        tree = ast.parse(f.read())
+                except (SyntaxError, UnicodeDecodeError, ValueError):
+                    continue
+                for node in ast.walk(tree):
+                    if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef)):
+                        doc = ast.get_docstring(node)
+                        if doc and len(doc) > 200:
+                            parts.append(" ".join(doc.split()))
+                            total += len(parts[-1]) + 1
+                if total >= chars:
+                    return " ".join(parts)
+    return " ".join(parts)
+
+
+def make_bodies(text, n, length):
+    # Consecutive cuts, so no two bodies share any text
+    return [text[i : i + length] for i in range(0, length * n, length)][
+        : len(text) // length
+    ]
+
+
+def measure(bodies, version=None, compressed=False):
+    """
+    Size in MB of a database holding `bodies`, created in storage `version`
+    (DuckDB's default if None), and the compression of the content column.
+    The bodies are stored as text unless `compressed`, when they go through
+    compress_body() into article_bodies.
+    """
+    config = {} if version is None else {"storage_compatibility_version": version}
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, "bench.db")
+        conn = duckdb.connect(database, config=config)
+        if compressed:
+            create_body_table(conn)
+            bodies = map(compress_body, bodies)
+        else:
+            conn.execute(
+                "CREATE TABLE article_bodies (hash VARCHAR PRIMARY KEY, content VARCHAR)"
+            )
+        conn.executemany(
+            "INSERT INTO article_bodies (hash, content) VALUES (?, ?)",
+            [(str(i), body) for i, body in enumerate(bodies)],
+        )
+        conn.execute("CHECKPOINT")
+        compression = conn.execute(
+            """
+            SELECT string_agg(DISTINCT compression, ',' ORDER BY compression)
+            FROM pragma_storage_info('article_bodies')
+            WHERE column_name = 'content' AND segment_type IN ('VARCHAR', 'BLOB')
+            """
+        ).fetchone()[0]
+        conn.close()
+        size = os.path.getsize(database) / 1e6
+    return size, compression
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bodies", type=int, default=1000)
+    parser.add_argument(
+        "--lengths", default="500,2000,6000", help="body lengths in characters"
+    )
+    parser.add_argument("--text", help="file of prose to cut the bodies from")
+    parser.add_argument(
+        "--version",
+        default=NEWER_VERSION,
+        help="storage version to compare with the default",
+    )
+    args = parser.parse_args()
+
+    lengths = [int(n) for n in args.lengths.split(",")]
+    if args.text:
+        with open(args.text, encoding="utf-8") as f:
+            text = " ".join(f.read().split())
+    else:
+        text = docstrings(args.bodies * max(lengths))
+    print(f"duckdb {duckdb.__version__}, {len(text) / 1e6:.1f} MB of prose")
+    print(
+        f"{'length':>7} {'bodies':>7} {'version':<9} {'MB':>7} {'raw MB':>7}  "
+        "compression"
+    )
+    for length in lengths:
+        bodies = make_bodies(text, args.bodies, length)
+        raw = sum(len(body.encode()) for body in bodies) / 1e6
+        variants = [(None, False), (args.version, False), (None, True)]
+        for version, compressed in variants:
+            size, compression = measure(bodies, version, compressed)
+            name = "zlib" if compressed else version or "default"
+            print(
+                f"{length:>7} {len(bodies):>7} {name:<9} "
+                f"{size:7.2f} {raw:7.2f}  {compression}"
+            )
@@ -0,0 +1,304 @@
+"""
+Synthetic-load benchmark suite for the news subsystem, writing its results
+to a JSON file so runs of different versions can be compared.
+
+It measures:
+
+- ingest: a full refresh (feed poll, fetch, parse, score, write) against a
+  local HTTP stand-in serving synthetic RSS feeds and article pages;
+- scoring: sentiment scoring throughput of the SentimentEngine;
+- for every archive size in --sizes: keyword search latency, the "News
+  Sources Overview" aggregations, the time to build the archive and its
+  size on disk.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_suite --sizes 10000,100000 --output before.json
+    python -m benchmarks.bench_suite --sizes 10000,100000 --baseline before.json
+
+Archives of up to 10M articles (--sizes 10000000) take a while and tens of
+GB of disk; lower --words to keep them smaller.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import duckdb
+
+from datetime import datetime, timedelta
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.bench_extract import make_page
+from benchmarks.bench_search import fill, QUERIES
+from benchmarks.synthetic import make_texts
+from news.database import connect
+from news.pipeline import run_refresh
+from news.rollup import rebuild_rollups
+from news.search import rebuild_index, compact_index, search
+from news.sentiment import SentimentEngine, DEFAULT_SCORER
+
+
+# The aggregations of the "News Sources Overview" view
+OVERVIEW_QUERIES = {
+    "by_source": """
+        SELECT
+            source,
+            ROUND(SUM(sentiment_sum) / SUM(articles), 2) as sentiment,
+            ROUND(SUM(subjectivity_sum) / SUM(articles), 2) as subjectivity
+        FROM daily_sentiment
+        GROUP BY source
+        ORDER BY sentiment DESC
+    """,
+    "by_day": """
+        SELECT day as date, ROUND(SUM(sentiment_sum) / SUM(articles), 2) as sentiment
+        FROM daily_sentiment
+        WHERE day IS NOT NULL
+        GROUP BY date
+        ORDER BY date
+    """,
+}
+# Metrics where a lower value is better, for the comparison with a baseline
+LOWER_IS_BETTER = ("_ms", "_seconds", "_mb")
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """
+    News sites stand-in: /feed/<source>.xml is an RSS feed of the source's
+    articles and /article/<source>/<i> one article page. Pages are made on
+    request from their path, so any number of articles can be served.
+    """
+
+    protocol_version = "HTTP/1.1"
+    articles = 100  # per feed
+    words = 400
+    now = datetime.now().astimezone()
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        if parts[0] == "feed":
+            body = self.feed(parts[1].removesuffix(".xml"))
+            content_type = "application/rss+xml; charset=utf-8"
+        elif parts[0] == "article" and len(parts) == 3:
+            rng = random.Random(self.path)
+            body = make_page(rng, parts[2], self.words)
+            content_type = "text/html; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        body = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def feed(self, source):
+        host = self.headers["Host"]
+        items = "".join(
+            f"<item><title>{source} story {i}</title>"
+            f"<link>http://{host}/article/{source}/{i}</link>"
+            f"<guid>http://{host}/article/{source}/{i}</guid>"
+            f"<pubDate>{format_datetime(self.now - timedelta(minutes=10 * i))}</pubDate>"
+            f"</item>"
+            for i in range(self.articles)
+        )
+        return (
+            f"<?xml version='1.0' encoding='utf-8'?><rss version='2.0'><channel>"
+            f"<title>{source}</title><link>http://{host}/</link>{items}"
+            f"</channel></rss>"
+        )
+
+    def log_message(self, *args):
+        pass
+
+
+def timed(run, repeat=1):
+    """
+    Median wall time of `repeat` calls of `run`, in milliseconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def bench_ingest(sources, articles, words, processes):
+    StandIn.articles = articles
+    StandIn.words = words
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    feeds = {
+        f"source{i}": f"http://127.0.0.1:{server.server_port}/feed/source{i}.xml"
+        for i in range(sources)
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        stats = run_refresh(
+            database=os.path.join(tmp, "ingest.db"),
+            feeds=feeds,
+            per_host_rate=0,
+            cache_dir=None,
+            scheduled=False,
+            processes=processes,
+        )
+        elapsed = time.perf_counter() - start
+    server.shutdown()
+    assert stats["written"] == sources * articles, stats
+    return {
+        "articles": stats["written"],
+        "failed": stats["failed"],
+        "seconds": elapsed,
+        "articles_per_second": stats["written"] / elapsed,
+    }
+
+
+def bench_scoring(articles, words, processes):
+    texts = make_texts(articles, words)
+    with SentimentEngine(DEFAULT_SCORER, processes) as engine:
+        engine.score(texts[:32])  # start the workers
+        start = time.perf_counter()
+        engine.score(texts)
+        elapsed = time.perf_counter() - start
+    return {
+        "scorer": DEFAULT_SCORER,
+        "articles": articles,
+        "articles_per_second": articles / elapsed,
+    }
+
+
+def bench_archive(n, words, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, "archive.db")
+        conn = connect(database)
+        start = time.perf_counter()
+        fill(conn, n, words)
+        rebuild_index(conn)
+        compact_index(conn)
+        rebuild_rollups(conn)
+        conn.execute("CHECKPOINT")
+        build = time.perf_counter() - start
+        result = {
+            "articles": n,
+            "build_seconds": build,
+            "db_size_mb": os.path.getsize(database) / 1e6,
+        }
+        for query in QUERIES:
+            key = "search_" + query.replace(" ", "_") + "_ms"
+            result[key] = timed(lambda: search(conn, query), repeat)
+        for name, query in OVERVIEW_QUERIES.items():
+            result[f"overview_{name}_ms"] = timed(
+                lambda: conn.execute(query).fetchdf(), repeat
+            )
+        conn.close()
+    return result
+
+
+def version():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results):
+    """
+    {"ingest.articles_per_second": ..., "archive.10000.search_w3_ms": ...}
+    """
+    flat = {}
+    for section, values in results.items():
+        rows = values if isinstance(values, list) else [values]
+        for row in rows:
+            prefix = section + (f".{row['articles']}" if section == "archive" else "")
+            for key, value in row.items():
+                if isinstance(value, (int, float)) and key != "articles":
+                    flat[f"{prefix}.{key}"] = value
+    return flat
+
+
+def compare(results, baseline):
+    """
+    Print every metric next to the baseline's, flagging changes of more than
+    10% for the worse.
+    """
+    now = flatten(results)
+    before = flatten(baseline["results"])
+    print(f"\ncompared with {baseline.get('version')} ({baseline.get('timestamp')})")
+    print(f"{'metric':<44} {'baseline':>12} {'now':>12} {'change':>8}")
+    for key, value in now.items():
+        if key not in before or not before[key]:
+            continue
+        change = value / before[key] - 1
+        worse = change > 0.1 if key.endswith(LOWER_IS_BETTER) else change < -0.1
+        print(
+            f"{key:<44} {before[key]:12.2f} {value:12.2f} {change:+8.0%}"
+            + ("  <- regression" if worse else "")
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--words", type=int, default=200)
+    parser.add_argument("--sources", type=int, default=20)
+    parser.add_argument("--feed-articles", type=int, default=50)
+    parser.add_argument("--score-articles", type=int, default=2000)
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="results file of an earlier run")
+    args = parser.parse_args()
+
+    results = {}
+    results["ingest"] = bench_ingest(
+        args.sources, args.feed_articles, args.words, args.processes
+    )
+    print(
+        f"ingest   {results['ingest']['articles']} articles "
+        f"{results['ingest']['articles_per_second']:8.1f} articles/s"
+    )
+    results["scoring"] = bench_scoring(args.score_articles, args.words, args.processes)
+    print(
+        f"scoring  {args.score_articles} articles "
+        f"{results['scoring']['articles_per_second']:8.1f} articles/s"
+    )
+    results["archive"] = []
+    for n in map(int, args.sizes.split(",")):
+        row = bench_archive(n, args.words, args.repeat)
+        results["archive"].append(row)
+        print(
+            f"archive  {n} articles, built in {row['build_seconds']:.1f}s, "
+            f"{row['db_size_mb']:.0f} MB"
+        )
+        for key, value in row.items():
+            if key.endswith("_ms"):
+                print(f"         {key:<28} {value:9.1f}")
+
+    report = {
+        "version": version(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "duckdb": duckdb.__version__,
+        "cpus": os.cpu_count(),
+        "args": vars(args),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
@@ -0,0 +1,275 @@
+"""
+Measure peak memory and render time of the news page views before and after
+moving date truncation and rounding into SQL, on a synthetic archive.
+
+Each view runs in a fresh process so its peak RSS is not shared with the
+others. Charts are rendered to PNG the way st.pyplot does.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_views --articles 1000000
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+KEYWORD = "w2500"
+
+
+def build(database, articles, words):
+    from benchmarks.bench_search import fill
+    from news.database import connect
+    from news.rollup import rebuild_rollups
+    from news.search import rebuild_index, compact_index
+
+    conn = connect(database)
+    fill(conn, articles, words)
+    rebuild_index(conn)
+    compact_index(conn)
+    rebuild_rollups(conn)
+    conn.close()
+
+
+def render(fig):
+    import matplotlib.pyplot as plt
+
+    fig.savefig(io.BytesIO(), format="png")
+    plt.close(fig)
+
+
+def overview_before(database):
+    # The "News Sources Overview" view before the rollup and SQL rounding
+    import duckdb
+    import matplotlib.pyplot as plt
+    import pandas as pd
+    import seaborn as sns
+
+    conn = duckdb.connect(database=database, read_only=False)
+    query = """
+    SELECT source, AVG(sentiment) as sentiment, AVG(subjectivity) as subjectivity
+    FROM articles
+    GROUP BY source
+    ORDER BY sentiment DESC
+    """
+    df = conn.execute(query).fetchdf()
+    df["sentiment"] = df["sentiment"].round(2)
+    df["subjectivity"] = df["subjectivity"].round(2)
+    fig, ax = plt.subplots()
+    sns.barplot(x="sentiment", y="source", data=df, ax=ax)
+    render(fig)
+    fig, ax = plt.subplots()
+    sns.barplot(
+        x="subjectivity",
+        y="source",
+        data=df,
+        ax=ax,
+        order=df.sort_values("subjectivity")["source"],
+    )
+    render(fig)
+    query = """
+    SELECT published as date, AVG(sentiment) as sentiment
+    FROM articles
+    GROUP BY date
+    ORDER BY date
+    """
+    df = conn.execute(query).fetchdf()
+    df["date"] = pd.to_datetime(df["date"])
+    df["date"] = df["date"].dt.date
+    df["sentiment"] = df["sentiment"].round(2)
+    fig, ax = plt.subplots()
+    sns.lineplot(x="date", y="sentiment", data=df, ax=ax)
+    render(fig)
+    conn.close()
+
+
+def overview_after(database):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    from news.database import connect
+
+    conn = connect(database)
+    query = """
+    SELECT
+        source,
+        ROUND(SUM(sentiment_sum) / SUM(articles), 2) as sentiment,
+        ROUND(SUM(subjectivity_sum) / SUM(articles), 2) as subjectivity
+    FROM daily_sentiment
+    GROUP BY source
+    ORDER BY sentiment DESC
+    """
+    df = conn.execute(query).fetchdf()
+    fig, ax = plt.subplots()
+    sns.barplot(x="sentiment", y="source", data=df, ax=ax)
+    render(fig)
+    fig, ax = plt.subplots()
+    sns.barplot(
+        x="subjectivity",
+        y="source",
+        data=df,
+        ax=ax,
+        order=df.sort_values("subjectivity")["source"],
+    )
+    render(fig)
+    query = """
+    SELECT day as date, ROUND(SUM(sentiment_sum) / SUM(articles), 2) as sentiment
+    FROM daily_sentiment
+    WHERE day IS NOT NULL
+    GROUP BY date
+    ORDER BY date
+    """
+    df = conn.execute(query).fetchdf()
+    fig, ax = plt.subplots()
+    sns.lineplot(x="date", y="sentiment", data=df, ax=ax)
+    render(fig)
+    conn.close()
+
+
+def topic_plots(df, date):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig, ax = plt.subplots()
+    sns.barplot(x="sentiment", y="source", data=df, ax=ax)
+    render(fig)
+    fig, ax = plt.subplots()
+    sns.barplot(x="subjectivity", y="source", data=df, ax=ax)
+    render(fig)
+    fig, ax = plt.subplots()
+    sns.lineplot(x=date, y="sentiment", data=df, ax=ax)
+    render(fig)
+
+
+def topic_before(database):
+    # The "Filter by Topic" view before the search index and SQL dates
+    import duckdb
+    import pandas as pd
+
+    from news.bodies import register_body_functions
+
+    conn = duckdb.connect(database=database, read_only=False)
+    register_body_functions(conn)
+    query = f"""
+    SELECT * FROM articles a
+    JOIN article_bodies b ON b.hash = a.content_hash
+    WHERE LOWER(body_text(b.content)) LIKE LOWER('%{KEYWORD}%')
+    """
+    df = conn.execute(query).fetchdf()
+    # The column selection the page handed to st.dataframe
+    table = df[["title", "link", "published", "source", "sentiment", "subjectivity"]]
+    df["published"] = pd.to_datetime(df["published"])
+    df["published"] = df["published"].dt.date
+    topic_plots(df, "published")
+    conn.close()
+    return table
+
+
+def topic_after(database):
+    from news.database import connect
+    from news.search import search
+
+    conn = connect(database)
+    df = search(conn, KEYWORD, field="content")
+    topic_plots(df, "day")
+    conn.close()
+
+
+VIEWS = {
+    "overview": (overview_before, overview_after),
+    "topic": (topic_before, topic_after),
+}
+
+
+def peak_rss_mb():
+    # VmHWM starts over on exec, unlike ru_maxrss which a child inherits
+    # from the process that forked it
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(view, variant, database):
+    """
+    Run one view in this process and print its render time and the peak
+    RSS it added on top of the imports.
+    """
+    import duckdb  # noqa: F401
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot  # noqa: F401
+    import pandas  # noqa: F401
+    import seaborn  # noqa: F401
+
+    run = VIEWS[view][variant == "after"]
+    base = peak_rss_mb()
+    start = time.perf_counter()
+    run(database)
+    elapsed = time.perf_counter() - start
+    peak = peak_rss_mb()
+    print(json.dumps({"seconds": elapsed, "peak_mb": peak, "added_mb": peak - base}))
+
+
+def spawn(view, variant, database):
+    out = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.bench_views",
+            "--database",
+            database,
+            "--measure",
+            view,
+            variant,
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--articles", type=int, default=1000000)
+    parser.add_argument("--words", type=int, default=40)
+    parser.add_argument(
+        "--database",
+        help="archive to use, built if it does not exist "
+        "(default: a cached file in the temp directory)",
+    )
+    parser.add_argument("--measure", nargs=2, metavar=("VIEW", "VARIANT"))
+    args = parser.parse_args()
+
+    database = args.database or os.path.join(
+        tempfile.gettempdir(), f"news_bench_views_{args.articles}.db"
+    )
+    if args.measure:
+        measure(*args.measure, database)
+        sys.exit()
+
+    if not os.path.exists(database):
+        start = time.perf_counter()
+        build(database, args.articles, args.words)
+        print(f"built {args.articles} articles in {time.perf_counter() - start:.0f}s")
+
+    print(f"{'view':<10} {'variant':<8} {'seconds':>8} {'peak MB':>8} {'added MB':>9}")
+    for view in VIEWS:
+        for variant in ("before", "after"):
+            r = spawn(view, variant, database)
+            print(
+                f"{view:<10} {variant:<8} {r['seconds']:8.2f} "
+                f"{r['peak_mb']:8.0f} {r['added_mb']:9.0f}"
+            )
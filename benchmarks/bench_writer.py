@@ -0,0 +1,106 @@
+"""
+Compare article write throughput of the old per-row path (one connection and
+one commit per UPDATE) with the batched ArticleWriter.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_writer --rows 2000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import duckdb
+
+from datetime import datetime, timedelta
+
+from news.bodies import compress_body, content_hash
+from news.database import connect
+from news.writer import ArticleWriter
+
+
+def make_rows(n):
+    start = datetime(2025, 1, 1)
+    words = "the quick brown fox jumps over the lazy dog".split()
+    for i in range(n):
+        yield (
+            f"Title {i}",
+            f"https://example.com/article/{i}",
+            start + timedelta(minutes=i),
+            f"Source {i % 20}",
+            " ".join(random.choices(words, k=400)),
+            random.uniform(-1, 1),
+            random.uniform(0, 1),
+        )
+
+
+def per_row(database, rows):
+    """
+    The write pattern news_backend used before ArticleWriter.
+    """
+    for title, link, published, source, content, sentiment, subjectivity in rows:
+        conn = duckdb.connect(database=database, read_only=False)
+        conn.execute(
+            """
+            INSERT INTO articles (title, link, published, source)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT DO NOTHING
+            """,
+            (title, link, published, source),
+        )
+        conn.commit()
+    for title, link, published, source, content, sentiment, subjectivity in rows:
+        conn = duckdb.connect(database=database, read_only=False)
+        h = content_hash(content)
+        conn.execute(
+            "INSERT INTO article_bodies (hash, content) VALUES (?, ?) "
+            "ON CONFLICT DO NOTHING",
+            (h, compress_body(content)),
+        )
+        conn.execute("UPDATE articles SET content_hash = ? WHERE link = ?", (h, link))
+        conn.commit()
+        conn = duckdb.connect(database=database, read_only=False)
+        conn.execute(
+            "UPDATE articles SET sentiment = ?, subjectivity = ? WHERE link = ?",
+            (sentiment, subjectivity, link),
+        )
+        conn.commit()
+
+
+def batched(database, rows):
+    with ArticleWriter(database) as writer:
+        for title, link, published, source, content, sentiment, subjectivity in rows:
+            writer.add_article(title, link, published, source)
+        writer.flush()
+        for title, link, published, source, content, sentiment, subjectivity in rows:
+            writer.add_result(link, content, sentiment, subjectivity)
+
+
+def run(name, write, rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, "bench.db")
+        connect(database).close()
+        start = time.perf_counter()
+        write(database, rows)
+        elapsed = time.perf_counter() - start
+        conn = duckdb.connect(database)
+        scored = conn.execute(
+            "SELECT COUNT(*) FROM articles WHERE sentiment IS NOT NULL"
+        ).fetchone()[0]
+        conn.close()
+    assert scored == len(rows), f"{name}: {scored} of {len(rows)} rows written"
+    rate = len(rows) / elapsed
+    print(f"{name:<10} {len(rows):>8} rows {elapsed:8.2f}s {rate:10.0f} rows/sec")
+    return rate
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    rows = list(make_rows(args.rows))
+    before = run("per-row", per_row, rows)
+    after = run("batched", batched, rows)
+    print(f"speedup    {after / before:.1f}x")
@@ -0,0 +1,35 @@
+"""
+Synthetic data shared by the benchmarks.
+"""
+import random
+
+
+# A mix of neutral filler and words that carry polarity/subjectivity in the
+# TextBlob lexicon, plus the negation and intensifier words it treats specially.
+WORDS = (
+    "the a of to in and that for on with as by at from government report "
+    "minister market city people year week police election company economy "
+    "said says told announced new first last local national international "
+    "good bad great terrible happy sad strong weak important serious "
+    "excellent poor dangerous safe wonderful awful huge small best worst "
+    "not very really never"
+).split()
+
+
+def make_text(rng, words=400):
+    """
+    One article body of roughly `words` words, split into sentences.
+    """
+    sentences = []
+    remaining = words
+    while remaining > 0:
+        n = min(remaining, rng.randint(8, 25))
+        sentence = " ".join(rng.choices(WORDS, k=n))
+        sentences.append(sentence.capitalize() + rng.choice([".", ".", ".", "!"]))
+        remaining -= n
+    return " ".join(sentences)
+
+
+def make_texts(n, words=400, seed=0):
+    rng = random.Random(seed)
+    return [make_text(rng, words) for _ in range(n)]
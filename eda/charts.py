@@ -0,0 +1,224 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+import streamlit as st
+
+from eda.figures import cached_figure
+
+
+# How charts are shown: "vega-lite" sends the spec and its data to the
+# browser, which draws it; "matplotlib" renders an image on the server
+BACKEND = "vega-lite"
+BACKENDS = ("vega-lite", "matplotlib")
+MAX_POINTS = 500  # points of a line sent to the browser; longer ones are downsampled
+CONTENT_WIDTH = 700  # pixels a chart is laid out in, facets included
+
+
+class Chart:
+    """
+    A chart in both backends: a Vega-Lite spec with the data it is drawn
+    from, and the function that draws the same chart with matplotlib,
+    `draw(source, **style)`. `source` is the data the matplotlib drawing
+    takes, `data` itself unless given.
+    """
+
+    def __init__(self, spec, data, draw, source=None, **style):
+        self.spec = spec
+        self.data = data
+        self.draw = draw
+        self.source = data if source is None else source
+        self.style = style
+
+    def figure(self):
+        return self.draw(self.source, **self.style)
+
+
+def show(chart, name=None, version=None, backend=None):
+    """
+    Show `chart` with `backend` (BACKEND by default). With the matplotlib
+    backend a chart given a `name` is rendered once per name and data
+    `version` and served from the figure cache afterwards.
+    """
+    backend = backend or BACKEND
+    if backend == "vega-lite":
+        # Facets keep the width of their cells instead of stretching
+        stretch = "facet" not in chart.spec
+        st.vega_lite_chart(chart.data, chart.spec, use_container_width=stretch)
+    elif backend != "matplotlib":
+        raise ValueError(f"Unknown chart backend {backend!r}, use one of {BACKENDS}")
+    elif name is None:
+        st.pyplot(chart.figure())
+    else:
+        image = cached_figure(name, version, chart.draw, chart.source, **chart.style)
+        st.image(image, use_container_width=True)
+
+
+def downsample(data, x, y, max_points=MAX_POINTS):
+    """
+    At most about `max_points` rows of `data`, sorted by `x`, for a line of
+    `y` over `x`: the rows are cut into buckets of consecutive rows and the
+    lowest and highest `y` of each bucket are kept, so peaks and dips
+    survive.
+    """
+    if len(data) <= max_points:
+        return data
+    data = data.sort_values(x, kind="stable").reset_index(drop=True)
+    values = data[y].to_numpy(dtype="float64", na_value=np.nan)
+    size = -(-len(data) // (max_points // 2))
+    starts = np.arange(0, len(data), size)
+    padded = np.full(len(starts) * size, np.nan)
+    padded[: len(values)] = values
+    buckets = padded.reshape(len(starts), size)
+    # All-NaN buckets keep their first row
+    low = np.nan_to_num(buckets, nan=np.inf).argmin(axis=1)
+    high = np.nan_to_num(buckets, nan=-np.inf).argmax(axis=1)
+    rows = np.unique(np.concatenate([starts + low, starts + high]))
+    return data.iloc[rows[rows < len(data)]].reset_index(drop=True)
+
+
+def _draw_bar(
+    data,
+    x,
+    y,
+    hue=None,
+    order=None,
+    color=None,
+    title=None,
+    x_title=None,
+    y_title=None,
+    y_max=None,
+    label_angle=None,
+    label_size=None,
+):
+    fig, ax = plt.subplots()
+    sns.barplot(x=x, y=y, hue=hue, data=data, ax=ax, order=order, color=color)
+    if y_max is not None:
+        ax.set_ylim(0, y_max)
+    if title:
+        ax.set_title(title)
+    if x_title:
+        ax.set_xlabel(x_title)
+    if y_title:
+        ax.set_ylabel(y_title)
+    if label_angle:
+        ax.tick_params(axis="x", labelrotation=label_angle)
+    if label_size:
+        ax.tick_params(labelsize=label_size)
+    return fig
+
+
+def bar_chart(data, x, y, hue=None, order=None, color=None, title=None, **style):
+    """
+    Bar chart of `data` the way sns.barplot draws it: horizontal when `x`
+    is the numeric column, bars in the order of `data` (or of the
+    categories in `order`) and the mean of the rows sharing a category.
+    The means are taken here, so only one row per bar is sent to the
+    browser.
+
+    The remaining `style` is x_title, y_title, y_max (upper limit of the
+    value axis), label_angle (of the category labels, counterclockwise) and
+    label_size.
+    """
+    horizontal = pd.api.types.is_numeric_dtype(data[x]) and not (
+        pd.api.types.is_numeric_dtype(data[y])
+    )
+    category, value = (y, x) if horizontal else (x, y)
+    keys = [category] + ([hue] if hue else [])
+    bars = data[keys + [value]]
+    if bars.duplicated(keys).any():
+        bars = bars.groupby(keys, sort=False, observed=True)[value].mean().reset_index()
+    if pd.api.types.is_numeric_dtype(bars[category]):
+        # Categories, not positions on an axis
+        bars = bars.astype({category: str})
+    sort = None if order is None else [str(c) for c in order]
+    value_axis = {}
+    category_axis = {"labelAngle": -(style.get("label_angle") or 0)}
+    if style.get("label_size"):
+        value_axis["labelFontSize"] = style["label_size"]
+        category_axis["labelFontSize"] = style["label_size"]
+    value_scale = {"domain": [0, style["y_max"]]} if style.get("y_max") else {}
+    encoding = {
+        "x" if horizontal else "y": {
+            "field": value,
+            "type": "quantitative",
+            "title": style.get("x_title" if horizontal else "y_title", value),
+            "scale": value_scale,
+            "axis": value_axis,
+        },
+        "y" if horizontal else "x": {
+            "field": category,
+            "type": "nominal",
+            "sort": sort,
+            "title": style.get("y_title" if horizontal else "x_title", category),
+            "axis": category_axis,
+        },
+    }
+    if hue:
+        encoding["color"] = {"field": hue, "type": "nominal"}
+        encoding["yOffset" if horizontal else "xOffset"] = {"field": hue}
+    elif color is None:
+        encoding["color"] = {"field": category, "type": "nominal", "legend": None}
+    spec = {
+        "mark": {"type": "bar", "color": color} if color else "bar",
+        "encoding": encoding,
+    }
+    if title:
+        spec["title"] = title
+    return Chart(
+        spec,
+        bars,
+        _draw_bar,
+        data,
+        x=x,
+        y=y,
+        hue=hue,
+        order=order,
+        color=color,
+        title=title,
+        **style,
+    )
+
+
+def _draw_line(data, x, y, title=None, x_title=None, y_title=None):
+    fig, ax = plt.subplots()
+    sns.lineplot(x=x, y=y, data=data, ax=ax)
+    if title:
+        ax.set_title(title)
+    if x_title:
+        ax.set_xlabel(x_title)
+    if y_title:
+        ax.set_ylabel(y_title)
+    ax.tick_params(axis="x", labelrotation=45)
+    return fig
+
+
+def line_chart(data, x, y, title=None, x_title=None, y_title=None):
+    """
+    Line of `y` over the dates in `x`, the mean of the rows sharing a date,
+    downsampled to MAX_POINTS for the browser.
+    """
+    line = data[[x, y]]
+    if line[x].duplicated().any():
+        line = line.groupby(x)[y].mean().reset_index()
+    line = downsample(line, x, y)
+    spec = {
+        "mark": {"type": "line", "point": len(line) == 1},
+        "encoding": {
+            "x": {"field": x, "type": "temporal", "title": x_title or x},
+            "y": {"field": y, "type": "quantitative", "title": y_title or y},
+        },
+    }
+    if title:
+        spec["title"] = title
+    return Chart(
+        spec,
+        line,
+        _draw_line,
+        data,
+        x=x,
+        y=y,
+        title=title,
+        x_title=x_title,
+        y_title=y_title,
+    )
@@ -0,0 +1,331 @@
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import pyarrow as pa
+from pyarrow import feather
+
+
+CRISES_PATH = "data/african_crises.csv"
+ATTRITION_PATH = "data/Employee-Attrition.xls"  # a CSV file despite its extension
+INFLATION_CAP = 100  # percent the adjusted inflation graphs are capped at
+# Countries whose hyperinflation flattens every other year of their graphs
+OUTLIER_COUNTRIES = ["Angola", "Zimbabwe"]
+HASH_CHUNK = 1024 * 1024
+SNAPSHOT_EXTENSION = ".feather"
+# Bump when a parse_* function changes what it returns; changes to the dtype
+# maps below are picked up on their own through snapshot_version()
+SNAPSHOT_VERSION = 1
+SNAPSHOT_METADATA_KEY = b"snapshot_version"
+
+CRISES_DTYPES = {
+    "case": "int8",
+    "cc3": "category",
+    "country": "category",
+    "year": "int16",
+    "systemic_crisis": "int8",
+    "exch_usd": "float64",
+    "domestic_debt_in_default": "int8",
+    "sovereign_external_debt_default": "int8",
+    "gdp_weighted_default": "float64",
+    "inflation_annual_cpi": "float64",
+    "independence": "int8",
+    "currency_crises": "int8",
+    "inflation_crises": "int8",
+    "banking_crisis": "category",
+}
+
+ATTRITION_DROPPED = ["EmployeeCount", "EmployeeNumber", "Over18", "StandardHours"]
+# Text columns of the attrition data, all with a handful of values
+ATTRITION_CATEGORICAL = [
+    "Attrition",
+    "BusinessTravel",
+    "Department",
+    "EducationField",
+    "Gender",
+    "JobRole",
+    "MaritalStatus",
+    "OverTime",
+]
+ATTRITION_DTYPES = {
+    "Age": "int8",
+    "DailyRate": "int16",
+    "DistanceFromHome": "int8",
+    "Education": "int8",
+    "EnvironmentSatisfaction": "int8",
+    "HourlyRate": "int8",
+    "JobInvolvement": "int8",
+    "JobLevel": "int8",
+    "JobSatisfaction": "int8",
+    "MonthlyIncome": "int32",
+    "MonthlyRate": "int32",
+    "NumCompaniesWorked": "int8",
+    "PercentSalaryHike": "int8",
+    "PerformanceRating": "int8",
+    "RelationshipSatisfaction": "int8",
+    "StockOptionLevel": "int8",
+    "TotalWorkingYears": "int8",
+    "TrainingTimesLastYear": "int8",
+    "WorkLifeBalance": "int8",
+    "YearsAtCompany": "int8",
+    "YearsInCurrentRole": "int8",
+    "YearsSinceLastPromotion": "int8",
+    "YearsWithCurrManager": "int8",
+    **dict.fromkeys(ATTRITION_CATEGORICAL, "category"),
+}
+# Monthly income brackets of the attrition graphs
+INCOME_BINS = pd.IntervalIndex.from_tuples(
+    [
+        (0, 2900),
+        (2900, 4800),
+        (4800, 6700),
+        (6700, 8600),
+        (8600, 10500),
+        (10500, 12400),
+        (12400, 14300),
+        (14300, 16200),
+        (16200, 18100),
+        (18100, 20000),
+    ]
+)
+
+
+@functools.lru_cache(maxsize=16)
+def _file_hash(path, mtime_ns, size):
+    # Keyed on the modification time and size as well, so a file is only
+    # read again once it changed
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_version(path):
+    """
+    Key of the current contents of a data file for the st.cache_data
+    loaders: its modification time and the hash of its contents. Only the
+    file's stat is read when it has not changed since the last call.
+    """
+    stat = os.stat(path)
+    return stat.st_mtime_ns, _file_hash(path, stat.st_mtime_ns, stat.st_size)
+
+
+@functools.cache
+def snapshot_version():
+    """
+    Version of the parsed data a snapshot holds: SNAPSHOT_VERSION and a hash
+    of the dtype maps the parsers read with. A snapshot written under any
+    other version is stale.
+    """
+    parsers = [CRISES_DTYPES, ATTRITION_DTYPES, ATTRITION_DROPPED]
+    digest = hashlib.blake2b(
+        json.dumps(parsers, sort_keys=True).encode(), digest_size=8
+    ).hexdigest()
+    return f"{SNAPSHOT_VERSION}-{digest}"
+
+
+def snapshot_path(path):
+    """
+    Where the Feather snapshot of a data file goes: next to it, with the
+    .feather extension.
+    """
+    return os.path.splitext(path)[0] + SNAPSHOT_EXTENSION
+
+
+def write_snapshot(df, path):
+    """
+    Write `df` as the snapshot of the data file at `path`, tagged with
+    snapshot_version() in its schema metadata. Uncompressed, so readers can
+    memory-map the columns instead of decoding them; written to a temporary
+    file first, so readers never see half a snapshot.
+    """
+    target = snapshot_path(path)
+    table = pa.Table.from_pandas(df, preserve_index=None)
+    table = table.replace_schema_metadata(
+        {
+            **table.schema.metadata,
+            SNAPSHOT_METADATA_KEY: snapshot_version().encode(),
+        }
+    )
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target) or ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        feather.write_feather(table, tmp, compression="uncompressed")
+        os.chmod(tmp, 0o644)  # mkstemp makes it private to this user
+        os.replace(tmp, target)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def read_dataset(path, parse):
+    """
+    The typed data of the file at `path`: memory-mapped from its snapshot
+    when the snapshot is newer than the file and of the current
+    snapshot_version(), parsed with `parse` and snapshotted for the next
+    process otherwise.
+
+    Memory-mapped columns are pages of the OS file cache, so every server
+    process serving the app reads the same copy instead of parsing its own.
+    """
+    snapshot = snapshot_path(path)
+    try:
+        fresh = os.path.getmtime(snapshot) >= os.path.getmtime(path)
+    except OSError:
+        fresh = False
+    if fresh:
+        table = feather.read_table(snapshot, memory_map=True)
+        version = (table.schema.metadata or {}).get(SNAPSHOT_METADATA_KEY)
+        if version == snapshot_version().encode():
+            return table.to_pandas(split_blocks=True, self_destruct=True)
+    df = parse(path)
+    try:
+        write_snapshot(df, path)
+    except OSError as e:
+        # A read-only deployment still works, it just parses every time
+        print(f"Error writing snapshot of {path}: {e}")
+    return df
+
+
+def parse_crises(path=CRISES_PATH):
+    """
+    Parse the African crises CSV with typed columns and banking_crisis as
+    a 0/1 flag.
+    """
+    df = pd.read_csv(path, dtype=CRISES_DTYPES)
+    df["banking_crisis"] = np.where(df["banking_crisis"] == "crisis", 1, 0).astype(
+        "int8"
+    )
+    return df
+
+
+def parse_attrition(path=ATTRITION_PATH):
+    """
+    Parse the employee attrition CSV without its constant and id columns,
+    with typed columns and Attrition as a 0/1 flag.
+    """
+    df = pd.read_csv(
+        path,
+        usecols=lambda column: column not in ATTRITION_DROPPED,
+        dtype=ATTRITION_DTYPES,
+    )
+    df["Attrition"] = np.where(df["Attrition"] == "Yes", 1, 0).astype("int8")
+    return df
+
+
+DATASETS = {
+    CRISES_PATH: parse_crises,
+    ATTRITION_PATH: parse_attrition,
+}
+
+
+# The loaded frames are cached as resources, not data: st.cache_data would
+# hand every session its own unpickled copy instead of the memory-mapped
+# columns. Sessions get shallow copies, so adding a column does not touch
+# the shared frame, and the mapped columns themselves are read-only.
+
+
+@st.cache_resource(max_entries=4)
+def _load_crises(path, version):
+    return read_dataset(path, parse_crises)
+
+
+@st.cache_resource(max_entries=4)
+def _load_adjusted_inflation(path, version):
+    df = _load_crises(path, version)
+    adjusted = df[["country", "year", "inflation_annual_cpi", "inflation_crises"]]
+    return adjusted.assign(
+        inflation_annual_cpi=adjusted["inflation_annual_cpi"].clip(upper=INFLATION_CAP)
+    )
+
+
+@st.cache_resource(max_entries=4)
+def _load_attrition(path, version):
+    df = read_dataset(path, parse_attrition)
+    # Interval categories do not survive the snapshot, so the brackets are
+    # cut after reading it
+    return df.assign(
+        MonthlyIncomeBracket=pd.cut(
+            df["MonthlyIncome"], INCOME_BINS, include_lowest=True, ordered=True
+        )
+    )
+
+
+def load_crises(path=CRISES_PATH):
+    """
+    The African crises data (see parse_crises). Read once per version of
+    the file.
+    """
+    return _load_crises(path, file_version(path)).copy(deep=False)
+
+
+def load_adjusted_inflation(path=CRISES_PATH):
+    """
+    Country, year, inflation rate and inflation crisis flag of the African
+    crises data, with the inflation rate capped at INFLATION_CAP percent.
+    """
+    return _load_adjusted_inflation(path, file_version(path)).copy(deep=False)
+
+
+def country_series(df):
+    """
+    The inflation graph of every country of the African crises data, in one
+    pass over `df`: {country: (years, inflation, crisis_years)} of
+    contiguous arrays, years sorted, countries in the order they first
+    appear in `df`.
+    """
+    years = df["year"].to_numpy()
+    inflation = df["inflation_annual_cpi"].to_numpy()
+    crises = df["inflation_crises"].to_numpy() == 1
+    series = {}
+    groups = df.groupby("country", sort=False, observed=True).indices
+    for country, rows in groups.items():
+        if np.any(np.diff(years[rows]) < 0):
+            rows = rows[np.argsort(years[rows], kind="stable")]
+        series[country] = (years[rows], inflation[rows], years[rows[crises[rows]]])
+    return series
+
+
+@st.cache_resource(max_entries=4)
+def _load_country_series(path, version, adjusted):
+    if adjusted:
+        return country_series(_load_adjusted_inflation(path, version))
+    return country_series(_load_crises(path, version))
+
+
+def load_country_series(path=CRISES_PATH, adjusted=False):
+    """
+    country_series() of the African crises data, or of its inflation
+    capped at INFLATION_CAP percent when `adjusted`. Built once per version
+    of the file.
+    """
+    return _load_country_series(path, file_version(path), adjusted)
+
+
+def load_attrition(path=ATTRITION_PATH):
+    """
+    The employee attrition data (see parse_attrition), with the
+    MonthlyIncomeBracket of every employee. Read once per version of the
+    file.
+    """
+    return _load_attrition(path, file_version(path)).copy(deep=False)
+
+
+def build_snapshots():
+    """
+    Write the snapshot of every bundled dataset, e.g. when deploying, so
+    even the first process starts from them.
+    """
+    for path, parse in DATASETS.items():
+        write_snapshot(parse(path), path)
+        print(f"Wrote {snapshot_path(path)}")
+
+
+if __name__ == "__main__":
+    build_snapshots()
@@ -0,0 +1,172 @@
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import matplotlib
+import matplotlib.pyplot as plt
+import seaborn as sns
+import streamlit as st
+
+from collections import OrderedDict
+from PIL import Image
+
+
+FIGURE_CACHE_DIR = "eda/figure_cache"
+MEMORY_BYTES = 64 * 1024 * 1024  # rendered figures kept in memory
+DISK_BYTES = 256 * 1024 * 1024  # rendered figures kept on disk
+# Rendered the way st.pyplot renders figures, so the cached images look the same
+SAVEFIG_OPTIONS = {"bbox_inches": "tight", "dpi": 200}
+FORMATS = ("png", "svg")
+# Widest image Streamlit shows; it scales wider ones down on every rerun, so
+# they are stored scaled down the same way
+MAX_WIDTH = 2 * 730
+# Part of every key; bump it when the drawing code changes so cached images
+# of the old drawing are not served
+RENDER_VERSION = 2
+
+
+class FigureCache:
+    """
+    Rendered figures as image bytes, in memory and on disk, both bounded in
+    size and evicting the least recently used figure first.
+
+    The memory tier is shared by the sessions of a server process; the disk
+    tier by all processes and restarts. Disk entries are files named after
+    their key, and a hit touches the file, so its modification time is when
+    it was last used.
+    """
+
+    def __init__(
+        self,
+        directory=FIGURE_CACHE_DIR,
+        memory_bytes=MEMORY_BYTES,
+        disk_bytes=DISK_BYTES,
+    ):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key, fmt):
+        return os.path.join(self.directory, f"{key}.{fmt}")
+
+    def get(self, key, fmt):
+        with self._lock:
+            image = self._memory.get((key, fmt))
+            if image is not None:
+                self._memory.move_to_end((key, fmt))
+                return image
+        path = self._path(key, fmt)
+        try:
+            with open(path, "rb") as f:
+                image = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        self._remember(key, fmt, image)
+        return image
+
+    def put(self, key, fmt, image):
+        self._remember(key, fmt, image)
+        path = self._path(key, fmt)
+        # Written to a temporary file first, so readers never see half an image
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(image)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        self._evict_disk()
+
+    def _remember(self, key, fmt, image):
+        with self._lock:
+            if (key, fmt) in self._memory:
+                return
+            self._memory[(key, fmt)] = image
+            self._size += len(image)
+            while self._size > self.memory_bytes and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._size -= len(evicted)
+
+    def _evict_disk(self):
+        files = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+@st.cache_resource
+def figure_cache():
+    return FigureCache()
+
+
+def figure_key(name, version, style):
+    """
+    Key of a figure: its name, the version of the data it shows, the style
+    parameters it was drawn with and the versions of the drawing code and
+    libraries.
+    """
+    parts = (
+        name,
+        version,
+        sorted(style.items()),
+        RENDER_VERSION,
+        matplotlib.__version__,
+        sns.__version__,
+    )
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+def cached_figure(name, version, draw, data, fmt="png", cache=None, **style):
+    """
+    Image bytes of the figure `draw(data, **style)` returns, rendered once
+    per name, data version and style and then served from the cache.
+    `version` identifies the contents of `data`, which is not hashed.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Cannot render figures as {fmt!r}, use one of {FORMATS}")
+    cache = cache or figure_cache()
+    key = figure_key(name, version, style)
+    image = cache.get(key, fmt)
+    if image is None:
+        fig = draw(data, **style)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=fmt, **SAVEFIG_OPTIONS)
+        plt.close(fig)
+        image = buffer.getvalue()
+        if fmt == "png":
+            image = _fit_width(image)
+        cache.put(key, fmt, image)
+    return image
+
+
+def _fit_width(png):
+    picture = Image.open(io.BytesIO(png))
+    width, height = picture.size
+    if width <= MAX_WIDTH:
+        return png
+    picture = picture.resize(
+        (MAX_WIDTH, int(height * MAX_WIDTH / width)), resample=Image.BILINEAR
+    )
+    buffer = io.BytesIO()
+    picture.save(buffer, format="PNG")
+    return buffer.getvalue()
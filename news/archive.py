@@ -0,0 +1,150 @@
+import glob
+import os
+import shutil
+import uuid
+
+from datetime import date
+
+from news.rollup import update_rollups
+
+
+ARCHIVE_DIR = "archive"  # next to the database file
+HOT_DAYS = 30  # articles older than this move from the table to the archive
+RETENTION_MONTHS = 24  # archived months kept before their partition is dropped
+ARTICLE_COLUMNS = (
+    "title, link, published, source, content_hash, sentiment, subjectivity"
+)
+
+
+def archive_dir(database):
+    """
+    Directory holding the Parquet archive of the database at `database`.
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(database)), ARCHIVE_DIR)
+
+
+def _files(directory, month="*"):
+    # Hive layout: month=YYYY-MM/source=<escaped name>/part_<batch>_<n>.parquet
+    return os.path.join(directory, f"month={month}", "*", "*.parquet")
+
+
+def _read_archive(directory, month="*"):
+    # By name, as partitions written before bodies were archived have no
+    # content column
+    return f"""
+        read_parquet(
+            '{_files(directory, month)}',
+            hive_partitioning = true,
+            union_by_name = true,
+            hive_types = {{'month': VARCHAR, 'source': VARCHAR}}
+        )
+    """
+
+
+def create_archive_view(conn, directory):
+    """
+    all_articles: the articles table and the Parquet archive as one view,
+    with a month column ('YYYY-MM') on both. Filters on month and source
+    are pushed into the Parquet scan, so a query over a date range only
+    opens the partitions of the months it covers.
+
+    read_parquet fails on a pattern matching no files, so until the first
+    articles are archived the view is the articles table alone. Call again
+    whenever partitions are added or dropped.
+    """
+    hot = f"SELECT {ARTICLE_COLUMNS}, strftime(published, '%Y-%m') AS month FROM articles"
+    if glob.glob(_files(directory)):
+        cold = f"SELECT {ARTICLE_COLUMNS}, month FROM {_read_archive(directory)}"
+        hot = f"{hot} UNION ALL {cold}"
+    conn.execute(f"CREATE OR REPLACE VIEW all_articles AS {hot}")
+
+
+def archive_articles(conn, directory, days=HOT_DAYS):
+    """
+    Move articles published more than `days` ago from the articles table to
+    the archive, as new Parquet files in their month and source partitions.
+    The files carry each article's body as text in a content column, which
+    all_articles leaves out; drop_unreferenced() then takes the bodies no
+    hot article shares out of article_bodies.
+
+    The files are written first and the rows deleted in a transaction after.
+    If that transaction fails the files of this batch are removed again, so
+    an article is never in both tiers. Archived articles stay counted in the
+    rollup. Call outside of a transaction.
+    """
+    batch = uuid.uuid4().hex
+    old = f"published < (CURRENT_DATE - {int(days)})"
+    moved = conn.execute(f"SELECT COUNT(*) FROM articles WHERE {old}").fetchone()[0]
+    if not moved:
+        return 0
+    conn.execute(
+        f"""
+        COPY (
+            SELECT
+                {ARTICLE_COLUMNS},
+                body_text(b.body) AS content,
+                strftime(published, '%Y-%m') AS month
+            FROM articles
+            LEFT JOIN (SELECT hash, content AS body FROM article_bodies) b
+                ON b.hash = content_hash
+            WHERE {old}
+        ) TO '{directory}' (
+            FORMAT PARQUET,
+            COMPRESSION ZSTD,
+            PARTITION_BY (month, source),
+            FILENAME_PATTERN 'part_{batch}_{{i}}',
+            OVERWRITE_OR_IGNORE
+        )
+        """
+    )
+    conn.begin()
+    try:
+        conn.execute(f"DELETE FROM articles WHERE {old}")
+        create_archive_view(conn, directory)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        for path in glob.glob(os.path.join(directory, "*", "*", f"part_{batch}_*")):
+            os.remove(path)
+        raise
+    return moved
+
+
+def drop_expired(conn, directory, months=RETENTION_MONTHS, today=None):
+    """
+    Drop the archive partitions of months more than `months` before the
+    current one, taking their articles out of the rollup. Each month is one
+    directory, so retention never rewrites a file. Call outside of a
+    transaction.
+    """
+    today = today or date.today()
+    index = today.year * 12 + today.month - 1 - months
+    cutoff = f"{index // 12:04d}-{index % 12 + 1:02d}"
+    expired = sorted(
+        path
+        for path in glob.glob(os.path.join(directory, "month=*"))
+        if os.path.basename(path)[len("month="):] < cutoff
+    )
+    for path in expired:
+        month = os.path.basename(path)[len("month="):]
+        # Moved out of the view's pattern right before the rollup change and
+        # the view are committed, and only removed after
+        dropped = os.path.join(directory, f".dropped_{month}_{uuid.uuid4().hex}")
+        conn.begin()
+        try:
+            if glob.glob(_files(directory, month)):
+                update_rollups(
+                    conn, f"SELECT * FROM {_read_archive(directory, month)}", sign=-1
+                )
+            os.rename(path, dropped)
+            create_archive_view(conn, directory)
+        except Exception:
+            conn.rollback()
+            raise
+        try:
+            conn.commit()
+        except Exception:
+            os.rename(dropped, path)
+            raise
+        shutil.rmtree(dropped)
+    return len(expired)
@@ -0,0 +1,140 @@
+import hashlib
+import zlib
+
+
+HASH_SIZE = 16  # bytes of the BLAKE2b digest
+COMPRESSION_LEVEL = 6  # zlib level bodies are stored at
+
+
+def content_hash(text):
+    """
+    Hash of an article body with case and whitespace normalized, so the same
+    wire story published by several outlets maps to one body.
+    """
+    normalized = " ".join(text.lower().split())
+    return hashlib.blake2b(normalized.encode(), digest_size=HASH_SIZE).hexdigest()
+
+
+def create_body_table(conn):
+    """
+    One row per distinct article body, keyed by its content_hash, with the
+    sentiment scored for it. articles.content_hash points here, so bodies
+    syndicated across feeds are stored and scored once.
+
+    The content is the zlib-compressed text (see compress_body), as DuckDB's
+    default storage version keeps strings of more than a few KB uncompressed;
+    read it with body_text() in SQL. Bodies of 2 to 6 KB take 40 to 50% of
+    their length, and from 4 KB on a quarter of what plain text takes (see
+    benchmarks.bench_storage).
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS article_bodies (
+            hash VARCHAR PRIMARY KEY,
+            content BLOB,
+            sentiment DOUBLE,
+            subjectivity DOUBLE,
+        )
+        """
+    )
+
+
+def compress_body(text):
+    """
+    An article body as it is stored in article_bodies.content.
+    """
+    return zlib.compress(text.encode(), COMPRESSION_LEVEL)
+
+
+def body_text(content):
+    """
+    The text of an article_bodies.content value.
+    """
+    return zlib.decompress(content).decode()
+
+
+def register_body_functions(conn):
+    """
+    Make content_hash(), compress_body() and body_text() callable from SQL
+    on this connection, for statements that hash, store or read bodies.
+    """
+    conn.create_function("content_hash", content_hash, ["VARCHAR"], "VARCHAR")
+    conn.create_function("compress_body", compress_body, ["VARCHAR"], "BLOB")
+    conn.create_function("body_text", body_text, ["BLOB"], "VARCHAR")
+
+
+def compress_stored_bodies(conn):
+    """
+    Migrate a database that stored bodies as text to compressed ones.
+    """
+    conn.begin()
+    try:
+        conn.execute(
+            """
+            CREATE OR REPLACE TEMP TABLE text_bodies AS
+            SELECT * FROM article_bodies
+            """
+        )
+        conn.execute("DROP TABLE article_bodies")
+        create_body_table(conn)
+        conn.execute(
+            """
+            INSERT INTO article_bodies
+            SELECT hash, compress_body(content), sentiment, subjectivity
+            FROM text_bodies
+            """
+        )
+        conn.execute("DROP TABLE text_bodies")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def drop_unreferenced(conn):
+    """
+    Delete bodies no article in the articles table points at any more;
+    archived articles keep theirs in the Parquet files. Runs inside the
+    caller's transaction.
+    """
+    conn.execute(
+        """
+        DELETE FROM article_bodies
+        WHERE hash NOT IN (
+            SELECT content_hash FROM articles WHERE content_hash IS NOT NULL
+        )
+        """
+    )
+
+
+class BodyScores:
+    """
+    Sentiment of bodies that were already scored, looked up by content hash
+    before a text is sent to the scoring pool. Scores found in the database
+    or added during this run are kept in memory.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.scores = {}
+
+    def known(self, hashes):
+        """
+        Return {hash: (sentiment, subjectivity)} for the given hashes that
+        already have a score.
+        """
+        missing = list({h for h in hashes if h not in self.scores})
+        if missing:
+            rows = self.conn.execute(
+                """
+                SELECT hash, sentiment, subjectivity FROM article_bodies
+                WHERE hash IN (SELECT unnest(?)) AND sentiment IS NOT NULL
+                """,
+                (missing,),
+            ).fetchall()
+            for h, sentiment, subjectivity in rows:
+                self.scores[h] = (sentiment, subjectivity)
+        return {h: self.scores[h] for h in hashes if h in self.scores}
+
+    def add(self, h, sentiment, subjectivity):
+        self.scores[h] = (sentiment, subjectivity)
@@ -0,0 +1,210 @@
+import hashlib
+import re
+import zlib
+import numpy as np
+
+
+SHINGLE_WORDS = 3  # words per shingle
+NUM_PERM = 64  # MinHash permutations per signature
+BANDS = 16  # LSH bands of NUM_PERM // BANDS rows each
+MATCH_THRESHOLD = 0.5  # estimated Jaccard similarity to join a cluster
+REBUILD_BATCH = 5000  # bodies clustered at a time when rebuilding
+
+_PRIME = 4294967311  # smallest prime above 2**32
+_rng = np.random.RandomState(20250101)  # fixed, signatures are persisted
+_A = _rng.randint(1, 2**32, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.randint(0, 2**32, size=NUM_PERM, dtype=np.uint64)
+_WORD = re.compile(r"\w+")
+
+
+def create_cluster_tables(conn):
+    """
+    Story clusters over article bodies.
+
+    story_signatures holds the MinHash signature of each body in
+    article_bodies and the cluster it was put in; a cluster is named after
+    one of its bodies. story_buckets is the LSH index: one row per band
+    of each signature, so bodies sharing a band bucket are candidates for
+    the same story and nothing is ever compared pairwise.
+
+    Returns True if the tables did not exist before and should be built.
+    """
+    exists = conn.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.tables
+        WHERE table_name = 'story_signatures'
+        """
+    ).fetchone()[0]
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS story_signatures (
+            hash VARCHAR PRIMARY KEY,
+            cluster VARCHAR,
+            signature UINTEGER[],
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS story_buckets (
+            band UTINYINT,
+            bucket UBIGINT,
+            hash VARCHAR,
+        )
+        """
+    )
+    return not exists
+
+
+def signature(text):
+    """
+    MinHash signature of the word shingles of `text`, or None for a text
+    without words.
+    """
+    words = _WORD.findall(text.lower())
+    if not words:
+        return None
+    n = max(len(words) - SHINGLE_WORDS + 1, 1)
+    shingles = {" ".join(words[i : i + SHINGLE_WORDS]) for i in range(n)}
+    x = np.fromiter(
+        (zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles)
+    )
+    # (a * x + b) mod p stays below 2**64 for a, b, x below 2**32
+    return ((np.outer(_A, x) + _B[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def band_buckets(sig):
+    rows = NUM_PERM // BANDS
+    return [
+        int.from_bytes(
+            hashlib.blake2b(sig[i * rows : (i + 1) * rows].tobytes(), digest_size=8)
+            .digest(),
+            "little",
+        )
+        for i in range(BANDS)
+    ]
+
+
+def cluster_bodies(conn, bodies):
+    """
+    Put the bodies of `bodies`, a query or table with (hash, content)
+    columns, into story clusters. Bodies that are clustered already are
+    skipped. A body joins the cluster of any candidate from its LSH buckets
+    whose signature agrees on at least MATCH_THRESHOLD of the positions;
+    when it matches several clusters they are merged. Runs inside the
+    caller's transaction.
+    """
+    rows = conn.execute(
+        f"""
+        SELECT hash, content FROM ({bodies})
+        ANTI JOIN story_signatures USING (hash)
+        WHERE content IS NOT NULL
+        """
+    ).fetchall()
+    new = []
+    for h, content in rows:
+        sig = signature(content)
+        if sig is not None:
+            new.append((h, sig, band_buckets(sig)))
+    if not new:
+        return
+
+    # Everything already indexed under one of the new buckets
+    keys = [(band, bucket) for _, _, buckets in new for band, bucket in enumerate(buckets)]
+    candidates = conn.execute(
+        """
+        SELECT s.band, s.bucket, s.hash, g.cluster, g.signature
+        FROM (SELECT unnest(?) AS band, unnest(?) AS bucket) k
+        JOIN story_buckets s USING (band, bucket)
+        JOIN story_signatures g USING (hash)
+        """,
+        ([band for band, _ in keys], [bucket for _, bucket in keys]),
+    ).fetchall()
+    index = {}
+    clusters = {}
+    signatures = {}
+    for band, bucket, h, cluster, sig in candidates:
+        index.setdefault((band, bucket), set()).add(h)
+        clusters[h] = cluster
+        signatures[h] = np.array(sig, dtype=np.uint32)
+
+    merged = {}  # cluster -> the cluster it was merged into
+
+    def resolve(cluster):
+        while cluster in merged:
+            cluster = merged[cluster]
+        return cluster
+
+    for h, sig, buckets in new:
+        matches = set()
+        for band, bucket in enumerate(buckets):
+            for other in index.get((band, bucket), ()):
+                if np.mean(signatures[other] == sig) >= MATCH_THRESHOLD:
+                    matches.add(resolve(clusters[other]))
+        cluster = min(matches) if matches else h
+        for other in matches - {cluster}:
+            merged[other] = cluster
+        clusters[h] = cluster
+        signatures[h] = sig
+        for band, bucket in enumerate(buckets):
+            index.setdefault((band, bucket), set()).add(h)
+
+    conn.execute(
+        """
+        INSERT INTO story_signatures
+        SELECT unnest(?), unnest(?), unnest(?)
+        """,
+        (
+            [h for h, _, _ in new],
+            [resolve(clusters[h]) for h, _, _ in new],
+            [sig.tolist() for _, sig, _ in new],
+        ),
+    )
+    conn.execute(
+        """
+        INSERT INTO story_buckets
+        SELECT unnest(?), unnest(?), unnest(?)
+        """,
+        (
+            [band for _, _, buckets in new for band in range(len(buckets))],
+            [bucket for _, _, buckets in new for bucket in buckets],
+            [h for h, _, buckets in new for _ in buckets],
+        ),
+    )
+    for cluster in merged:
+        conn.execute(
+            "UPDATE story_signatures SET cluster = ? WHERE cluster = ?",
+            (resolve(cluster), cluster),
+        )
+
+
+def uncluster_missing(conn):
+    """
+    Remove bodies that were deleted from article_bodies from the clusters.
+    """
+    for table in ("story_signatures", "story_buckets"):
+        conn.execute(
+            f"""
+            DELETE FROM {table}
+            WHERE hash NOT IN (SELECT hash FROM article_bodies)
+            """
+        )
+
+
+def rebuild_clusters(conn):
+    """
+    Cluster every body from scratch, e.g. for a database created before the
+    story clusters existed.
+    """
+    conn.execute("DELETE FROM story_signatures")
+    conn.execute("DELETE FROM story_buckets")
+    # In batches, so the bodies read into Python stay within memory
+    rows = conn.execute("SELECT MAX(rowid) + 1 FROM article_bodies").fetchone()[0] or 0
+    for start in range(0, rows, REBUILD_BATCH):
+        cluster_bodies(
+            conn,
+            f"""
+            SELECT hash, body_text(content) AS content FROM article_bodies
+            WHERE rowid >= {start} AND rowid < {start + REBUILD_BATCH}
+            """,
+        )
@@ -0,0 +1,198 @@
+import duckdb
+
+from news.archive import archive_dir, create_archive_view
+from news.bodies import (
+    compress_stored_bodies,
+    create_body_table,
+    register_body_functions,
+)
+from news.clusters import create_cluster_tables, rebuild_clusters
+from news.metrics import create_metrics_tables
+from news.registry import create_registry_table
+from news.rollup import create_rollup_tables, rebuild_rollups
+from news.search import create_search_tables, rebuild_index, compact_index
+
+DB_PATH = "news/news.db"
+
+ARTICLES_TABLE = """
+    CREATE TABLE IF NOT EXISTS articles (
+        title VARCHAR,
+        link VARCHAR CONSTRAINT pk_link PRIMARY KEY,
+        published TIMESTAMP,
+        source VARCHAR,
+        content_hash VARCHAR,
+        sentiment DOUBLE,
+        subjectivity DOUBLE,
+    )
+"""
+
+
+def connect(database=DB_PATH, read_only=False):
+    """
+    Open the news database and make sure the tables exist.
+    """
+    conn = duckdb.connect(database=database, read_only=read_only)
+    register_body_functions(conn)
+    if not read_only:
+        create_tables(conn, archive_dir(database))
+    return conn
+
+
+def create_tables(conn, archive):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS data_version (
+            version BIGINT,
+        )
+    """
+    )
+    conn.execute(
+        """
+        INSERT INTO data_version
+        SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM data_version)
+        """
+    )
+    conn.execute(ARTICLES_TABLE)
+    create_body_table(conn)
+    if body_content_type(conn) == "VARCHAR":
+        compress_stored_bodies(conn)
+    if "content" in articles_columns(conn):
+        move_contents_to_bodies(conn)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS feed_state (
+            source VARCHAR PRIMARY KEY,
+            url VARCHAR,
+            etag VARCHAR,
+            modified VARCHAR,
+            seen_ids VARCHAR[],
+            last_status INTEGER,
+            last_polled TIMESTAMP,
+        )
+    """
+    )
+    create_registry_table(conn)
+    ledger_exists = conn.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.tables
+        WHERE table_name = 'link_ledger'
+        """
+    ).fetchone()[0]
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS link_ledger (
+            link VARCHAR PRIMARY KEY,
+            source VARCHAR,
+            state VARCHAR,
+            attempts INTEGER DEFAULT 0,
+            next_attempt_at TIMESTAMP,
+            last_error VARCHAR,
+            discovered_at TIMESTAMP,
+            updated_at TIMESTAMP,
+        )
+    """
+    )
+    if not ledger_exists:
+        # Articles ingested before the ledger existed
+        conn.execute(
+            """
+            INSERT INTO link_ledger
+            SELECT
+                link,
+                source,
+                CASE WHEN sentiment IS NULL THEN 'discovered' ELSE 'scored' END,
+                0,
+                NULL,
+                NULL,
+                published,
+                published,
+            FROM articles
+            """
+        )
+    if create_search_tables(conn):
+        # Articles ingested before the search index existed
+        rebuild_index(conn)
+        compact_index(conn)
+    create_archive_view(conn, archive)
+    if create_rollup_tables(conn):
+        rebuild_rollups(conn)
+    if create_cluster_tables(conn):
+        rebuild_clusters(conn)
+    create_metrics_tables(conn)
+
+
+def articles_columns(conn):
+    return [
+        row[0]
+        for row in conn.execute(
+            """
+            SELECT column_name FROM information_schema.columns
+            WHERE table_name = 'articles'
+            """
+        ).fetchall()
+    ]
+
+
+def body_content_type(conn):
+    return conn.execute(
+        """
+        SELECT data_type FROM information_schema.columns
+        WHERE table_name = 'article_bodies' AND column_name = 'content'
+        """
+    ).fetchone()[0]
+
+
+def move_contents_to_bodies(conn):
+    """
+    Migrate a database that stored the body of each article in
+    articles.content: every distinct body goes to article_bodies once, and
+    the articles table is rebuilt pointing at it by hash.
+    """
+    conn.begin()
+    try:
+        conn.execute(
+            """
+            CREATE OR REPLACE TEMP TABLE hashed_articles AS
+            SELECT *, content_hash(content) AS content_hash FROM articles
+            """
+        )
+        conn.execute(
+            """
+            INSERT INTO article_bodies
+            SELECT DISTINCT ON (content_hash)
+                content_hash, compress_body(content), sentiment, subjectivity
+            FROM hashed_articles
+            WHERE content_hash IS NOT NULL
+            ORDER BY content_hash, sentiment IS NULL
+            """
+        )
+        conn.execute("DROP TABLE articles")
+        conn.execute(ARTICLES_TABLE)
+        conn.execute(
+            """
+            INSERT INTO articles
+            SELECT title, link, published, source, content_hash,
+                   sentiment, subjectivity
+            FROM hashed_articles
+            """
+        )
+        conn.execute("DROP TABLE hashed_articles")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def data_version(conn):
+    """
+    Counter that goes up with every committed change to the articles, so
+    cached query results can be keyed on it.
+    """
+    return conn.execute("SELECT version FROM data_version").fetchone()[0]
+
+
+def bump_data_version(conn):
+    """
+    Mark the data as changed. Call inside the transaction making the change.
+    """
+    conn.execute("UPDATE data_version SET version = version + 1")
@@ -0,0 +1,100 @@
+import re
+
+from lxml import etree
+
+
+# Elements whose text is never article text. Not <form>: ASP.NET sites wrap
+# the whole page in one
+SKIP_TAGS = {
+    "script",
+    "style",
+    "noscript",
+    "template",
+    "svg",
+    "math",
+    "iframe",
+    "object",
+    "video",
+    "audio",
+    "picture",
+    "figure",
+    "button",
+    "select",
+    "nav",
+    "header",
+    "footer",
+    "aside",
+}
+# Elements holding one paragraph of text each
+BLOCK_TAGS = {"p", "h2", "h3", "h4", "blockquote", "li", "pre"}
+MIN_PARAGRAPH_WORDS = 6  # shorter blocks are mostly captions, bylines and links
+FEED_CHUNK = 64 * 1024
+_SPACE = re.compile(r"\s+")
+
+
+class _TextTarget:
+    """
+    lxml parser target collecting the text of paragraph elements, outside
+    of SKIP_TAGS. No tree is built: the parser only calls these methods as
+    it reads, so memory stays at the size of the text kept.
+
+    Paragraphs inside <article> are kept apart, since when a page has an
+    article element its body text is there.
+    """
+
+    def __init__(self):
+        self.skip = 0
+        self.article = 0
+        self.block = None
+        self.paragraphs = []
+        self.article_paragraphs = []
+
+    def start(self, tag, attrib):
+        tag = tag.lower() if isinstance(tag, str) else ""
+        if tag in SKIP_TAGS:
+            self.skip += 1
+        elif tag == "article":
+            self.article += 1
+        elif tag in BLOCK_TAGS and not self.skip and self.block is None:
+            self.block = (tag, [])
+
+    def end(self, tag):
+        tag = tag.lower() if isinstance(tag, str) else ""
+        if tag in SKIP_TAGS:
+            self.skip = max(self.skip - 1, 0)
+        elif tag == "article":
+            self.article = max(self.article - 1, 0)
+        elif self.block is not None and tag == self.block[0]:
+            text = _SPACE.sub(" ", "".join(self.block[1])).strip()
+            self.block = None
+            if len(text.split()) >= MIN_PARAGRAPH_WORDS:
+                self.paragraphs.append(text)
+                if self.article:
+                    self.article_paragraphs.append(text)
+
+    def data(self, data):
+        if self.block is not None and not self.skip:
+            self.block[1].append(data)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        return self.article_paragraphs or self.paragraphs
+
+
+def extract_text(html):
+    """
+    Body text of an HTML page, as paragraphs separated by blank lines the
+    way newspaper's article.text is. Reads the page in chunks with lxml's
+    feed parser and skips everything newspaper's parse() does besides the
+    text: no DOM, images, metadata, keywords or summary.
+    """
+    if not html.strip():
+        return ""
+    target = _TextTarget()
+    parser = etree.HTMLParser(target=target, recover=True, no_network=True)
+    for start in range(0, len(html), FEED_CHUNK):
+        parser.feed(html[start : start + FEED_CHUNK])
+    paragraphs = parser.close()
+    return "\n\n".join(paragraphs)
@@ -0,0 +1,87 @@
+import json
+import feedparser
+import requests
+
+from datetime import datetime
+from time import mktime
+
+
+FEEDS_PATH = "news/rss_feeds.json"
+MAX_FEED_WORKERS = 8
+FEED_TIMEOUT = 15  # seconds
+
+
+def load_feeds(path=FEEDS_PATH):
+    """
+    Load the source name -> feed URL map.
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_feed_state(conn):
+    """
+    Return {source: (etag, modified, seen_ids)} from the feed_state table.
+    """
+    rows = conn.execute(
+        "SELECT source, etag, modified, seen_ids FROM feed_state"
+    ).fetchall()
+    return {
+        source: (etag, modified, set(seen_ids or []))
+        for source, etag, modified, seen_ids in rows
+    }
+
+
+def entry_id(entry):
+    return entry.get("id") or entry.get("link")
+
+
+def poll_feed(source, url, etag=None, modified=None, timeout=FEED_TIMEOUT):
+    """
+    Fetch a feed with a conditional GET.
+
+    Returns (status, etag, modified, entries). A 304 answer comes back with
+    no entries and the validators we sent, so the feed can be skipped.
+    """
+    headers = {"User-Agent": "Mozilla/5.0 (news-sentiment feed poller)"}
+    if etag:
+        headers["If-None-Match"] = etag
+    if modified:
+        headers["If-Modified-Since"] = modified
+    response = requests.get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304:
+        return 304, etag, modified, []
+    response.raise_for_status()
+    d = feedparser.parse(
+        response.content,
+        response_headers={
+            "content-location": response.url,
+            "content-type": response.headers.get("Content-Type", ""),
+        },
+    )
+    return (
+        response.status_code,
+        response.headers.get("ETag"),
+        response.headers.get("Last-Modified"),
+        d.entries,
+    )
+
+
+def new_entries(status, entries, previous_ids):
+    """
+    Split the entries of a poll against the ids seen on the previous one.
+
+    Returns (new_entries, seen_ids): the entries whose id was not seen
+    before, and the ids present in the feed now, which is what should be
+    stored for the next poll. A 304 answer has no entries and keeps the
+    previous ids.
+    """
+    if status == 304:
+        return [], previous_ids
+    seen_ids = {entry_id(entry) for entry in entries}
+    return [e for e in entries if entry_id(e) not in previous_ids], seen_ids
+
+
+def entry_published(entry):
+    parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+    return datetime.fromtimestamp(mktime(parsed))
@@ -0,0 +1,157 @@
+import threading
+import time
+import newspaper
+
+from newspaper.article import ArticleDownloadState, ArticleException
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+from news.extract import extract_text
+from news.http_client import HttpClient, ResponseCache, CACHE_DIR, CACHE_TTL
+
+
+MAX_WORKERS = 16
+REQUESTS_PER_HOST = 2.0  # requests per second to any single host
+REQUEST_TIMEOUT = 10  # seconds
+MAX_PAGE_BYTES = 2 * 1024 * 1024  # bytes of a page read before cutting it off
+TEXT_ONLY = True  # parse with the text extractor instead of newspaper's parse()
+# Text-only results shorter than this fall back to newspaper's parse(), for
+# pages whose text is not in paragraph elements (e.g. a <div> split by <br>)
+MIN_TEXT_WORDS = 25
+
+
+class HostRateLimiter:
+    """
+    Spaces out requests to the same host so that no host sees more than
+    `rate` requests per second, while different hosts are fetched in parallel.
+    """
+
+    def __init__(self, rate=REQUESTS_PER_HOST):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def make_config(timeout=REQUEST_TIMEOUT):
+    """
+    Newspaper config for article fetches: bounded timeout and no image or
+    memoization work, since only the article text is stored.
+    """
+    config = newspaper.Config()
+    config.request_timeout = timeout
+    config.fetch_images = False
+    config.memoize_articles = False
+    return config
+
+
+def make_client(
+    config,
+    cache_dir=CACHE_DIR,
+    cache_ttl=CACHE_TTL,
+    pool_size=MAX_WORKERS,
+    max_bytes=MAX_PAGE_BYTES,
+):
+    """
+    Pooled HTTP client for article fetches, with an on-disk response cache
+    unless `cache_dir` is None. Pages past their TTL are pruned from the
+    cache here, once per run. Pages are cut off after `max_bytes` bytes, or
+    read whole if it is None.
+    """
+    cache = None
+    if cache_dir is not None:
+        cache = ResponseCache(cache_dir, cache_ttl)
+        cache.prune()
+    return HttpClient(config, cache, pool_size, max_bytes)
+
+
+def download_article(link, limiter, config, client):
+    """
+    Download a single article through `client` and return the unparsed
+    newspaper Article. Cached pages skip the rate limiter.
+    """
+    article = newspaper.Article(link, config=config)
+    html = client.cached(link)
+    if html is None:
+        limiter.wait(link)
+        html = client.get(link)
+    article.download(input_html=html)
+    if article.download_state != ArticleDownloadState.SUCCESS:
+        raise ArticleException(f"Empty page at {link}")
+    return article
+
+
+def parse_article(article, text_only=TEXT_ONLY):
+    """
+    Parse a downloaded article and return its text. With `text_only`, only
+    the body text is extracted, unless that finds fewer than MIN_TEXT_WORDS
+    words; otherwise newspaper's full parse() runs, which also builds the
+    DOM, finds images, metadata and authors, none of which are stored.
+
+    Raises ArticleException when neither finds any text, so the link is
+    retried like a failed download instead of stored without a body.
+    """
+    text = extract_text(article.html) if text_only else ""
+    if len(text.split()) < MIN_TEXT_WORDS:
+        article.parse()
+        if len(article.text.split()) > len(text.split()):
+            text = article.text
+    if not text.strip():
+        raise ArticleException(f"No article text at {article.url}")
+    return text
+
+
+def fetch_article(link, limiter, config, client, text_only=TEXT_ONLY):
+    """
+    Download and parse a single article and return its text.
+    """
+    return parse_article(download_article(link, limiter, config, client), text_only)
+
+
+def fetch_articles(
+    links,
+    max_workers=MAX_WORKERS,
+    per_host_rate=REQUESTS_PER_HOST,
+    timeout=REQUEST_TIMEOUT,
+    cache_dir=CACHE_DIR,
+    max_bytes=MAX_PAGE_BYTES,
+    text_only=TEXT_ONLY,
+):
+    """
+    Download and parse links on a bounded pool of worker threads.
+
+    Yields (link, text, error) tuples in completion order so the caller can
+    hand them to a single writer. At most 2 * max_workers fetches are in
+    flight, so memory stays bounded however many links are passed in.
+    """
+    limiter = HostRateLimiter(per_host_rate)
+    config = make_config(timeout)
+    client = make_client(config, cache_dir, pool_size=max_workers, max_bytes=max_bytes)
+    links = iter(links)
+    with client, ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {}
+        while True:
+            for link in links:
+                future = pool.submit(
+                    fetch_article, link, limiter, config, client, text_only
+                )
+                pending[future] = link
+                if len(pending) >= 2 * max_workers:
+                    break
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                link = pending.pop(future)
+                try:
+                    yield link, future.result(), None
+                except Exception as e:
+                    yield link, None, e
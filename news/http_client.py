@@ -0,0 +1,148 @@
+import gzip
+import hashlib
+import os
+import tempfile
+import time
+import requests
+
+from newspaper import network
+from requests.adapters import HTTPAdapter
+
+
+CACHE_DIR = "news/http_cache"
+CACHE_TTL = 24 * 60 * 60  # seconds a cached page is served without refetching
+POOL_HOSTS = 32  # hosts with a pool of kept-alive connections
+POOL_SIZE = 16  # connections kept alive per host, one per fetch worker
+STREAM_CHUNK = 64 * 1024  # bytes read from the socket at a time
+
+
+class ResponseCache:
+    """
+    Article pages on disk, keyed by URL, so fetching again within `ttl`
+    seconds (e.g. to re-parse after a parser change) does not hit the
+    network. Each page is one gzip file named after the hash of its URL;
+    its modification time is when it was fetched.
+    """
+
+    def __init__(self, directory=CACHE_DIR, ttl=CACHE_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url):
+        name = hashlib.sha256(url.encode()).hexdigest()
+        return os.path.join(self.directory, name[:2], f"{name}.html.gz")
+
+    def get(self, url):
+        """
+        Return the cached page of `url`, or None if there is none younger
+        than the TTL.
+        """
+        path = self._path(url)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                return f.read()
+        except (OSError, EOFError):
+            return None
+
+    def put(self, url, html):
+        path = self._path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written to a temporary file first, so readers never see half a page
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with gzip.open(os.fdopen(fd, "wb"), "wt", encoding="utf-8") as f:
+                f.write(html)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    def prune(self):
+        """
+        Delete pages older than the TTL.
+        """
+        now = time.time()
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if now - os.path.getmtime(path) > self.ttl:
+                        os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+
+class HttpClient:
+    """
+    Shared HTTP session for article downloads.
+
+    One requests.Session with a pool of kept-alive connections per host is
+    shared by all fetch threads (urllib3's pools are thread-safe), so links
+    on the same host reuse connections instead of paying a TCP and TLS
+    handshake each. Responses are requested compressed. Pages are decoded
+    the way newspaper's own download does, and served from the response
+    cache when it has them. With `max_bytes`, only the start of larger
+    pages is read; article text comes early in the page, after the head.
+    """
+
+    def __init__(self, config, cache=None, pool_size=POOL_SIZE, max_bytes=None):
+        self.config = config
+        self.cache = cache
+        self.max_bytes = max_bytes
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(
+            config.headers or {"User-Agent": config.browser_user_agent}
+        )
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+
+    def cached(self, url):
+        return self.cache.get(url) if self.cache is not None else None
+
+    def get(self, url):
+        """
+        Download `url` and return its HTML as text. Raises on a non-2XX
+        answer. The body is streamed and cut off after `max_bytes`
+        (decompressed) bytes, so an oversized page is never held in full.
+        """
+        max_bytes = self.max_bytes
+        with self.session.get(
+            url,
+            timeout=self.config.request_timeout,
+            proxies=self.config.proxies,
+            allow_redirects=True,
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(STREAM_CHUNK):
+                chunks.append(chunk)
+                size += len(chunk)
+                if max_bytes is not None and size >= max_bytes:
+                    break
+            content = b"".join(chunks)[:max_bytes]
+            encoding = response.encoding
+        # Decoded as newspaper does: by the charset in the headers, or when
+        # there is none by sniffing the page itself
+        if encoding and encoding != network.FAIL_ENCODING:
+            html = content.decode(encoding, errors="replace")
+        else:
+            html = self.config.get_parser().get_unicode_html(content)
+        if self.cache is not None:
+            self.cache.put(url, html)
+        return html
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,38 @@
+from datetime import datetime
+
+
+MAX_ATTEMPTS = 5
+RETRY_BACKOFF = 15 * 60  # seconds before the first retry, doubled per failure
+
+DISCOVERED = "discovered"
+FETCHED = "fetched"
+FAILED = "failed"
+SCORED = "scored"
+
+
+def due_links(conn, now=None):
+    """
+    Links that should reach the download stage: newly discovered ones and
+    failed ones whose backoff has expired and that have retries left.
+    """
+    rows = conn.execute(
+        """
+        SELECT link FROM link_ledger
+        WHERE state = ?
+           OR (state = ? AND attempts < ? AND next_attempt_at <= ?)
+        ORDER BY discovered_at
+        """,
+        (DISCOVERED, FAILED, MAX_ATTEMPTS, now or datetime.now()),
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def link_sources(conn, links):
+    """
+    Return {link: source} for the given links.
+    """
+    rows = conn.execute(
+        "SELECT link, source FROM link_ledger WHERE link IN (SELECT unnest(?))",
+        (list(links),),
+    ).fetchall()
+    return dict(rows)
@@ -0,0 +1,285 @@
+import re
+import numpy as np
+
+from itertools import chain, compress, count, repeat
+from operator import not_
+
+
+# Maximum difference from TextBlob's PatternAnalyzer per document, checked
+# on prose with punctuation by tests/test_lexicon.py and
+# `benchmarks.bench_sentiment --prose`
+TOLERANCE = 1e-6
+
+UNKNOWN = -1
+NEGATION = -2
+EXCLAMATION = -3
+NEGATIONS = ("no", "not", "never", "n't")
+
+# TextBlob splits "n't" off the word before it and turns quotes and
+# apostrophes into separate tokens. It then splits punctuation marks off the
+# start of a word one at a time, and off its end along with "..." and
+# periods, except the period of abbreviations ("e.g.", "F.", "Mr."); a
+# leading period and punctuation inside a word stay (".__next", "a-b").
+QUOTES = re.compile("['\"“”‘’]")
+PUNCT = ",;:!?()[]{}`@#$^&*+-|=~_"
+LEADING = tuple(PUNCT)
+TRAILING = LEADING + (".",)
+ABBREVIATIONS = set(
+    (
+        "a. adj. adv. al. a.m. c. cf. comp. conf. def. ed. e.g. esp. etc. ex. f. "
+        "fig. gen. id. i.e. int. l. m. Med. Mil. Mr. n. n.q. orig. pl. pred. pres. "
+        "p.m. ref. v. vs."
+    ).split()
+)
+# TextBlob's three abbreviation patterns, the last one with its character
+# class as written there
+ABBREVIATION = re.compile(
+    r"^(?:[A-Za-z]\.|(?:[A-Za-z]\.)+|[A-Z][b|c|d|f|g|h|j|k|l|m|n|p|q|r|s|t|v|w|x|z]+.)$"
+)
+# Split-off marks that never affect the score: single characters, which do
+# not end a negation or modifier, other than "!"
+DROPPED = set(PUNCT + ".") - {"!"}
+
+# TextBlob joins its tokens back together with spaces and then matches
+# emoticons and the "(!)" sarcasm mark across them, so punctuation that
+# merely sits next to other punctuation or a letter can count as a face:
+# "Results: (a)" holds the frown ":(" and "good; D:" the wink ";D". Texts
+# where its patterns match with any whitespace between their characters, in
+# any case, are scored by TextBlob itself (see LexiconScorer.score).
+MARKS = None
+
+_lexicon = None
+
+
+def marks():
+    """
+    Compile the pattern finding the texts in which TextBlob may see an
+    emoticon or "(!)", from TextBlob's own patterns.
+    """
+    global MARKS
+    if MARKS is None:
+        from textblob._text import EMOTICONS, PUNCTUATION, RE_EMOTICONS, RE_SARCASM
+
+        # Both allow a single space between characters. The emoticons must
+        # also be followed by whitespace, which TextBlob inserts after
+        # punctuation it splits off a word and before the punctuation it
+        # splits off the end of one
+        punct = re.escape(PUNCTUATION + "'\"“”‘’")
+        emoticons = RE_EMOTICONS.pattern.removesuffix(r"($|\s)")
+        emoticons += rf"(?:(?<=[{punct}])|(?=[\s{punct}]|$))"
+        patterns = "|".join(
+            p.replace(" ?", r"\s*") for p in (emoticons, RE_SARCASM.pattern)
+        )
+        # Checking the first character before trying every alternative makes
+        # the search several times faster
+        first = {e[0] for faces in EMOTICONS.values() for e in faces} | {"("}
+        first = "".join(map(re.escape, sorted(first)))
+        MARKS = re.compile(rf"(?=[{first}])(?:{patterns})", re.IGNORECASE)
+    return MARKS
+
+
+def load_lexicon():
+    """
+    Load TextBlob's English sentiment lexicon once per process and compile it
+    into a word -> row dict plus per-row NumPy arrays.
+    """
+    global _lexicon
+    if _lexicon is None:
+        from textblob.en import sentiment
+
+        if not dict.__len__(sentiment):
+            sentiment.load()
+        words = {}
+        scores = []
+        modifier = []
+        ly = []
+        for word, senses in dict.items(sentiment):
+            if " " in word:
+                continue  # multi-word entries never match a single token
+            words[word] = len(scores)
+            scores.append(senses[None])
+            modifier.append("RB" in senses)
+            ly.append(word.endswith("ly"))
+        for word in NEGATIONS:
+            words.setdefault(word, NEGATION)
+        words["!"] = EXCLAMATION
+        scores = np.array(scores, dtype=np.float64)
+        _lexicon = (
+            words,
+            scores[:, 0],
+            scores[:, 1],
+            scores[:, 2],
+            np.array(modifier),
+            np.array(ly),
+        )
+    return _lexicon
+
+
+def split_token(token):
+    """
+    The tokens TextBlob splits a whitespace-delimited word carrying
+    punctuation into, minus DROPPED.
+    """
+    head = []
+    while token.startswith(LEADING):
+        head.append(token[0])
+        token = token[1:]
+    tail = []
+    while token.endswith(TRAILING):
+        if token.endswith(LEADING):
+            tail.append(token[-1])
+            token = token[:-1]
+        if token.endswith("..."):
+            tail.append("...")
+            token = token[:-3].rstrip(".")
+        if token.endswith("."):
+            if token in ABBREVIATIONS or ABBREVIATION.match(token):
+                break
+            tail.append(".")
+            token = token[:-1]
+    tokens = head + ([token] if token else []) + tail[::-1]
+    return [t for t in tokens if t not in DROPPED]
+
+
+def tokenize(text):
+    """
+    Split text into the tokens TextBlob would produce, minus punctuation
+    marks other than "!" and "...", which never affect the score. Plain
+    alphanumeric words skip split_token().
+    """
+    tokens = QUOTES.sub(" ", text.replace("n't", " n't")).split()
+    other = list(compress(count(), map(not_, map(str.isalnum, tokens))))
+    for i in reversed(other):
+        tokens[i : i + 1] = split_token(tokens[i])
+    return tokens
+
+
+class LexiconScorer:
+    """
+    Vectorized re-implementation of TextBlob's PatternAnalyzer.
+
+    A batch of documents is tokenized with str.split (plus a compiled regex
+    for words carrying punctuation) and looked up in the lexicon dict in one
+    pass over the whole batch; everything after that (modifiers such
+    as "very good", negations such as "not good", "!" boosts and the per
+    document averages) is computed with NumPy over the whole batch.
+
+    Documents in which TextBlob may find an emoticon or "(!)" (see MARKS)
+    are handed to TextBlob's PatternAnalyzer instead, as those assessments
+    depend on its tokenizer's spacing.
+    """
+
+    name = "lexicon"
+    tolerance = TOLERANCE
+
+    def score(self, texts):
+        """
+        Return (polarity, subjectivity) float arrays for a batch of texts.
+        """
+        from textblob.en import sentiment
+
+        texts = list(texts)
+        pattern = marks()
+        marked = [i for i, text in enumerate(texts) if pattern.search(text)]
+        if not marked:
+            return self._score(texts)
+        plain = np.ones(len(texts), dtype=bool)
+        plain[marked] = False
+        total_p = np.empty(len(texts))
+        total_s = np.empty(len(texts))
+        total_p[plain], total_s[plain] = self._score(list(compress(texts, plain)))
+        for i in marked:
+            total_p[i], total_s[i] = sentiment(texts[i])
+        return total_p, total_s
+
+    def _score(self, texts):
+        words, polarity, subjectivity, intensity, modifier, ly = load_lexicon()
+        docs = [tokenize(text) for text in texts]
+        n_docs = len(docs)
+        lengths = np.fromiter(map(len, docs), dtype=np.int64, count=n_docs)
+        n = int(lengths.sum())
+        if n == 0:
+            return np.zeros(n_docs), np.zeros(n_docs)
+        # Tokens never contain spaces, so the whole batch can be lowercased
+        # in one call.
+        tokens = " ".join(chain.from_iterable(docs)).lower().split(" ")
+        code = np.fromiter(
+            map(words.get, tokens, repeat(UNKNOWN)), dtype=np.int64, count=n
+        )
+        size = np.fromiter(map(len, tokens), dtype=np.int64, count=n)
+
+        doc = np.repeat(np.arange(n_docs), lengths)
+        start = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        index = np.arange(n)
+
+        def last_before(mask):
+            # Index of the last token before each token, in the same
+            # document, where mask holds; -1 if there is none.
+            last = np.maximum.accumulate(np.where(mask, index, -1))
+            previous = np.concatenate(([-1], last[:-1]))
+            return np.where(previous >= start, previous, -1)
+
+        known = code >= 0
+        row = np.where(known, code, 0)
+        negation = code == NEGATION
+        exclamation = code == EXCLAMATION
+        is_modifier = known & modifier[row]
+        is_ly = known & ly[row]
+
+        # A modifier stays active until the next known word or an unknown
+        # word longer than two letters. Negations right after an "-ly"
+        # modifier are absorbed by it ("really not good") and do not reset it.
+        m = last_before(known | (~known & ~negation & (size > 2)))
+        has_m = m >= 0
+        m_row = np.where(has_m, m, 0)
+        reset = last_before(negation & (size > 2))
+        modified = known & has_m & is_modifier[m_row] & (is_ly[m_row] | (reset < m))
+        absorbed = negation & has_m & is_modifier[m_row] & is_ly[m_row]
+
+        # A negation stays active until the next known word or an unknown
+        # word longer than one letter.
+        n_event = last_before(known | negation | (size > 1))
+        negated = known & (n_event >= 0)
+        negated[negated] = negation[n_event[negated]] & ~absorbed[n_event[negated]]
+
+        # Each known word starts an assessment unless it extends the one of
+        # the modifier before it; the extended assessment takes the new
+        # word's scores scaled by the modifier's (possibly inverted) intensity.
+        inverse = np.divide(
+            1.0, intensity, out=np.ones_like(intensity), where=intensity != 0
+        )
+        token_intensity = np.where(negated, inverse[row], intensity[row])
+        scale = np.where(modified, token_intensity[m_row], 1.0)
+        p = np.clip(polarity[row] * scale, -1.0, 1.0)[known]
+        s = np.clip(subjectivity[row] * scale, -1.0, 1.0)[known]
+
+        known_index = index[known]
+        group = np.cumsum(~modified[known]) - 1
+        n_groups = group[-1] + 1 if len(group) else 0
+        if n_groups == 0:
+            return np.zeros(n_docs), np.zeros(n_docs)
+        position = np.full(n, -1)
+        position[known_index] = np.arange(len(known_index))
+        last_member = np.zeros(n_groups, dtype=np.int64)
+        last_member[group] = np.arange(len(group))
+        group_p = p[last_member]
+        group_s = s[last_member]
+
+        flags = negated[known].astype(np.float64)
+        np.add.at(flags, position[m[absorbed]], 1.0)
+        group_negated = np.bincount(group, weights=flags, minlength=n_groups) > 0
+
+        # "!" boosts the latest assessment, unless a later word extends it
+        target = last_before(known)[exclamation]
+        target = position[target[target >= 0]]
+        target = target[last_member[group[target]] == target]
+        boosts = np.bincount(group[target], minlength=n_groups)
+        group_p = np.clip(group_p * 1.25**boosts, -1.0, 1.0)
+        group_p = np.where(group_negated, group_p * -0.5, group_p)
+
+        group_doc = doc[known_index[last_member]]
+        counts = np.bincount(group_doc, minlength=n_docs)
+        total_p = np.bincount(group_doc, weights=group_p, minlength=n_docs)
+        total_s = np.bincount(group_doc, weights=group_s, minlength=n_docs)
+        divisor = np.maximum(counts, 1)
+        return total_p / divisor, total_s / divisor
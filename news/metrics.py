@@ -0,0 +1,221 @@
+import time
+import uuid
+
+from bisect import bisect_left
+from datetime import datetime
+
+
+STAGES = ["poll", "download", "parse", "score", "write"]
+# Upper bounds of the latency histogram buckets, in milliseconds; the last
+# bucket takes everything slower
+LATENCY_BUCKETS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf")]
+RUN_HISTORY = 200  # runs kept in the history tables
+
+
+class RunMetrics:
+    """
+    Measurements of one news refresh: a latency histogram per stage, and
+    per source the number of successes, errors and bytes downloaded.
+
+    The pipeline stages all record from the event loop thread, so there is
+    no locking; readers on other threads take copies with snapshot().
+    """
+
+    def __init__(self):
+        self.run_id = uuid.uuid4().hex
+        self.started = datetime.now()
+        self.latency = {stage: [0] * len(LATENCY_BUCKETS) for stage in STAGES}
+        self.totals = {stage: [0, 0.0, 0.0] for stage in STAGES}  # n, sum, max
+        self.sources = {}  # (source, stage) -> [ok, errors, bytes]
+
+    def observe(self, stage, seconds, items=1):
+        """
+        Record that each of `items` items took `seconds` in `stage`.
+        """
+        self.latency[stage][bisect_left(LATENCY_BUCKETS, seconds * 1000)] += items
+        totals = self.totals[stage]
+        totals[0] += items
+        totals[1] += seconds * items
+        totals[2] = max(totals[2], seconds)
+
+    def timer(self, stage, items=1):
+        """
+        Context manager observing the time spent inside it, on `items` items
+        handled together: each is recorded with its share of the time.
+        """
+        return _Timer(self, stage, items)
+
+    def source(self, source, stage, error=False, size=0):
+        """
+        Count one success or error of `source` in `stage`, with the bytes
+        it downloaded.
+        """
+        counts = self.sources.setdefault((source, stage), [0, 0, 0])
+        counts[1 if error else 0] += 1
+        counts[2] += size
+
+    def snapshot(self):
+        # list() copies a dict's items in one step under the GIL, so this is
+        # safe while the pipeline keeps adding sources
+        return {
+            "latency": {stage: list(b) for stage, b in list(self.latency.items())},
+            "totals": {stage: list(t) for stage, t in list(self.totals.items())},
+            "sources": {key: list(c) for key, c in list(self.sources.items())},
+        }
+
+
+class _Timer:
+    def __init__(self, metrics, stage, items):
+        self.metrics = metrics
+        self.stage = stage
+        self.items = items
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        self.metrics.observe(self.stage, elapsed / self.items, self.items)
+
+
+def create_metrics_tables(conn):
+    """
+    Run history of the news refresh: one row per run in pipeline_runs, and
+    its counters, per-stage latencies (totals and histogram buckets) and
+    per-source results in the tables keyed by its run_id.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS pipeline_runs (
+            run_id VARCHAR PRIMARY KEY,
+            started TIMESTAMP,
+            finished TIMESTAMP,
+            status VARCHAR,
+            error VARCHAR,
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS pipeline_counters (
+            run_id VARCHAR,
+            counter VARCHAR,
+            value BIGINT,
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS pipeline_stages (
+            run_id VARCHAR,
+            stage VARCHAR,
+            observations BIGINT,
+            total_seconds DOUBLE,
+            max_seconds DOUBLE,
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS pipeline_latency (
+            run_id VARCHAR,
+            stage VARCHAR,
+            le_ms DOUBLE,
+            observations BIGINT,
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS pipeline_sources (
+            run_id VARCHAR,
+            source VARCHAR,
+            stage VARCHAR,
+            ok BIGINT,
+            errors BIGINT,
+            bytes BIGINT,
+        )
+        """
+    )
+
+
+def save_run(conn, metrics, stats, status, error=None, history=RUN_HISTORY):
+    """
+    Store a finished run and forget all but the last `history` runs.
+    """
+    snapshot = metrics.snapshot()
+    conn.begin()
+    try:
+        conn.execute(
+            "INSERT INTO pipeline_runs VALUES (?, ?, ?, ?, ?)",
+            (metrics.run_id, metrics.started, datetime.now(), status, error),
+        )
+        conn.execute(
+            "INSERT INTO pipeline_counters SELECT ?, unnest(?), unnest(?)",
+            (metrics.run_id, list(stats), list(stats.values())),
+        )
+        totals = snapshot["totals"]
+        conn.execute(
+            """
+            INSERT INTO pipeline_stages
+            SELECT ?, unnest(?), unnest(?), unnest(?), unnest(?)
+            """,
+            (
+                metrics.run_id,
+                list(totals),
+                [n for n, _, _ in totals.values()],
+                [total for _, total, _ in totals.values()],
+                [longest for _, _, longest in totals.values()],
+            ),
+        )
+        latency = snapshot["latency"]
+        conn.execute(
+            "INSERT INTO pipeline_latency SELECT ?, unnest(?), unnest(?), unnest(?)",
+            (
+                metrics.run_id,
+                [stage for stage in latency for _ in LATENCY_BUCKETS],
+                [le for _ in latency for le in LATENCY_BUCKETS],
+                [n for buckets in latency.values() for n in buckets],
+            ),
+        )
+        sources = snapshot["sources"]
+        if sources:
+            conn.execute(
+                """
+                INSERT INTO pipeline_sources
+                SELECT ?, unnest(?), unnest(?), unnest(?), unnest(?), unnest(?)
+                """,
+                (
+                    metrics.run_id,
+                    [source for source, _ in sources],
+                    [stage for _, stage in sources],
+                    [ok for ok, _, _ in sources.values()],
+                    [errors for _, errors, _ in sources.values()],
+                    [size for _, _, size in sources.values()],
+                ),
+            )
+        conn.execute(
+            """
+            CREATE OR REPLACE TEMP TABLE expired_runs AS
+            SELECT run_id FROM pipeline_runs
+            ORDER BY started DESC
+            OFFSET ?
+            """,
+            (history,),
+        )
+        for table in (
+            "pipeline_runs",
+            "pipeline_counters",
+            "pipeline_stages",
+            "pipeline_latency",
+            "pipeline_sources",
+        ):
+            conn.execute(
+                f"DELETE FROM {table} WHERE run_id IN (SELECT run_id FROM expired_runs)"
+            )
+        conn.execute("DROP TABLE expired_runs")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
@@ -1,116 +1,13 @@
-import feedparser
-import json
-import duckdb
-import newspaper
-
-from datetime import datetime
-from time import mktime
 from textblob import TextBlob
 
-
-def get_rss_feeds():
-    conn = duckdb.connect(database="news/news.db", read_only=False)
-    f = open("news/rss_feeds.json")
-    RSS_Feeds = json.load(f)
-
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS articles (
-            title VARCHAR,
-            link VARCHAR CONSTRAINT pk_link PRIMARY KEY,
-            published TIMESTAMP,
-            source VARCHAR,
-            content VARCHAR,
-            sentiment DOUBLE,
-            subjectivity DOUBLE,
-        )
-    """
-    )
-    for source, feed in RSS_Feeds.items():
-        print(f"Processing {source}")
-        d = feedparser.parse(feed)
-        for entry in d.entries:
-            print(f"--------Processing {entry.title}")
-            try:
-                title = entry.title
-                link = entry.link
-                published = datetime.fromtimestamp(mktime(entry.published_parsed))
-                source = source
-                conn.execute(
-                    """
-                    INSERT INTO articles (title, link, published, source)
-                    VALUES (?, ?, ?, ?)
-                    ON CONFLICT DO NOTHING 
-                    """,
-                    (title, link, published, source),
-                )
-            except Exception as e:
-                print(f"Error processing {source}: {e}")
-
-                continue
-    conn.commit()
-
-    f.close()
-
-
-def add_content(link, content):
-    conn = duckdb.connect(database="news/news.db", read_only=False)
-    """
-    Add content to the article with the given link.
-    """
-    conn.execute(
-        """
-        UPDATE articles
-        SET content = ?
-        WHERE link = ?
-        """,
-        (content, link),
-    )
-    conn.commit()
-
-
-def add_sentiment(link, text):
-    conn = duckdb.connect(database="news/news.db", read_only=False)
-    """
-    Add sentiment to the article with the given link.
-    """
-    sentiment, subjectivity = get_sentiment_from_text(text)
-    conn.execute(
-        """
-        UPDATE articles
-        SET sentiment = ?, subjectivity = ?
-        WHERE link = ?
-        """,
-        (sentiment, subjectivity, link),
-    )
-    conn.commit()
-
-
-def get_links():
-    conn = duckdb.connect(database="news/news.db", read_only=False)
-
-    """
-    Get all links from the articles table.
-    """
-    links = []
-    links = conn.execute(
-        """
-        SELECT link FROM articles
-        WHERE sentiment IS NULL
-        """
-    ).fetchall()
-    for link in links:
-        article = newspaper.Article(link[0])
-        try:
-            article.download()
-            article.parse()
-
-            add_content(link[0], article.text)
-            add_sentiment(link[0], article.text)
-        except:
-            print(f"Error processing {link[0]}")
-            continue
-        progressbar(links.index(link), len(links), 30, "■")
+from news.database import connect, bump_data_version, DB_PATH
+from news.ledger import FAILED, MAX_ATTEMPTS
+from news.bodies import drop_unreferenced
+from news.clusters import uncluster_missing
+from news.archive import archive_dir, archive_articles, drop_expired
+from news.search import unindex_missing, compact_index
+from news.registry import sync_feeds, prune_feeds, dead_feeds
+from news.feeds import load_feeds
 
 
 def get_sentiment_from_text(text):
@@ -123,63 +20,82 @@ def get_sentiment_from_text(text):
     return sentiment.polarity, sentiment.subjectivity
 
 
-def clear_database():
-    conn = duckdb.connect(database="news/news.db", read_only=False)
-    #Delete entries where sentiment is null
+def clear_database(database=DB_PATH):
+    conn = connect(database)
+    conn.begin()
+    # Delete entries without sentiment that have used up their retries.
+    # Their ledger row stays, so the link is not rediscovered. Without a
+    # sentiment they were never counted in the rollup.
     conn.execute(
         """
         DELETE FROM articles
-        wHERE SENTIMENT IS NULL
-        """
+        WHERE sentiment IS NULL
+          AND link IN (
+              SELECT link FROM link_ledger
+              WHERE state = ? AND attempts >= ?
+          )
+        """,
+        (FAILED, MAX_ATTEMPTS),
     )
-    #delete entries older than 30 days
+    # Feeds no longer list links this old, so the ledger can forget them
     conn.execute(
         """
-        DELETE FROM articles
-        WHERE published < (CURRENT_DATE -30)
+        DELETE FROM link_ledger
+        WHERE discovered_at < (CURRENT_DATE -60)
         """
     )
-    
     conn.commit()
 
-
-def clear_RSS_feeds():
-    conn = duckdb.connect(database="news/news.db", read_only=False)
-    feeds = conn.execute(
-        """
-        SELECT DISTINCT source FROM articles
-        """
-    ).fetchall()
-
-    f = open("news/rss_feeds.json")
-    RSS_Feeds = json.load(f)
-    bad_sources = []
-    for source in RSS_Feeds.keys():
-        if source not in [feed[0] for feed in feeds]:
-            bad_sources.append(source)
-    for source in bad_sources:
-        del RSS_Feeds[source]
-    f.close()
+    # Move entries older than 30 days and their bodies to the Parquet archive,
+    # and drop the archived months past retention
+    directory = archive_dir(database)
+    archive_articles(conn, directory)
+    drop_expired(conn, directory)
+
+    conn.begin()
+    unindex_missing(conn)
+    drop_unreferenced(conn)
+    uncluster_missing(conn)
+    bump_data_version(conn)
+    conn.commit()
+    compact_index(conn)
 
 
-def progressbar(current_value, total_value, bar_lengh, progress_char):
-    percentage = int(
-        (current_value / total_value) * 100
-    )  # Percent Completed Calculation
-    progress = int(
-        (bar_lengh * current_value) / total_value
-    )  # Progress Done Calculation
-    loadbar = "Progress: [{:{len}}]{}%".format(
-        progress * progress_char, percentage, len=bar_lengh
-    )  # Progress Bar String
-    print(loadbar, end="\r")  # Progress Bar Output
+def clear_RSS_feeds(database=DB_PATH, feeds=None):
+    """
+    Sync the feed registry with `feeds` and report the dead feeds: those
+    whose last polls all failed. They stay in the registry, paused by the
+    backoff of their failure streak, and come back on their own once a
+    poll succeeds. Without `feeds` the registry is synced with
+    rss_feeds.json, and feeds no longer in it are dropped. Returns the
+    registry rows of the dead feeds.
+    """
+    conn = connect(database)
+    try:
+        if feeds is None:
+            feeds = load_feeds()
+            sync_feeds(conn, feeds)
+            prune_feeds(conn, feeds)
+        else:
+            sync_feeds(conn, feeds)
+        bad_sources = dead_feeds(conn)
+    finally:
+        conn.close()
+    for source, failures, last_error, next_poll in bad_sources:
+        print(
+            f"Feed {source} failed {failures} polls in a row, paused until "
+            f"{next_poll:%Y-%m-%d %H:%M}: {last_error}"
+        )
+    return bad_sources
 
 
 if __name__ == "__main__":
-    get_rss_feeds()
-    get_links()
+    from news.worker import start_refresh, lock_owner
 
-    clear_database()
-    clear_RSS_feeds()
+    job = start_refresh()
+    if job is None:
+        print(f"A refresh is already running (pid {lock_owner()})")
+    else:
+        print(job.wait())
 
     # # app.run(debug=True)
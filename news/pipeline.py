@@ -0,0 +1,406 @@
+import asyncio
+
+from concurrent.futures import ThreadPoolExecutor
+
+from news.database import DB_PATH
+from news.feeds import (
+    load_feeds,
+    load_feed_state,
+    poll_feed,
+    new_entries,
+    entry_published,
+    MAX_FEED_WORKERS,
+    FEED_TIMEOUT,
+)
+from news.fetcher import (
+    HostRateLimiter,
+    make_config,
+    make_client,
+    download_article,
+    parse_article,
+    MAX_WORKERS,
+    REQUESTS_PER_HOST,
+    REQUEST_TIMEOUT,
+    MAX_PAGE_BYTES,
+    TEXT_ONLY,
+)
+from news.bodies import content_hash, BodyScores
+from news.http_client import CACHE_DIR
+from news.ledger import due_links, link_sources
+from news.metrics import RunMetrics
+from news.registry import sync_feeds, due_feeds
+from news.sentiment import SentimentEngine, DEFAULT_SCORER
+from news.writer import ArticleWriter
+
+
+QUEUE_SIZE = 64  # items buffered between two stages
+PARSE_WORKERS = 4
+SCORE_WAIT = 0.5  # seconds to wait for a batch to fill before scoring it
+SCORE_POLL = 0.02
+
+COUNTERS = [
+    "feeds_polled",
+    "feeds_skipped",
+    "feed_errors",
+    "links_due",
+    "fetched",
+    "parsed",
+    "scored",
+    "duplicates",
+    "failed",
+    "written",
+]
+
+DONE = object()
+
+
+async def _drain(queue, workers):
+    # Tell every consumer of a queue that nothing more is coming
+    for _ in range(workers):
+        await queue.put(DONE)
+
+
+async def _poll_stage(feeds, states, feed_q, workers, timeout, stats, metrics):
+    # feed poll: conditional GETs on a thread each, bounded by a semaphore
+    limit = asyncio.Semaphore(workers)
+
+    async def poll(source, url):
+        etag, modified, previous_ids = states.get(source, (None, None, set()))
+        async with limit:
+            try:
+                with metrics.timer("poll"):
+                    status, etag, modified, entries = await asyncio.to_thread(
+                        poll_feed, source, url, etag, modified, timeout
+                    )
+            except Exception as e:
+                print(f"Error processing {source}: {e}")
+                stats["feed_errors"] += 1
+                metrics.source(source, "poll", error=True)
+                await feed_q.put((source, url, None, None, None, [], None, e))
+                return
+        stats["feeds_polled"] += 1
+        metrics.source(source, "poll")
+        entries, seen_ids = new_entries(status, entries, previous_ids)
+        await feed_q.put(
+            (source, url, status, etag, modified, entries, seen_ids, None)
+        )
+
+    await asyncio.gather(*(poll(source, url) for source, url in feeds.items()))
+    await feed_q.put(DONE)
+
+
+def _store_poll(writer, item):
+    # One feed poll into the writer, flushed; returns the links it discovered
+    source, url, status, etag, modified, entries, seen_ids, error = item
+    writer.record_poll(source, error)
+    if error is not None:
+        writer.flush()
+        return []
+    for entry in entries:
+        try:
+            writer.add_article(entry.title, entry.link, entry_published(entry), source)
+        except Exception as e:
+            print(f"Error processing {source}: {e}")
+    writer.update_feed_state(source, url, etag, modified, seen_ids, status)
+    writer.flush()
+    return writer.take_discovered()
+
+
+async def _dedup_stage(
+    writer, write_pool, feed_q, link_q, fetch_workers, stats, sources
+):
+    # link dedup: known links are dropped by the writer's ledger anti-join,
+    # only newly discovered ones go on to be fetched. Links left over from
+    # earlier runs (new or due for a retry) go first. `sources` maps each
+    # link to its feed for the per-source metrics. Every poll, failed or
+    # not, goes to the feed registry to schedule the feed's next one.
+    loop = asyncio.get_running_loop()
+    due = await loop.run_in_executor(write_pool, due_links, writer.conn)
+    sources.update(
+        await loop.run_in_executor(write_pool, link_sources, writer.conn, due)
+    )
+    for link in due:
+        stats["links_due"] += 1
+        await link_q.put(link)
+    while (item := await feed_q.get()) is not DONE:
+        source = item[0]
+        discovered = await loop.run_in_executor(write_pool, _store_poll, writer, item)
+        for link in discovered:
+            sources[link] = source
+            stats["links_due"] += 1
+            await link_q.put(link)
+    await _drain(link_q, fetch_workers)
+
+
+async def _fetch_worker(
+    link_q, parse_q, write_q, limiter, config, client, executor, stats, metrics, sources
+):
+    loop = asyncio.get_running_loop()
+    while (link := await link_q.get()) is not DONE:
+        source = sources.get(link)
+        try:
+            with metrics.timer("download"):
+                article = await loop.run_in_executor(
+                    executor, download_article, link, limiter, config, client
+                )
+        except Exception as e:
+            stats["failed"] += 1
+            metrics.source(source, "download", error=True)
+            await write_q.put((link, None, e))
+            continue
+        stats["fetched"] += 1
+        metrics.source(source, "download", size=len((article.html or "").encode()))
+        await parse_q.put((link, article))
+
+
+async def _parse_worker(
+    parse_q, score_q, write_q, executor, text_only, stats, metrics, sources
+):
+    loop = asyncio.get_running_loop()
+    while (item := await parse_q.get()) is not DONE:
+        link, article = item
+        try:
+            with metrics.timer("parse"):
+                text = await loop.run_in_executor(
+                    executor, parse_article, article, text_only
+                )
+        except Exception as e:
+            stats["failed"] += 1
+            metrics.source(sources.get(link), "parse", error=True)
+            await write_q.put((link, None, e))
+            continue
+        stats["parsed"] += 1
+        metrics.source(sources.get(link), "parse")
+        await score_q.put((link, text))
+
+
+async def _score_stage(engine, bodies, write_pool, score_q, write_q, stats, metrics):
+    # score: gather texts into batches for the process pool. At most one
+    # batch per worker process is in flight, so a slow pool pushes back on
+    # the parse stage through score_q. A body already scored, or being
+    # scored, under another link is not sent to the pool again.
+    slots = asyncio.Semaphore(engine.processes)
+    running = set()
+    scoring = {}  # content hash -> future of the body's score
+
+    async def score(batch):
+        try:
+            with metrics.timer("score", len(batch)):
+                future = engine.submit(text for _, text, _ in batch)
+                polarity, subjectivity = await asyncio.wrap_future(future)
+        except Exception as e:
+            for link, _, h in batch:
+                waiting = scoring.pop(h)
+                waiting.set_exception(e)
+                # Marks it retrieved when no duplicate is waiting on it
+                waiting.exception()
+                await write_q.put((link, None, e))
+            return
+        finally:
+            slots.release()
+        stats["scored"] += len(batch)
+        for (link, text, h), p, s in zip(
+            batch, polarity.tolist(), subjectivity.tolist()
+        ):
+            bodies.add(h, p, s)
+            scoring.pop(h).set_result((p, s))
+            await write_q.put((link, (text, p, s), None))
+
+    async def duplicate(link, text, future):
+        try:
+            p, s = await future
+        except Exception as e:
+            await write_q.put((link, None, e))
+            return
+        stats["duplicates"] += 1
+        await write_q.put((link, (text, p, s), None))
+
+    def track(coro):
+        task = asyncio.create_task(coro)
+        running.add(task)
+        task.add_done_callback(running.discard)
+
+    loop = asyncio.get_running_loop()
+    done = False
+    while not done:
+        item = await score_q.get()
+        if item is DONE:
+            break
+        batch = [item]
+        deadline = loop.time() + SCORE_WAIT
+        while len(batch) < engine.batch_size:
+            if score_q.empty():
+                if loop.time() >= deadline:
+                    break
+                await asyncio.sleep(SCORE_POLL)
+                continue
+            item = score_q.get_nowait()
+            if item is DONE:
+                done = True
+                break
+            batch.append(item)
+        hashes = [content_hash(text) for _, text in batch]
+        known = await loop.run_in_executor(write_pool, bodies.known, hashes)
+        unique = []
+        for (link, text), h in zip(batch, hashes):
+            if h in known:
+                stats["duplicates"] += 1
+                await write_q.put((link, (text, *known[h]), None))
+            elif h in scoring:
+                track(duplicate(link, text, scoring[h]))
+            else:
+                scoring[h] = loop.create_future()
+                unique.append((link, text, h))
+        if unique:
+            await slots.acquire()
+            track(score(unique))
+    await asyncio.gather(*running)
+    await write_q.put(DONE)
+
+
+async def _write_stage(writer, write_pool, write_q, stats, metrics):
+    # batch write: the only stage that touches the database after dedup.
+    # Items are queued and written in batches, so the write latency of most
+    # items is near zero and the flushes show up in the slow buckets.
+    loop = asyncio.get_running_loop()
+    while (item := await write_q.get()) is not DONE:
+        link, result, error = item
+        with metrics.timer("write"):
+            if error is not None:
+                print(f"Error processing {link}: {error}")
+                await loop.run_in_executor(write_pool, writer.add_failure, link, error)
+            else:
+                await loop.run_in_executor(write_pool, writer.add_result, link, *result)
+                stats["written"] += 1
+    with metrics.timer("write"):
+        await loop.run_in_executor(write_pool, writer.flush)
+
+
+async def refresh(
+    database=DB_PATH,
+    feeds=None,
+    feed_workers=MAX_FEED_WORKERS,
+    fetch_workers=MAX_WORKERS,
+    parse_workers=PARSE_WORKERS,
+    per_host_rate=REQUESTS_PER_HOST,
+    timeout=REQUEST_TIMEOUT,
+    feed_timeout=FEED_TIMEOUT,
+    cache_dir=CACHE_DIR,
+    max_bytes=MAX_PAGE_BYTES,
+    text_only=TEXT_ONLY,
+    scheduled=True,
+    scorer=DEFAULT_SCORER,
+    processes=None,
+    queue_size=QUEUE_SIZE,
+    stats=None,
+    metrics=None,
+):
+    """
+    Streaming news refresh:
+
+        feed poll -> link dedup -> fetch -> parse -> score -> batch write
+
+    Every stage runs concurrently and hands items on through a bounded
+    queue, so articles of the first feed are being scored while later feeds
+    are still being polled, and a slow stage makes the ones before it wait
+    instead of piling items up in memory. Returns a dict of stage counters;
+    pass in a `stats` dict to watch them being updated while it runs, and a
+    RunMetrics to get stage latencies and per-source results.
+
+    Every use of the write connection, flushes included, runs on a single
+    writer thread, so a flush never holds up the event loop and the other
+    stages.
+
+    With `scheduled`, only the feeds the feed registry has due are polled;
+    otherwise all of them are.
+    """
+    feeds = load_feeds() if feeds is None else feeds
+    stats = {} if stats is None else stats
+    stats.update(dict.fromkeys(COUNTERS, 0))
+    metrics = RunMetrics() if metrics is None else metrics
+    sources = {}
+    feed_q = asyncio.Queue(queue_size)
+    link_q = asyncio.Queue(queue_size)
+    parse_q = asyncio.Queue(queue_size)
+    score_q = asyncio.Queue(queue_size)
+    write_q = asyncio.Queue(queue_size)
+    limiter = HostRateLimiter(per_host_rate)
+    config = make_config(timeout)
+    client = make_client(
+        config, cache_dir, pool_size=fetch_workers, max_bytes=max_bytes
+    )
+
+    with client, ArticleWriter(database) as writer, SentimentEngine(
+        scorer, processes
+    ) as engine, ThreadPoolExecutor(fetch_workers) as fetch_pool, ThreadPoolExecutor(
+        parse_workers
+    ) as parse_pool, ThreadPoolExecutor(1) as write_pool:
+        sync_feeds(writer.conn, feeds)
+        if scheduled:
+            due = due_feeds(writer.conn, feeds)
+            stats["feeds_skipped"] = len(feeds) - len(due)
+            feeds = due
+        states = load_feed_state(writer.conn)
+        bodies = BodyScores(writer.conn)
+
+        async def fetch_stage():
+            await asyncio.gather(
+                *(
+                    _fetch_worker(
+                        link_q,
+                        parse_q,
+                        write_q,
+                        limiter,
+                        config,
+                        client,
+                        fetch_pool,
+                        stats,
+                        metrics,
+                        sources,
+                    )
+                    for _ in range(fetch_workers)
+                )
+            )
+            await _drain(parse_q, parse_workers)
+
+        async def parse_stage():
+            await asyncio.gather(
+                *(
+                    _parse_worker(
+                        parse_q,
+                        score_q,
+                        write_q,
+                        parse_pool,
+                        text_only,
+                        stats,
+                        metrics,
+                        sources,
+                    )
+                    for _ in range(parse_workers)
+                )
+            )
+            await score_q.put(DONE)
+
+        await asyncio.gather(
+            _poll_stage(
+                feeds, states, feed_q, feed_workers, feed_timeout, stats, metrics
+            ),
+            _dedup_stage(
+                writer, write_pool, feed_q, link_q, fetch_workers, stats, sources
+            ),
+            fetch_stage(),
+            parse_stage(),
+            _score_stage(
+                engine, bodies, write_pool, score_q, write_q, stats, metrics
+            ),
+            _write_stage(writer, write_pool, write_q, stats, metrics),
+        )
+    return stats
+
+
+def run_refresh(**kwargs):
+    """
+    Run the streaming refresh from synchronous code (the __main__ block or
+    a Streamlit script).
+    """
+    return asyncio.run(refresh(**kwargs))
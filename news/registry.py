@@ -0,0 +1,210 @@
+from datetime import datetime, timedelta
+
+
+RATE_WINDOW = 7 * 24 * 60 * 60  # seconds of articles a source's rate is taken over
+TARGET_ENTRIES = 3  # new entries a poll should find on average
+MIN_INTERVAL = 15 * 60  # seconds between polls of the busiest feeds
+MAX_INTERVAL = 24 * 60 * 60  # seconds between polls of the quietest feeds
+FAILURE_BACKOFF = 30 * 60  # seconds before polling a failed feed, doubled per failure
+MAX_BACKOFF = 7 * 24 * 60 * 60  # seconds a failing feed is paused for at most
+DEAD_FAILURES = 6  # failures in a row after which a feed is reported as dead
+
+
+def create_registry_table(conn):
+    """
+    One row per feed of rss_feeds.json with its polling schedule: the rate
+    its articles are published at (per hour), when it was last polled and
+    last polled successfully, its current streak of failed polls and the
+    time it is due again.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS feed_registry (
+            source VARCHAR PRIMARY KEY,
+            url VARCHAR,
+            added TIMESTAMP,
+            rate DOUBLE,
+            last_polled TIMESTAMP,
+            last_success TIMESTAMP,
+            failures INTEGER DEFAULT 0,
+            last_error VARCHAR,
+            next_poll TIMESTAMP,
+        )
+        """
+    )
+
+
+def sync_feeds(conn, feeds, now=None):
+    """
+    Register the feeds of the source name -> feed URL map: new feeds are
+    added and due at once and feeds whose URL changed start over. Feeds
+    that are not in the map are left alone, so a refresh of a few sources
+    keeps the schedule of the others; prune_feeds() drops them.
+    """
+    now = now or datetime.now()
+    conn.begin()
+    try:
+        conn.execute(
+            """
+            CREATE OR REPLACE TEMP TABLE configured_feeds AS
+            SELECT unnest(?) AS source, unnest(?) AS url
+            """,
+            (list(feeds), list(feeds.values())),
+        )
+        conn.execute(
+            """
+            UPDATE feed_registry
+            SET url = c.url,
+                added = ?,
+                rate = NULL,
+                failures = 0,
+                last_error = NULL,
+                next_poll = NULL
+            FROM configured_feeds c
+            WHERE feed_registry.source = c.source AND feed_registry.url <> c.url
+            """,
+            (now,),
+        )
+        conn.execute(
+            """
+            INSERT INTO feed_registry (source, url, added)
+            SELECT source, url, ? FROM configured_feeds
+            ANTI JOIN feed_registry USING (source)
+            """,
+            (now,),
+        )
+        conn.execute("DROP TABLE configured_feeds")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def prune_feeds(conn, feeds):
+    """
+    Drop the feeds that are not in the source name -> feed URL map, which
+    has to be the full feed list (rss_feeds.json), with their schedule.
+    """
+    conn.execute(
+        """
+        DELETE FROM feed_registry
+        WHERE source NOT IN (SELECT unnest(?::VARCHAR[]))
+        """,
+        (list(feeds),),
+    )
+
+
+def due_feeds(conn, feeds, now=None):
+    """
+    The part of the source name -> feed URL map that is due for a poll.
+    """
+    rows = conn.execute(
+        """
+        SELECT source FROM feed_registry
+        WHERE next_poll IS NULL OR next_poll <= ?
+        """,
+        (now or datetime.now(),),
+    ).fetchall()
+    due = {row[0] for row in rows}
+    return {source: url for source, url in feeds.items() if source in due}
+
+
+def record_polls(conn, polls, now):
+    """
+    Reschedule polled feeds; `polls` holds (source, error) pairs, error
+    being None for a successful poll. Runs inside the caller's transaction,
+    after the feeds' new articles were inserted.
+
+    The rate of a feed is its articles published within RATE_WINDOW, per
+    hour of that window (or of the time since its oldest article, for a
+    feed added more recently). It is polled when TARGET_ENTRIES new entries
+    are expected, between MIN_INTERVAL and MAX_INTERVAL. A failed poll is
+    retried after FAILURE_BACKOFF, doubled for every failure in a row.
+    """
+    succeeded = [source for source, error in polls if error is None]
+    failed = [(source, str(error)[:500]) for source, error in polls if error is not None]
+    if succeeded:
+        since = now - timedelta(seconds=RATE_WINDOW)
+        conn.execute(
+            """
+            CREATE OR REPLACE TEMP TABLE feed_rates AS
+            SELECT
+                f.source,
+                COUNT(a.link) / greatest(
+                    epoch(? - greatest(?, least(f.added, MIN(a.published)))) / 3600,
+                    1
+                ) AS rate
+            FROM feed_registry f
+            LEFT JOIN articles a
+                ON a.source = f.source
+                AND a.published > ?
+                AND a.published <= ?
+            WHERE f.source IN (SELECT unnest(?))
+            GROUP BY f.source, f.added
+            """,
+            (now, since, since, now, succeeded),
+        )
+        conn.execute(
+            """
+            UPDATE feed_registry
+            SET rate = r.rate,
+                last_polled = ?,
+                last_success = ?,
+                failures = 0,
+                last_error = NULL,
+                next_poll = ? + to_seconds(
+                    CASE
+                        WHEN r.rate = 0 THEN ?
+                        ELSE least(greatest(? * 3600 / r.rate, ?), ?)
+                    END
+                )
+            FROM feed_rates r
+            WHERE feed_registry.source = r.source
+            """,
+            (
+                now,
+                now,
+                now,
+                MAX_INTERVAL,
+                TARGET_ENTRIES,
+                MIN_INTERVAL,
+                MAX_INTERVAL,
+            ),
+        )
+        conn.execute("DROP TABLE feed_rates")
+    if failed:
+        conn.execute(
+            """
+            CREATE OR REPLACE TEMP TABLE failed_polls AS
+            SELECT unnest(?) AS source, unnest(?) AS error
+            """,
+            ([source for source, _ in failed], [error for _, error in failed]),
+        )
+        conn.execute(
+            """
+            UPDATE feed_registry
+            SET last_polled = ?,
+                failures = failures + 1,
+                last_error = s.error,
+                next_poll = ? + to_seconds(least(? * pow(2, failures), ?))
+            FROM (SELECT DISTINCT ON (source) * FROM failed_polls) AS s
+            WHERE feed_registry.source = s.source
+            """,
+            (now, now, FAILURE_BACKOFF, MAX_BACKOFF),
+        )
+        conn.execute("DROP TABLE failed_polls")
+
+
+def dead_feeds(conn, failures=DEAD_FAILURES):
+    """
+    Return (source, failures, last_error, next_poll) of the feeds that
+    failed `failures` polls or more in a row.
+    """
+    return conn.execute(
+        """
+        SELECT source, failures, last_error, next_poll FROM feed_registry
+        WHERE failures >= ?
+        ORDER BY source
+        """,
+        (failures,),
+    ).fetchall()
@@ -0,0 +1,83 @@
+def create_rollup_tables(conn):
+    """
+    Sentiment sums and counts per (source, day), so the overview charts read
+    one row per source and day instead of scanning every article. Only
+    articles with a sentiment are counted, matching AVG's handling of NULLs.
+
+    Returns True if the rollup did not exist before and should be built.
+    """
+    exists = conn.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.tables
+        WHERE table_name = 'daily_sentiment'
+        """
+    ).fetchone()[0]
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS daily_sentiment (
+            source VARCHAR,
+            day DATE,
+            articles BIGINT,
+            sentiment_sum DOUBLE,
+            subjectivity_sum DOUBLE,
+        )
+        """
+    )
+    return not exists
+
+
+def update_rollups(conn, rows, sign=1):
+    """
+    Add (sign=1) or remove (sign=-1) articles from the rollup. `rows` is a
+    query or table with source, published, sentiment and subjectivity
+    columns. Runs inside the caller's transaction.
+    """
+    conn.execute(
+        f"""
+        CREATE OR REPLACE TEMP TABLE rollup_delta AS
+        SELECT
+            source,
+            published::DATE AS day,
+            ? * COUNT(*) AS articles,
+            ? * SUM(sentiment) AS sentiment_sum,
+            ? * SUM(subjectivity) AS subjectivity_sum,
+        FROM ({rows})
+        WHERE sentiment IS NOT NULL
+        GROUP BY ALL
+        """,
+        (sign, sign, sign),
+    )
+    # source and day may be NULL, so match them with IS NOT DISTINCT FROM
+    # instead of relying on a primary key for the upsert
+    conn.execute(
+        """
+        UPDATE daily_sentiment
+        SET articles = daily_sentiment.articles + d.articles,
+            sentiment_sum = daily_sentiment.sentiment_sum + d.sentiment_sum,
+            subjectivity_sum = daily_sentiment.subjectivity_sum + d.subjectivity_sum
+        FROM rollup_delta AS d
+        WHERE daily_sentiment.source IS NOT DISTINCT FROM d.source
+          AND daily_sentiment.day IS NOT DISTINCT FROM d.day
+        """
+    )
+    conn.execute(
+        """
+        INSERT INTO daily_sentiment
+        SELECT * FROM rollup_delta AS d
+        WHERE NOT EXISTS (
+            SELECT 1 FROM daily_sentiment r
+            WHERE r.source IS NOT DISTINCT FROM d.source
+              AND r.day IS NOT DISTINCT FROM d.day
+        )
+        """
+    )
+    conn.execute("DELETE FROM daily_sentiment WHERE articles <= 0")
+    conn.execute("DROP TABLE rollup_delta")
+
+
+def rebuild_rollups(conn):
+    """
+    Recompute the rollup from the articles table and the archive.
+    """
+    conn.execute("DELETE FROM daily_sentiment")
+    update_rollups(conn, "SELECT * FROM all_articles")
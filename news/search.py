@@ -0,0 +1,350 @@
+SEARCH_FIELDS = ("title", "content")
+# Where rebuild_index() reads the (link, text) of each field from
+FIELD_SOURCES = {
+    "title": "SELECT a.link, a.title AS text FROM articles a",
+    "content": """
+        SELECT a.link, body_text(b.content) AS text
+        FROM articles a JOIN article_bodies b ON b.hash = a.content_hash
+    """,
+}
+TOKEN_SPLIT = r"[^\p{L}\p{N}]+"  # anything but letters and digits separates tokens
+MAX_TOKEN_LENGTH = 40
+COMPACT_RATIO = 0.1  # merge new postings once they are this share of the index
+REBUILD_BATCH = 50000  # articles tokenized at a time when rebuilding
+
+MAX_CODE_POINT = chr(0x10FFFF)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def _check_field(field):
+    if field not in SEARCH_FIELDS:
+        raise ValueError(f"Cannot search in {field!r}, use one of {SEARCH_FIELDS}")
+
+
+def create_search_tables(conn):
+    """
+    Inverted index over article titles and contents.
+
+    Each field gets a posting table holding one row per (token, article)
+    with the term frequency and the article's length in tokens, and a term
+    table with the number of articles containing each token. search_stats
+    keeps the article count and total length per field, so BM25 scores only
+    ever read the postings of the searched tokens.
+
+    {field}_postings is kept sorted by token, so DuckDB's per row group
+    min/max statistics skip everything but the few row groups holding a
+    searched token. New postings are appended to {field}_postings_recent
+    and merged in by compact_index().
+
+    Returns True if the index did not exist before and should be built.
+    """
+    exists = conn.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.tables
+        WHERE table_name = 'search_stats'
+        """
+    ).fetchone()[0]
+    for field in SEARCH_FIELDS:
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {field}_postings (
+                token VARCHAR,
+                link VARCHAR,
+                tf INTEGER,
+                length INTEGER,
+            )
+            """
+        )
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {field}_postings_recent (
+                token VARCHAR,
+                link VARCHAR,
+                tf INTEGER,
+                length INTEGER,
+            )
+            """
+        )
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {field}_terms (
+                token VARCHAR PRIMARY KEY,
+                df INTEGER,
+            )
+            """
+        )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS search_stats (
+            field VARCHAR PRIMARY KEY,
+            docs BIGINT,
+            total_length BIGINT,
+        )
+        """
+    )
+    return not exists
+
+
+def index_documents(conn, docs, field):
+    """
+    Add documents to the index of `field`. `docs` is a query or table with
+    (link, text) columns; the links must not be indexed for that field yet.
+    Runs inside the caller's transaction.
+    """
+    _check_field(field)
+    conn.execute(
+        f"""
+        CREATE OR REPLACE TEMP TABLE new_postings AS
+        WITH tokens AS (
+            SELECT link, unnest(regexp_split_to_array(lower(text), ?)) AS token
+            FROM ({docs})
+            WHERE text IS NOT NULL
+        ),
+        counts AS (
+            SELECT link, token, COUNT(*)::INTEGER AS tf
+            FROM tokens
+            WHERE token <> '' AND length(token) <= ?
+            GROUP BY ALL
+        ),
+        lengths AS (
+            SELECT link, SUM(tf)::INTEGER AS length FROM counts GROUP BY link
+        )
+        SELECT token, link, tf, length
+        FROM counts JOIN lengths USING (link)
+        """,
+        (TOKEN_SPLIT, MAX_TOKEN_LENGTH),
+    )
+    conn.execute(f"INSERT INTO {field}_postings_recent SELECT * FROM new_postings")
+    # Upserts are an UPDATE followed by an INSERT of the missing rows, as
+    # DuckDB's ON CONFLICT DO UPDATE fails on rows inserted earlier in the
+    # same transaction
+    conn.execute(
+        """
+        CREATE OR REPLACE TEMP TABLE new_terms AS
+        SELECT token, COUNT(*) AS df FROM new_postings GROUP BY token
+        """
+    )
+    conn.execute(
+        f"""
+        UPDATE {field}_terms
+        SET df = {field}_terms.df + n.df
+        FROM new_terms AS n
+        WHERE {field}_terms.token = n.token
+        """
+    )
+    conn.execute(
+        f"""
+        INSERT INTO {field}_terms
+        SELECT * FROM new_terms ANTI JOIN {field}_terms USING (token)
+        """
+    )
+    # Documents without a single token still count towards the average length
+    conn.execute(
+        """
+        INSERT INTO search_stats
+        SELECT ?, 0, 0
+        WHERE NOT EXISTS (SELECT 1 FROM search_stats WHERE field = ?)
+        """,
+        (field, field),
+    )
+    conn.execute(
+        f"""
+        UPDATE search_stats
+        SET docs = docs + (SELECT COUNT(*) FROM ({docs}) WHERE text IS NOT NULL),
+            total_length = total_length
+                + (SELECT COALESCE(SUM(tf), 0) FROM new_postings)
+        WHERE field = ?
+        """,
+        (field,),
+    )
+    conn.execute("DROP TABLE new_postings")
+    conn.execute("DROP TABLE new_terms")
+
+
+def unindex_missing(conn):
+    """
+    Remove articles that were deleted from the articles table from the
+    index. This scans the postings, so it belongs with the periodic clean-up
+    rather than with every write.
+    """
+    for field in SEARCH_FIELDS:
+        conn.execute(
+            f"""
+            CREATE OR REPLACE TEMP TABLE old_postings AS
+            SELECT * FROM (
+                SELECT * FROM {field}_postings
+                UNION ALL
+                SELECT * FROM {field}_postings_recent
+            )
+            ANTI JOIN articles USING (link)
+            """
+        )
+        conn.execute(
+            f"""
+            UPDATE {field}_terms
+            SET df = df - o.n
+            FROM (SELECT token, COUNT(*) AS n FROM old_postings GROUP BY token) AS o
+            WHERE {field}_terms.token = o.token
+            """
+        )
+        conn.execute(f"DELETE FROM {field}_terms WHERE df <= 0")
+        conn.execute(
+            f"""
+            UPDATE search_stats
+            SET docs = docs - o.n, total_length = total_length - o.length
+            FROM (
+                SELECT COUNT(*) AS n, COALESCE(SUM(length), 0) AS length
+                FROM (SELECT DISTINCT link, length FROM old_postings)
+            ) AS o
+            WHERE field = ?
+            """,
+            (field,),
+        )
+        for table in (f"{field}_postings", f"{field}_postings_recent"):
+            conn.execute(
+                f"""
+                DELETE FROM {table}
+                WHERE link IN (SELECT DISTINCT link FROM old_postings)
+                """
+            )
+        conn.execute("DROP TABLE old_postings")
+
+
+def compact_index(conn, ratio=COMPACT_RATIO):
+    """
+    Merge the recent postings of a field into its sorted posting table once
+    they make up `ratio` of it. This rewrites the whole table, so like
+    unindex_missing it runs with the periodic clean-up, and only every so
+    often as the index grows.
+
+    The sorted copy is written outside of a transaction, as DuckDB holds a
+    transaction's new rows in memory; only the swap is transactional. Call
+    it outside of a transaction and with no other writer active.
+    """
+    for field in SEARCH_FIELDS:
+        recent, total = conn.execute(
+            f"""
+            SELECT
+                (SELECT COUNT(*) FROM {field}_postings_recent),
+                (SELECT COUNT(*) FROM {field}_postings)
+            """
+        ).fetchone()
+        if not recent or recent < ratio * total:
+            continue
+        conn.execute(
+            f"""
+            CREATE OR REPLACE TABLE {field}_postings_sorted AS
+            SELECT * FROM (
+                SELECT * FROM {field}_postings
+                UNION ALL
+                SELECT * FROM {field}_postings_recent
+            )
+            ORDER BY token
+            """
+        )
+        conn.begin()
+        try:
+            conn.execute(f"DROP TABLE {field}_postings")
+            conn.execute(
+                f"ALTER TABLE {field}_postings_sorted RENAME TO {field}_postings"
+            )
+            conn.execute(f"DELETE FROM {field}_postings_recent")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def rebuild_index(conn):
+    """
+    Index every article from scratch, e.g. for a database created before the
+    search index existed. Follow it with compact_index() once committed.
+    """
+    for field in SEARCH_FIELDS:
+        conn.execute(f"DELETE FROM {field}_postings")
+        conn.execute(f"DELETE FROM {field}_postings_recent")
+        conn.execute(f"DELETE FROM {field}_terms")
+        conn.execute("DELETE FROM search_stats WHERE field = ?", (field,))
+        # In batches, so tokenizing a large archive stays within memory
+        rows = conn.execute("SELECT MAX(rowid) + 1 FROM articles").fetchone()[0] or 0
+        for start in range(0, rows, REBUILD_BATCH):
+            index_documents(
+                conn,
+                f"""
+                {FIELD_SOURCES[field]}
+                WHERE a.rowid >= {start} AND a.rowid < {start + REBUILD_BATCH}
+                """,
+                field,
+            )
+
+
+def search(conn, query, field="content", limit=None):
+    """
+    Articles of which `field` contains every token of `query`, best BM25
+    score first, with the publication day alongside the timestamp for
+    plotting. The query text is only ever passed as a parameter.
+
+    Every query token matches the indexed tokens it is a prefix of, so
+    "elect" finds "election", as the LIKE filter this replaced did. Unlike
+    that filter it does not match inside words ("lection") or across them
+    (the tokens of "climate change" may appear anywhere in the article).
+    """
+    _check_field(field)
+    tokens = conn.execute(
+        "SELECT DISTINCT unnest(regexp_split_to_array(lower(?), ?))",
+        (query, TOKEN_SPLIT),
+    ).fetchall()
+    tokens = [token for (token,) in tokens if token]
+    limit_clause = "LIMIT ?" if limit is not None else ""
+    # The postings of a prefix are a range of the sorted posting table, which
+    # DuckDB's min/max statistics narrow down to its row groups; no token
+    # sorts after a prefix followed by the highest code point
+    ranges = " OR ".join(["(token >= ? AND token < ?)"] * len(tokens)) or "false"
+    bounds = [b for token in tokens for b in (token, token + MAX_CODE_POINT)]
+    params = (
+        [field, tokens]
+        + bounds * 2
+        + [BM25_K1, BM25_K1, BM25_B, BM25_B, len(tokens)]
+    )
+    if limit is not None:
+        params.append(limit)
+    return conn.execute(
+        f"""
+        WITH s AS (
+            SELECT docs, total_length / GREATEST(docs, 1) AS avg_length
+            FROM search_stats WHERE field = ?
+        ),
+        q AS (
+            SELECT unnest(?::VARCHAR[]) AS prefix
+        ),
+        t AS (
+            SELECT
+                q.prefix,
+                x.token,
+                ln(1 + (s.docs - x.df + 0.5) / (x.df + 0.5)) AS idf
+            FROM {field}_terms x JOIN q ON starts_with(x.token, q.prefix), s
+        ),
+        p AS (
+            SELECT * FROM {field}_postings WHERE {ranges}
+            UNION ALL
+            SELECT * FROM {field}_postings_recent WHERE {ranges}
+        ),
+        hits AS (
+            SELECT link,
+                   SUM(
+                       t.idf * p.tf * (? + 1)
+                       / (p.tf + ? * (1 - ? + ? * p.length / s.avg_length))
+                   ) AS score
+            FROM p JOIN t USING (token), s
+            GROUP BY link
+            HAVING COUNT(DISTINCT t.prefix) = ?
+        )
+        SELECT a.title, a.link, a.published, a.source, a.sentiment,
+               a.subjectivity, a.published::DATE AS day, hits.score
+        FROM articles a JOIN hits USING (link)
+        ORDER BY hits.score DESC
+        {limit_clause}
+        """,
+        params,
+    ).fetchdf()
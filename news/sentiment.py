@@ -0,0 +1,102 @@
+import os
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+from textblob import TextBlob
+
+from news.lexicon import LexiconScorer
+
+
+SCORE_BATCH = 32  # texts per task handed to a worker process
+
+
+class TextBlobScorer:
+    """
+    Scores texts with TextBlob's default PatternAnalyzer, the same way
+    news_backend.get_sentiment_from_text does.
+    """
+
+    name = "textblob"
+    tolerance = 0.0
+
+    def score(self, texts):
+        """
+        Return (polarity, subjectivity) float arrays for a batch of texts.
+        """
+        polarity = np.empty(len(texts))
+        subjectivity = np.empty(len(texts))
+        for i, text in enumerate(texts):
+            sentiment = TextBlob(text).sentiment
+            polarity[i] = sentiment.polarity
+            subjectivity[i] = sentiment.subjectivity
+        return polarity, subjectivity
+
+
+SCORERS = {
+    TextBlobScorer.name: TextBlobScorer,
+    LexiconScorer.name: LexiconScorer,
+}
+# Stored scores are TextBlob's unless another scorer is picked explicitly;
+# the lexicon scorer is faster and matches them within its tolerance
+DEFAULT_SCORER = TextBlobScorer.name
+
+
+def get_scorer(name=DEFAULT_SCORER):
+    return SCORERS[name]()
+
+
+def _score_batch(scorer, texts):
+    return scorer.score(texts)
+
+
+class SentimentEngine:
+    """
+    Scores batches of texts on a pool of worker processes so that sentiment
+    scoring neither blocks the fetch loop nor is limited to one core.
+
+    Any object with a `score(texts) -> (polarity, subjectivity)` method can be
+    plugged in as the scorer; it is pickled once per task, so it should be
+    cheap to pickle and load heavy state lazily.
+    """
+
+    def __init__(self, scorer=None, processes=None, batch_size=SCORE_BATCH):
+        if scorer is None or isinstance(scorer, str):
+            scorer = get_scorer(scorer or DEFAULT_SCORER)
+        self.scorer = scorer
+        self.processes = processes or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.executor = ProcessPoolExecutor(max_workers=self.processes)
+
+    def submit(self, texts):
+        """
+        Score one batch in the background and return a Future of
+        (polarity, subjectivity).
+        """
+        return self.executor.submit(_score_batch, self.scorer, list(texts))
+
+    def score(self, texts):
+        """
+        Score any number of texts, spread across all worker processes.
+        """
+        texts = list(texts)
+        if not texts:
+            return np.empty(0), np.empty(0)
+        batches = [
+            texts[i : i + self.batch_size]
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        results = list(
+            self.executor.map(_score_batch, [self.scorer] * len(batches), batches)
+        )
+        polarity = np.concatenate([p for p, _ in results])
+        subjectivity = np.concatenate([s for _, s in results])
+        return polarity, subjectivity
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,210 @@
+import asyncio
+import os
+import threading
+import time
+
+from datetime import datetime
+
+from news.database import connect, DB_PATH
+from news.metrics import RunMetrics, save_run
+from news.feeds import load_feeds
+from news.news_backend import clear_database, clear_RSS_feeds
+from news.pipeline import refresh, COUNTERS
+
+
+LOCK_PATH = "news/refresh.lock"
+STALE_LOCK = 30  # seconds an empty lock file may exist before it is stale
+
+_job = None
+_job_lock = threading.Lock()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def lock_owner(lock_path=LOCK_PATH):
+    """
+    Return the pid holding the refresh lock file, or None if it is free.
+    Lock files left behind by a process that died are treated as free.
+    """
+    try:
+        with open(lock_path) as f:
+            content = f.read().strip()
+        mtime = os.path.getmtime(lock_path)
+    except FileNotFoundError:
+        return None
+    if content.isdigit():
+        pid = int(content)
+        return pid if _pid_alive(pid) else None
+    # Lock file is still being written by the process that created it
+    return -1 if time.time() - mtime < STALE_LOCK else None
+
+
+def _acquire_lock(lock_path=LOCK_PATH):
+    for _ in range(2):
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if lock_owner(lock_path) is not None:
+                return False
+            # Stale lock: remove it and try once more
+            try:
+                os.remove(lock_path)
+            except FileNotFoundError:
+                pass
+            continue
+        with os.fdopen(fd, "w") as f:
+            f.write(str(os.getpid()))
+        return True
+    return False
+
+
+def _release_lock(lock_path=LOCK_PATH):
+    try:
+        os.remove(lock_path)
+    except FileNotFoundError:
+        pass
+
+
+class RefreshJob:
+    """
+    One news refresh running on a background thread.
+
+    The pipeline updates `stats` in place, so any thread can call
+    `progress()` while the job runs to get the stage counters, throughput
+    and an estimate of the time left. Stage latencies and per-source
+    results go to `metrics`, which is saved to the run history at the end.
+    """
+
+    def __init__(self, database=DB_PATH, lock_path=LOCK_PATH, **kwargs):
+        self.database = database
+        self.lock_path = lock_path
+        self.kwargs = kwargs
+        # Feeds the job was given; None refreshes rss_feeds.json as a whole
+        self.configured_feeds = kwargs.pop("feeds", None)
+        self.feeds = self.configured_feeds or load_feeds()
+        self.stats = dict.fromkeys(COUNTERS, 0)
+        self.metrics = RunMetrics()
+        self.stage = "starting"
+        self.error = None
+        self.started = None
+        self.finished = None
+        self._thread = threading.Thread(
+            target=self._run, name="news-refresh", daemon=True
+        )
+
+    def start(self):
+        self.started = datetime.now()
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self.stage = "refreshing"
+            asyncio.run(
+                refresh(
+                    self.database,
+                    feeds=self.feeds,
+                    stats=self.stats,
+                    metrics=self.metrics,
+                    **self.kwargs,
+                )
+            )
+            self.stage = "cleaning up"
+            clear_database(self.database)
+            # Only a refresh of the full feed list prunes the registry
+            clear_RSS_feeds(self.database, self.configured_feeds)
+            self.stage = "finished"
+        except Exception as e:
+            print(f"Error processing refresh: {e}")
+            self.error = e
+            self.stage = "failed"
+        finally:
+            self.finished = datetime.now()
+            self._save_metrics()
+            _release_lock(self.lock_path)
+
+    def _save_metrics(self):
+        # A run that cannot be recorded still counts as finished
+        try:
+            conn = connect(self.database)
+            try:
+                save_run(
+                    conn,
+                    self.metrics,
+                    self.stats,
+                    self.stage,
+                    None if self.error is None else str(self.error),
+                )
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Error saving refresh metrics: {e}")
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+        return self.stats
+
+    def progress(self):
+        """
+        Snapshot of the job: stage, counters, elapsed seconds, articles per
+        second and ETA in seconds (None until every feed has been polled).
+        """
+        stats = dict(self.stats)
+        end = self.finished or datetime.now()
+        elapsed = (end - self.started).total_seconds() if self.started else 0.0
+        done = stats["written"] + stats["failed"]
+        rate = done / elapsed if elapsed > 0 else 0.0
+        polled = stats["feeds_polled"] + stats["feeds_skipped"] + stats["feed_errors"]
+        eta = None
+        if self.running and polled >= len(self.feeds) and rate > 0:
+            eta = max(stats["links_due"] - done, 0) / rate
+        return {
+            "stage": self.stage,
+            "stats": stats,
+            "feeds_total": len(self.feeds),
+            "elapsed": elapsed,
+            "rate": rate,
+            "eta": eta,
+            "error": None if self.error is None else str(self.error),
+        }
+
+
+def current_job():
+    """
+    The refresh started from this process, if any (running or last finished).
+    """
+    return _job
+
+
+def start_refresh(database=DB_PATH, lock_path=LOCK_PATH, **kwargs):
+    """
+    Start a background refresh unless one is already running, here or in
+    another process holding the lock file. Returns the job started from this
+    process (the running one if there is one), or None if the refresh is
+    running elsewhere.
+    """
+    global _job
+    with _job_lock:
+        if _job is not None and _job.running:
+            return _job
+        if not _acquire_lock(lock_path):
+            return None
+        try:
+            job = RefreshJob(database, lock_path, **kwargs)
+            job.start()
+        except Exception:
+            _release_lock(lock_path)
+            raise
+        _job = job
+        return job
@@ -0,0 +1,360 @@
+from datetime import datetime
+
+from news.database import connect, bump_data_version, DB_PATH
+from news.ledger import (
+    DISCOVERED,
+    FETCHED,
+    FAILED,
+    SCORED,
+    RETRY_BACKOFF,
+)
+from news.bodies import content_hash
+from news.clusters import cluster_bodies
+from news.registry import record_polls
+from news.rollup import update_rollups
+from news.search import index_documents
+
+
+BATCH_SIZE = 500
+
+
+class ArticleWriter:
+    """
+    Single owner of the write connection during ingestion.
+
+    New feed entries and fetched results are buffered in memory and written
+    in bulk: each flush loads the buffered rows into temporary staging tables
+    with one executemany per table and applies them with set-based INSERT and
+    UPDATE statements, all inside a single transaction.
+
+    Every link also gets a row in link_ledger tracking where it is in the
+    pipeline, so new feed entries are de-duplicated against it in one query
+    and failed downloads are retried with exponential backoff.
+
+    Article bodies go to article_bodies once per content hash; the articles
+    row only keeps the hash.
+    """
+
+    def __init__(self, database=DB_PATH, batch_size=BATCH_SIZE, conn=None):
+        self.conn = conn if conn is not None else connect(database)
+        self._owns_conn = conn is None
+        self.batch_size = batch_size
+        self._new_articles = []
+        self._results = []
+        self._failures = []
+        self._feed_states = []
+        self._polls = []
+        self._discovered = []
+        self.conn.execute(
+            """
+            CREATE TEMP TABLE IF NOT EXISTS staging_articles (
+                title VARCHAR,
+                link VARCHAR,
+                published TIMESTAMP,
+                source VARCHAR,
+            )
+            """
+        )
+        self.conn.execute(
+            """
+            CREATE TEMP TABLE IF NOT EXISTS staging_results (
+                link VARCHAR,
+                content_hash VARCHAR,
+                content VARCHAR,
+                sentiment DOUBLE,
+                subjectivity DOUBLE,
+            )
+            """
+        )
+        self.conn.execute(
+            """
+            CREATE TEMP TABLE IF NOT EXISTS staging_failures (
+                link VARCHAR,
+                error VARCHAR,
+            )
+            """
+        )
+        self.conn.execute(
+            """
+            CREATE TEMP TABLE IF NOT EXISTS staging_feed_state (
+                source VARCHAR,
+                url VARCHAR,
+                etag VARCHAR,
+                modified VARCHAR,
+                seen_ids VARCHAR[],
+                last_status INTEGER,
+            )
+            """
+        )
+
+    def add_article(self, title, link, published, source):
+        """
+        Queue a newly discovered feed entry.
+        """
+        self._new_articles.append((title, link, published, source))
+        self._flush_if_full()
+
+    def add_result(self, link, content, sentiment, subjectivity):
+        """
+        Queue the content and sentiment of a fetched article. A result without
+        a sentiment leaves the link in the fetched state.
+        """
+        h = content_hash(content) if content is not None else None
+        self._results.append((link, h, content, sentiment, subjectivity))
+        self._flush_if_full()
+
+    def add_failure(self, link, error):
+        """
+        Queue a failed download so the link is retried after a backoff.
+        """
+        self._failures.append((link, str(error)[:500]))
+        self._flush_if_full()
+
+    def update_feed_state(self, source, url, etag, modified, seen_ids, status):
+        """
+        Queue the conditional GET validators and entry ids of a polled feed.
+        They are committed in the same transaction as the feed's entries.
+        """
+        self._feed_states.append(
+            (source, url, etag, modified, sorted(seen_ids), status)
+        )
+
+    def record_poll(self, source, error=None):
+        """
+        Queue the outcome of a feed poll for the feed registry, which
+        schedules the feed's next poll from it.
+        """
+        self._polls.append((source, error))
+
+    def take_discovered(self):
+        """
+        Return and forget the links that committed flushes added to the
+        ledger as newly discovered.
+        """
+        discovered, self._discovered = self._discovered, []
+        return discovered
+
+    def _flush_if_full(self):
+        pending = len(self._new_articles) + len(self._results) + len(self._failures)
+        if pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write all buffered rows in one transaction.
+        """
+        if not (
+            self._new_articles
+            or self._results
+            or self._failures
+            or self._feed_states
+            or self._polls
+        ):
+            return
+        now = datetime.now()
+        discovered = []
+        conn = self.conn
+        conn.begin()
+        try:
+            if self._new_articles:
+                discovered = self._flush_articles(now)
+            if self._results:
+                self._flush_results(now)
+            if self._failures:
+                self._flush_failures(now)
+            if self._feed_states:
+                self._flush_feed_states()
+            if self._polls:
+                record_polls(conn, self._polls, now)
+            if self._new_articles or self._results:
+                bump_data_version(conn)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        self._discovered.extend(discovered)
+        self._new_articles = []
+        self._results = []
+        self._failures = []
+        self._feed_states = []
+        self._polls = []
+
+    def _flush_articles(self, now):
+        conn = self.conn
+        conn.executemany(
+            "INSERT INTO staging_articles VALUES (?, ?, ?, ?)",
+            self._new_articles,
+        )
+        # Only links the ledger has never seen become articles
+        conn.execute(
+            """
+            CREATE OR REPLACE TEMP TABLE new_links AS
+            SELECT DISTINCT ON (link) s.*
+            FROM staging_articles s
+            ANTI JOIN link_ledger l USING (link)
+            """
+        )
+        conn.execute(
+            """
+            INSERT INTO articles (title, link, published, source)
+            SELECT title, link, published, source FROM new_links
+            ON CONFLICT DO NOTHING
+            """
+        )
+        conn.execute(
+            """
+            INSERT INTO link_ledger
+                (link, source, state, attempts, discovered_at, updated_at)
+            SELECT link, source, ?, 0, ?, ? FROM new_links
+            """,
+            (DISCOVERED, now, now),
+        )
+        index_documents(conn, "SELECT link, title AS text FROM new_links", "title")
+        conn.execute("DELETE FROM staging_articles")
+        return [row[0] for row in conn.execute("SELECT link FROM new_links").fetchall()]
+
+    def _flush_results(self, now):
+        conn = self.conn
+        conn.executemany(
+            "INSERT INTO staging_results VALUES (?, ?, ?, ?, ?)",
+            self._results,
+        )
+        # The articles as they are before this update
+        conn.execute(
+            """
+            CREATE OR REPLACE TEMP TABLE updated_articles AS
+            SELECT
+                s.link,
+                a.source,
+                a.published,
+                a.content_hash IS NULL AND s.content IS NOT NULL AS new_content,
+                s.content,
+                s.sentiment,
+                s.subjectivity,
+                a.sentiment AS old_sentiment,
+                a.subjectivity AS old_subjectivity,
+            FROM (SELECT DISTINCT ON (link) * FROM staging_results) AS s
+            JOIN articles a USING (link)
+            """
+        )
+        # Contents are indexed the first time an article gets one
+        index_documents(
+            conn,
+            "SELECT link, content AS text FROM updated_articles WHERE new_content",
+            "content",
+        )
+        update_rollups(
+            conn,
+            """
+            SELECT source, published, old_sentiment AS sentiment,
+                   old_subjectivity AS subjectivity
+            FROM updated_articles
+            """,
+            sign=-1,
+        )
+        update_rollups(conn, "SELECT * FROM updated_articles")
+        # Each distinct body is stored once, however many outlets ran it
+        conn.execute(
+            """
+            CREATE OR REPLACE TEMP TABLE new_bodies AS
+            SELECT DISTINCT ON (content_hash)
+                content_hash AS hash, content, sentiment, subjectivity
+            FROM staging_results
+            WHERE content_hash IS NOT NULL
+            ORDER BY content_hash, sentiment IS NULL
+            """
+        )
+        conn.execute(
+            """
+            UPDATE article_bodies
+            SET sentiment = b.sentiment, subjectivity = b.subjectivity
+            FROM new_bodies AS b
+            WHERE article_bodies.hash = b.hash
+              AND article_bodies.sentiment IS NULL
+              AND b.sentiment IS NOT NULL
+            """
+        )
+        conn.execute(
+            """
+            INSERT INTO article_bodies
+            SELECT hash, compress_body(content), sentiment, subjectivity
+            FROM new_bodies ANTI JOIN article_bodies USING (hash)
+            """
+        )
+        cluster_bodies(conn, "SELECT hash, content FROM new_bodies")
+        conn.execute("DROP TABLE new_bodies")
+        conn.execute(
+            """
+            UPDATE articles
+            SET content_hash = s.content_hash,
+                sentiment = s.sentiment,
+                subjectivity = s.subjectivity
+            FROM (
+                SELECT DISTINCT ON (link) * FROM staging_results
+            ) AS s
+            WHERE articles.link = s.link
+            """
+        )
+        conn.execute(
+            """
+            UPDATE link_ledger
+            SET state = CASE WHEN s.sentiment IS NULL THEN ? ELSE ? END,
+                last_error = NULL,
+                updated_at = ?
+            FROM (
+                SELECT DISTINCT ON (link) link, sentiment FROM staging_results
+            ) AS s
+            WHERE link_ledger.link = s.link
+            """,
+            (FETCHED, SCORED, now),
+        )
+        conn.execute("DELETE FROM staging_results")
+
+    def _flush_failures(self, now):
+        conn = self.conn
+        conn.executemany(
+            "INSERT INTO staging_failures VALUES (?, ?)",
+            self._failures,
+        )
+        conn.execute(
+            """
+            UPDATE link_ledger
+            SET state = ?,
+                attempts = attempts + 1,
+                next_attempt_at = ? + to_seconds(? * pow(2, attempts)),
+                last_error = s.error,
+                updated_at = ?
+            FROM (
+                SELECT DISTINCT ON (link) * FROM staging_failures
+            ) AS s
+            WHERE link_ledger.link = s.link
+            """,
+            (FAILED, now, RETRY_BACKOFF, now),
+        )
+        conn.execute("DELETE FROM staging_failures")
+
+    def _flush_feed_states(self):
+        conn = self.conn
+        conn.executemany(
+            "INSERT INTO staging_feed_state VALUES (?, ?, ?, ?, ?, ?)",
+            self._feed_states,
+        )
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO feed_state
+            SELECT DISTINCT ON (source) *, CURRENT_TIMESTAMP
+            FROM staging_feed_state
+            """
+        )
+        conn.execute("DELETE FROM staging_feed_state")
+
+    def close(self):
+        self.flush()
+        if self._owns_conn:
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,18 +1,170 @@
 import streamlit as st
-import pandas as pd
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
 import seaborn as sns
 
+from eda.datasets import (
+    load_crises,
+    load_adjusted_inflation,
+    load_country_series,
+    file_version,
+    CRISES_PATH,
+    OUTLIER_COUNTRIES,
+)
+from eda.charts import Chart, show, CONTENT_WIDTH
 
-df = pd.read_csv("data/african_crises.csv")
-df["banking_crisis"] = df["banking_crisis"].apply(lambda x: 1 if x == "crisis" else 0)
-df2 = df[df["country"].isin(["Angola", "Zimbabwe"])].copy()
 
-adjusted_df = df[["country", "year", "inflation_annual_cpi", "inflation_crises"]].copy()
-adjusted_df["inflation_annual_cpi"] = adjusted_df["inflation_annual_cpi"].apply(
-    lambda x: x if x < 100 else 100
-)
-adjusted_df2 = adjusted_df[adjusted_df["country"].isin(["Angola", "Zimbabwe"])].copy()
+def draw_heatmap(data, figsize):
+    fig = plt.figure(figsize=figsize)
+    sns.heatmap(data.corr(numeric_only=True), annot=True, cmap="coolwarm", fmt=".2f")
+    return fig
+
+
+def heatmap(data, figsize):
+    # Correlation heatmap of the numeric columns of `data`, annotated
+    corr = data.corr(numeric_only=True)
+    columns = list(corr.columns)
+    cells = corr.rename_axis("row").reset_index().melt(
+        id_vars="row", var_name="column", value_name="correlation"
+    )
+    position = {
+        "x": {"field": "column", "type": "nominal", "sort": columns, "title": None},
+        "y": {"field": "row", "type": "nominal", "sort": columns, "title": None},
+    }
+    spec = {
+        "height": int(CONTENT_WIDTH * figsize[1] / figsize[0]),
+        "layer": [
+            {
+                "mark": "rect",
+                "encoding": {
+                    **position,
+                    "color": {
+                        "field": "correlation",
+                        "type": "quantitative",
+                        "scale": {"scheme": "redblue", "reverse": True},
+                    },
+                },
+            },
+            {
+                "mark": {"type": "text", "fontSize": 9},
+                "encoding": {
+                    **position,
+                    "text": {"field": "correlation", "format": ".2f"},
+                },
+            },
+        ],
+    }
+    return Chart(spec, cells, draw_heatmap, data, figsize=figsize)
+
+
+def draw_inflation_grid(series, nrows, ncols, figsize, dpi=None):
+    # One line plot of the inflation rate per country of `series` (see
+    # country_series), with the inflation crises of the dataset marked
+    with sns.axes_style("whitegrid"):
+        fig, axes = plt.subplots(ncols=ncols, nrows=nrows, figsize=figsize, dpi=dpi)
+        axes = axes.flatten()
+        for (country, (years, inflation, crisis_years)), ax in zip(
+            series.items(), axes
+        ):
+            ax.plot(years, inflation, color="blue")
+            ax.set_xlabel("Year")
+            ax.set_ylabel("Inflation Rate")
+            ax.set_title("{}".format(country))
+            ax.vlines(
+                crisis_years,
+                0,
+                1,
+                transform=ax.get_xaxis_transform(),
+                colors="red",
+                linestyles="--",
+                linewidth=0.9,
+            )
+        fig.subplots_adjust(top=0.95)
+        for ax in axes[len(series) :]:
+            fig.delaxes(ax)
+        fig.tight_layout()
+    return fig
+
+
+def inflation_grid(series, nrows, ncols, figsize, dpi=None):
+    # The same grid as facets of one spec: a line per country and a rule
+    # for every year of the rows flagged as an inflation crisis
+    countries = list(series)
+    years, inflation, crises = zip(*series.values())
+    lines = pd.DataFrame(
+        {
+            "country": np.repeat(countries, [len(y) for y in years]),
+            "year": np.concatenate(years),
+            "inflation": np.concatenate(inflation),
+            "crisis": np.concatenate([np.isin(y, c) for y, c in zip(years, crises)]),
+        }
+    )
+    width = CONTENT_WIDTH // ncols - 60
+    year = {"field": "year", "type": "quantitative"}
+    spec = {
+        "facet": {
+            "field": "country",
+            "type": "nominal",
+            "sort": countries,
+            "title": None,
+        },
+        "columns": ncols,
+        "spec": {
+            "width": width,
+            "height": int(width * figsize[1] / nrows / (figsize[0] / ncols)),
+            "layer": [
+                {
+                    "mark": {"type": "line", "color": "blue"},
+                    "encoding": {
+                        "x": {
+                            **year,
+                            "title": "Year",
+                            "scale": {"zero": False},
+                            "axis": {"format": "d"},
+                        },
+                        "y": {
+                            "field": "inflation",
+                            "type": "quantitative",
+                            "title": "Inflation Rate",
+                        },
+                    },
+                },
+                {
+                    "transform": [{"filter": "datum.crisis"}],
+                    "mark": {
+                        "type": "rule",
+                        "color": "red",
+                        "strokeDash": [4, 3],
+                        "strokeWidth": 0.9,
+                    },
+                    "encoding": {"x": year},
+                },
+            ],
+        },
+        "resolve": {"scale": {"x": "independent", "y": "independent"}},
+    }
+    return Chart(
+        spec,
+        lines,
+        draw_inflation_grid,
+        series,
+        nrows=nrows,
+        ncols=ncols,
+        figsize=figsize,
+        dpi=dpi,
+    )
+
+
+# Parsed and typed once per version of the data file, not on every rerun
+df = load_crises()
+adjusted_df = load_adjusted_inflation()
+# Per-country arrays of the inflation graphs, grouped once
+series = load_country_series()
+adjusted_series = load_country_series(adjusted=True)
+outliers = {country: series[country] for country in OUTLIER_COUNTRIES}
+adjusted_outliers = {country: adjusted_series[country] for country in OUTLIER_COUNTRIES}
+version = file_version(CRISES_PATH)[1]
 
 st.title("Africa Economic, Banking and Systemic Crisis Data ")
 
@@ -67,9 +219,7 @@ if selected_view == "Data Overview":
 if selected_view == "Correlation Heatmap":
     st.header("Correlation Heatmap")
     st.write("This heatmap shows the correlation between the features in the dataset.")
-    fig = plt.figure(figsize=(12, 8))
-    sns.heatmap(df.corr(numeric_only=True), annot=True, cmap="coolwarm", fmt=".2f")
-    st.pyplot(fig)
+    show(heatmap(df, figsize=(12, 8)), "heatmap", version)
 
     st.write(
         """
@@ -88,30 +238,11 @@ if selected_view == "Correlation Heatmap":
 if selected_view == "Inflation Graphs":
     st.header("Inflation Graphs")
     st.write("Below we can see the plots for the inflation rate for each country. Included are the inflation crises marked in the dataset.")
-    sns.set_style("whitegrid")
-    fig, axes = plt.subplots(ncols=4, nrows=4, figsize=(12, 9))
-    axes = axes.flatten()
-    for i, ax in zip(df["country"].unique(), axes):
-        sns.lineplot(
-            x="year",
-            y="inflation_annual_cpi",
-            data=df[df["country"] == i],
-            ax=ax,
-            color="blue",
-        )
-        ax.set_xlabel("Year")
-        ax.set_ylabel("Inflation Rate")
-        ax.set_title("{}".format(i))
-        inflation = df[(df["country"] == i) & (df["inflation_crises"] == 1)][
-            "year"
-        ].unique()
-        for i in inflation:
-            ax.axvline(x=i, color="red", linestyle="--", linewidth=0.9)
-    fig.subplots_adjust(top=0.95)
-    for i in range(13, 16):
-        fig.delaxes(axes[i])
-    plt.tight_layout()
-    st.pyplot(fig)
+    show(
+        inflation_grid(series, nrows=4, ncols=4, figsize=(12, 9)),
+        "inflation_grid",
+        version,
+    )
 
     st.write(
         """
@@ -123,29 +254,11 @@ if selected_view == "Inflation Graphs":
 """
     )
 
-    fig2, axes = plt.subplots(ncols=1, nrows=2, figsize=(12, 9))
-    axes = axes.flatten()
-    for i, ax in zip(df2["country"].unique(), axes):
-        sns.lineplot(
-            x="year",
-            y="inflation_annual_cpi",
-            data=df2[df2["country"] == i],
-            ax=ax,
-            color="blue",
-        )
-        ax.set_xlabel("Year")
-        ax.set_ylabel("Inflation Rate")
-        ax.set_title("{}".format(i))
-        inflation = df2[(df2["country"] == i) & (df2["inflation_crises"] == 1)][
-            "year"
-        ].unique()
-        for i in inflation:
-            ax.axvline(x=i, color="red", linestyle="--", linewidth=0.9)
-    fig2.subplots_adjust(top=0.95)
-    # for i in range(13, 16):
-    #     fig2.delaxes(axes2[i])
-    plt.tight_layout()
-    st.pyplot(fig2)
+    show(
+        inflation_grid(outliers, nrows=2, ncols=1, figsize=(12, 9)),
+        "inflation_outliers",
+        version,
+    )
 
 if selected_view == "Adjusted Inflation Graphs":
     st.header("Adjusted Inflation Graphs")
@@ -155,30 +268,11 @@ if selected_view == "Adjusted Inflation Graphs":
             """
     )
 
-    sns.set_style("whitegrid")
-    fig2, axes = plt.subplots(ncols=1, nrows=2, figsize=(12, 9))
-    axes = axes.flatten()
-    for i, ax in zip(adjusted_df2["country"].unique(), axes):
-        sns.lineplot(
-            x="year",
-            y="inflation_annual_cpi",
-            data=adjusted_df2[adjusted_df2["country"] == i],
-            ax=ax,
-            color="blue",
-        )
-        ax.set_xlabel("Year")
-        ax.set_ylabel("Inflation Rate")
-        ax.set_title("{}".format(i))
-        inflation = adjusted_df2[
-            (adjusted_df2["country"] == i) & (adjusted_df2["inflation_crises"] == 1)
-        ]["year"].unique()
-        for i in inflation:
-            ax.axvline(x=i, color="red", linestyle="--", linewidth=0.9)
-    fig2.subplots_adjust(top=0.95)
-    # for i in range(13, 16):
-    #     fig2.delaxes(axes2[i])
-    plt.tight_layout()
-    st.pyplot(fig2)
+    show(
+        inflation_grid(adjusted_outliers, nrows=2, ncols=1, figsize=(12, 9)),
+        "adjusted_inflation_outliers",
+        version,
+    )
 
     st.write(
         """
@@ -187,11 +281,7 @@ if selected_view == "Adjusted Inflation Graphs":
              Below we can also see the correlation heatmap for the adjusted data, and this also shows a much higher correlation between inflation rate and inflation crisis.
             """
     )
-    fig = plt.figure(figsize=(12, 8))
-    sns.heatmap(
-        adjusted_df.corr(numeric_only=True), annot=True, cmap="coolwarm", fmt=".2f"
-    )
-    st.pyplot(fig)
+    show(heatmap(adjusted_df, figsize=(12, 8)), "adjusted_heatmap", version)
 
     st.write(
         """
@@ -199,29 +289,11 @@ if selected_view == "Adjusted Inflation Graphs":
             """
     )
 
-    fig, axes = plt.subplots(ncols=4, nrows=4, figsize=(28, 22), dpi=60)
-    axes = axes.flatten()
-    for i, ax in zip(adjusted_df["country"].unique(), axes):
-        sns.lineplot(
-            x="year",
-            y="inflation_annual_cpi",
-            data=adjusted_df[adjusted_df["country"] == i],
-            ax=ax,
-            color="blue",
-        )
-        ax.set_xlabel("Year")
-        ax.set_ylabel("Inflation Rate")
-        ax.set_title("{}".format(i))
-        inflation = adjusted_df[
-            (adjusted_df["country"] == i) & (adjusted_df["inflation_crises"] == 1)
-        ]["year"].unique()
-        for i in inflation:
-            ax.axvline(x=i, color="red", linestyle="--", linewidth=0.9)
-    fig.subplots_adjust(top=0.95)
-    for i in range(13, 16):
-        fig.delaxes(axes[i])
-    plt.tight_layout()
-    st.pyplot(fig)
+    show(
+        inflation_grid(adjusted_series, nrows=4, ncols=4, figsize=(28, 22), dpi=60),
+        "adjusted_inflation_grid",
+        version,
+    )
     st.markdown(
         """
     **Key Insight:**
@@ -1,26 +1,17 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.model_selection import train_test_split
 from sklearn import metrics
 import matplotlib.patches as mpatches
 
+from eda.charts import bar_chart, show
+from eda.datasets import load_attrition, ATTRITION_CATEGORICAL
 
-df = pd.read_csv("data/Employee-Attrition.xls")
-df.drop(
-    ["EmployeeCount", "EmployeeNumber", "Over18", "StandardHours"],
-    axis="columns",
-    inplace=True,
-)
 
-categorical_col = []
-for column in df.columns:
-    if df[column].dtype == object and len(df[column].unique()) <= 50:
-        categorical_col.append(column)
+# Parsed and typed once per version of the data file, not on every rerun
+df = load_attrition()
 
-df["Attrition"] = df.Attrition.astype("category").cat.codes
+categorical_col = ATTRITION_CATEGORICAL
 
 st.title("Employee Attrition Prediction")
 
@@ -55,82 +46,78 @@ if selected_view == "Data Overview":
         i / j * 100 for i, j in zip(attrition["Attrition"], total["Attrition"])
     ]
     # Create graph of attrition percentage by age
-    fig = plt.figure()
-    sns.barplot(
-        x="Age",
-        y="percent_attrition",
-        data=attrition,
-        color="darkblue",
-    )
-    plt.ylim(0, 115)
-    plt.ylabel("Attrition Percentage")
-    plt.xlabel("Age")
-    plt.title("Attrition Percentage by Age")
-    plt.tick_params(labelsize=7)
-    st.pyplot(fig)
-
-    # Create copy df with 10 MonthlyIncome buckets and attrition percentage for each bucket
-    bins = pd.IntervalIndex.from_tuples([(0, 2900), (2900, 4800), (4800, 6700), (6700, 8600), (8600, 10500), (10500, 12400), (12400, 14300), (14300, 16200), (16200, 18100), (18100, 20000)])
-    income_bins = pd.cut(
-        df["MonthlyIncome"], 
-        bins, 
-        include_lowest=True, 
-        ordered=True
-    )
-
-    df["MonthlyIncomeBracket"] = income_bins
-
+    show(
+        bar_chart(
+            attrition,
+            x="Age",
+            y="percent_attrition",
+            color="darkblue",
+            title="Attrition Percentage by Age",
+            x_title="Age",
+            y_title="Attrition Percentage",
+            y_max=115,
+            label_size=7,
+        )
+    )
+
+    # Attrition percentage for each of the 10 MonthlyIncome buckets
     attrition = (
         df[df["Attrition"] == 1]
         .groupby("MonthlyIncomeBracket", observed=False)["Attrition"]
         .count()
         .reset_index()
     )
-    total = df.groupby("MonthlyIncomeBracket")["Attrition"].count().reset_index()
+    total = (
+        df.groupby("MonthlyIncomeBracket", observed=False)["Attrition"]
+        .count()
+        .reset_index()
+    )
     attrition["percent_attrition"] = [
         i / j * 100 for i, j in zip(attrition["Attrition"], total["Attrition"])
     ]
 
-    # Create graph of attrition percentage by MonthlyIncome
-    fig = plt.figure()
-    sns.barplot(
-        x="MonthlyIncomeBracket",
-        y="percent_attrition",
-        data=attrition,
-        color="darkblue",
+    # Create graph of attrition percentage by MonthlyIncome, the brackets
+    # labelled the way they print
+    attrition["MonthlyIncomeBracket"] = attrition["MonthlyIncomeBracket"].astype(str)
+    show(
+        bar_chart(
+            attrition,
+            x="MonthlyIncomeBracket",
+            y="percent_attrition",
+            color="darkblue",
+            title="Attrition Percentage by Monthly Income",
+            x_title="Monthly Income",
+            y_title="Attrition Percentage",
+            y_max=115,
+            label_angle=45,  # Rotate x-axis labels for better readability
+        )
     )
-    plt.ylim(0, 115)
-    plt.ylabel("Attrition Percentage")
-    plt.xlabel("Monthly Income")
-    plt.title("Attrition Percentage by Monthly Income")
-    plt.xticks(rotation=45)  # Rotate x-axis labels for better readability
-    st.pyplot(fig)
 
     # Create barplot of attrition percentage by OverTime
     attrition = (
         df[df["Attrition"] == 1]
-        .groupby("OverTime")["Attrition"]
+        .groupby("OverTime", observed=False)["Attrition"]
         .count()
         .reset_index()
     )
-    total = df.groupby("OverTime")["Attrition"].count().reset_index()
+    total = df.groupby("OverTime", observed=False)["Attrition"].count().reset_index()
     attrition["percent_attrition"] = [
         i / j * 100 for i, j in zip(attrition["Attrition"], total["Attrition"])
     ]
     # Create graph of attrition percentage by OverTime
-    fig = plt.figure()
-    sns.barplot(
-        x="OverTime",
-        y="percent_attrition",
-        data=attrition,
-        color="darkblue",
+    show(
+        bar_chart(
+            attrition,
+            x="OverTime",
+            y="percent_attrition",
+            color="darkblue",
+            title="Attrition Percentage by OverTime",
+            x_title="OverTime",
+            y_title="Attrition Percentage",
+            y_max=115,
+            label_angle=45,  # Rotate x-axis labels for better readability
+        )
     )
-    plt.ylim(0, 115)
-    plt.ylabel("Attrition Percentage")
-    plt.xlabel("OverTime")
-    plt.title("Attrition Percentage by OverTime")
-    plt.xticks(rotation=45)  # Rotate x-axis labels for better readability
-    st.pyplot(fig)
 
     st.markdown("""
     As we can see from the graph there is some correlation between age and attrition, however it would be hard to use any single feature to predict attrition.
@@ -1,8 +1,43 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import duckdb
+
+from eda.charts import bar_chart, line_chart, show
+from news.database import connect, data_version
+from news.search import search
+
+
+@st.cache_resource
+def get_connection():
+    # One database instance for the whole server process. Every session
+    # reads through its own cursor on it, and the background refresh's
+    # writer connects to the same instance, so readers see committed
+    # snapshots instead of conflicting with it.
+    return connect()
+
+
+@st.cache_data(max_entries=64)
+def cached_query(query, params, version):
+    # Keyed on the data version as well, so results are reused until an
+    # ingest commits new data
+    with get_connection().cursor() as cursor:
+        return cursor.execute(query, params).fetchdf()
+
+
+@st.cache_data(max_entries=64)
+def cached_search(keyword, field, version):
+    with get_connection().cursor() as cursor:
+        return search(cursor, keyword, field=field)
+
+
+def current_version():
+    with get_connection().cursor() as cursor:
+        return data_version(cursor)
+
+
+def latest_run():
+    # Run history is not part of the data version, so its cached results
+    # are keyed on the last recorded run instead
+    with get_connection().cursor() as cursor:
+        return cursor.execute("SELECT MAX(started) FROM pipeline_runs").fetchone()[0]
 
 
 st.title("Sentiment-Analyzed News by Topic")
@@ -12,12 +47,14 @@ st.title("Sentiment-Analyzed News by Topic")
 pages = [
     "News Sources Overview",
     "Filter by Topic",
+    "Compare Story Coverage",
     "Update News",
+    "Pipeline Health",
 ]
 selected_view = st.sidebar.selectbox("Select View", pages)
 
 if selected_view == "News Sources Overview":
-    conn = duckdb.connect(database="news/news.db", read_only=False)
+    version = current_version()
     st.markdown(
         """
     This is a streamlit app to showcase an approach to analyze topics as they are covered by different news sources.
@@ -32,16 +69,19 @@ if selected_view == "News Sources Overview":
     """
     )
 
-    # Select statement to get the average sentiment  grouped by source
+    # Select statement to get the average sentiment grouped by source from
+    # the daily rollup, which the writer keeps up to date on ingest. Values
+    # are rounded in SQL so the result goes to the charts as it is.
     query = """
-    SELECT source, AVG(sentiment) as sentiment, AVG(subjectivity) as subjectivity
-    FROM articles
+    SELECT
+        source,
+        ROUND(SUM(sentiment_sum) / SUM(articles), 2) as sentiment,
+        ROUND(SUM(subjectivity_sum) / SUM(articles), 2) as subjectivity
+    FROM daily_sentiment
     GROUP BY source
     ORDER BY sentiment DESC
     """
-    df = conn.execute(query).fetchdf()
-    df["sentiment"] = df["sentiment"].round(2)
-    df["subjectivity"] = df["subjectivity"].round(2)
+    df = cached_query(query, (), version)
 
     st.header("Average Sentiment score by source")
     st.markdown(
@@ -51,12 +91,16 @@ if selected_view == "News Sources Overview":
     )
 
     # Create a bar plot of the average sentiment by source
-    fig, ax = plt.subplots()
-    sns.barplot(x="sentiment", y="source", data=df, ax=ax)
-    ax.set_title("Average Sentiment by Source")
-    ax.set_xlabel("Average Sentiment")
-    ax.set_ylabel("Source")
-    st.pyplot(fig)
+    show(
+        bar_chart(
+            df,
+            x="sentiment",
+            y="source",
+            title="Average Sentiment by Source",
+            x_title="Average Sentiment",
+            y_title="Source",
+        )
+    )
 
     # Create a bar plot of the average subjectivity by source
     st.header("Average Subjectivity score by source")
@@ -65,30 +109,27 @@ if selected_view == "News Sources Overview":
     The average subjectivity score of the news sources is shown below. The subjectivity score is a value between 0 and 1, where 0 is very objective and 1 is very subjective.
     """
     )
-    fig, ax = plt.subplots()
-    sns.barplot(
-        x="subjectivity",
-        y="source",
-        data=df,
-        ax=ax,
-        order=df.sort_values("subjectivity")["source"],
+    show(
+        bar_chart(
+            df,
+            x="subjectivity",
+            y="source",
+            order=df.sort_values("subjectivity")["source"],
+            title="Average Subjectivity by Source",
+            x_title="Average Subjectivity",
+            y_title="Source",
+        )
     )
-    ax.set_title("Average Subjectivity by Source")
-    ax.set_xlabel("Average Subjectivity")
-    ax.set_ylabel("Source")
-    st.pyplot(fig)
 
     # Select statement to get the average sentiment grouped by date
     query = """
-    SELECT published as date, AVG(sentiment) as sentiment
-    FROM articles
+    SELECT day as date, ROUND(SUM(sentiment_sum) / SUM(articles), 2) as sentiment
+    FROM daily_sentiment
+    WHERE day IS NOT NULL
     GROUP BY date
     ORDER BY date
     """
-    df = conn.execute(query).fetchdf()
-    df["date"] = pd.to_datetime(df["date"])
-    df["date"] = df["date"].dt.date
-    df["sentiment"] = df["sentiment"].round(2)
+    df = cached_query(query, (), version)
     st.header("Average Sentiment score over time")
     st.markdown(
         """
@@ -96,17 +137,18 @@ if selected_view == "News Sources Overview":
         """
     )
     # Create a line plot of the average sentiment over time
-    fig, ax = plt.subplots()
-    sns.lineplot(x="date", y="sentiment", data=df, ax=ax)
-    ax.set_title("Average Sentiment over Time")
-    ax.set_xlabel("Date")
-    ax.set_ylabel("Average Sentiment")
-    plt.xticks(rotation=45)
-    st.pyplot(fig)
-    conn.close()
+    show(
+        line_chart(
+            df,
+            x="date",
+            y="sentiment",
+            title="Average Sentiment over Time",
+            x_title="Date",
+            y_title="Average Sentiment",
+        )
+    )
 
 if selected_view == "Filter by Topic":
-    conn = duckdb.connect(database="news/news.db", read_only=False)
     st.markdown(
         """
     This page allows you to filter the news articles by a keyword. You can enter a keyword  and select from a dropdown menu if you want to search in the title or content of the article.
@@ -120,93 +162,331 @@ if selected_view == "Filter by Topic":
     # Button to search
     if st.button("Search"):
         if keyword:
-            # Select statement to get the articles that contain the keyword in the title or content
-            query = f"""
-            SELECT * FROM articles
-            WHERE LOWER({search_in}) LIKE LOWER('%{keyword}%')
-            """
-            df = conn.execute(query).fetchdf()
+            # Look the keyword up in the search index, best matches first
+            df = cached_search(keyword, search_in, current_version())
             if df.empty:
                 st.write("No articles found")
             else:
                 st.write(f"Found {len(df)} articles")
                 # Display the articles in a table
                 st.dataframe(
-                    df[
-                        [
-                            "title",
-                            "link",
-                            "published",
-                            "source",
-                            "sentiment",
-                            "subjectivity",
-                        ]
+                    df,
+                    column_order=[
+                        "title",
+                        "link",
+                        "published",
+                        "source",
+                        "sentiment",
+                        "subjectivity",
                     ],
                     column_config={"link": st.column_config.LinkColumn()},
                 )
                 # Create a bar plot of the sentiment of the articles
-                fig, ax = plt.subplots()
-                sns.barplot(x="sentiment", y="source", data=df, ax=ax)
-                ax.set_title("Sentiment by Source")
-                ax.set_xlabel("Sentiment")
-                ax.set_ylabel("Source")
-                st.pyplot(fig)
+                show(
+                    bar_chart(
+                        df,
+                        x="sentiment",
+                        y="source",
+                        title="Sentiment by Source",
+                        x_title="Sentiment",
+                        y_title="Source",
+                    )
+                )
                 # Create a bar plot of the subjectivity of the articles
-                fig, ax = plt.subplots()
-                sns.barplot(x="subjectivity", y="source", data=df, ax=ax)
-                ax.set_title("Subjectivity by Source")
-                ax.set_xlabel("Subjectivity")
-                ax.set_ylabel("Source")
-                st.pyplot(fig)
-                # Create a line plot of the sentiment over time
-                df["published"] = pd.to_datetime(df["published"])
-                df["published"] = df["published"].dt.date
-                fig, ax = plt.subplots()
-                sns.lineplot(x="published", y="sentiment", data=df, ax=ax)
-                ax.set_title("Sentiment over Time")
-                ax.set_xlabel("Date")
-                ax.set_ylabel("Sentiment")
-                plt.xticks(rotation=45)
-                st.pyplot(fig)
+                show(
+                    bar_chart(
+                        df,
+                        x="subjectivity",
+                        y="source",
+                        title="Subjectivity by Source",
+                        x_title="Subjectivity",
+                        y_title="Source",
+                    )
+                )
+                # Create a line plot of the sentiment over time, by the
+                # publication day the search query already truncated to
+                show(
+                    line_chart(
+                        df,
+                        x="day",
+                        y="sentiment",
+                        title="Sentiment over Time",
+                        x_title="Date",
+                        y_title="Sentiment",
+                    )
+                )
 
         else:
             st.write("Please enter a keyword to search for")
 
 
-if selected_view == "Update News":
-    from news.news_backend import (
-        get_rss_feeds,
-        get_links,
-        get_sentiment_from_text,
-        clear_database,
-        clear_RSS_feeds,
-        progressbar,
-        add_content,
-        add_sentiment,
+if selected_view == "Compare Story Coverage":
+    version = current_version()
+    st.markdown(
+        """
+    This page groups the articles that cover the same story across news sources, even when their texts differ slightly, and compares the sentiment each source gave it.
+    Pick one of the stories covered by the most sources to see the comparison.
+    """
     )
 
+    # Stories covered by at least two sources, named after their first article
+    query = """
+    SELECT
+        c.cluster,
+        first(a.title ORDER BY a.published) as title,
+        COUNT(DISTINCT a.source) as sources,
+        COUNT(*) as articles
+    FROM articles a JOIN story_signatures c ON c.hash = a.content_hash
+    WHERE a.sentiment IS NOT NULL
+    GROUP BY c.cluster
+    HAVING COUNT(DISTINCT a.source) >= 2
+    ORDER BY sources DESC, articles DESC
+    LIMIT 50
+    """
+    stories = cached_query(query, (), version)
+    if stories.empty:
+        st.write("No story is covered by more than one source yet")
+    else:
+        selected = st.selectbox(
+            "Select Story",
+            stories.index,
+            format_func=lambda i: f"{stories['title'][i]} ({stories['sources'][i]} sources)",
+        )
+        query = """
+        SELECT
+            a.source,
+            ROUND(AVG(a.sentiment), 2) as sentiment,
+            ROUND(AVG(a.subjectivity), 2) as subjectivity,
+            COUNT(*) as articles
+        FROM articles a JOIN story_signatures c ON c.hash = a.content_hash
+        WHERE c.cluster = ? AND a.sentiment IS NOT NULL
+        GROUP BY a.source
+        ORDER BY sentiment DESC
+        """
+        df = cached_query(query, (stories["cluster"][selected],), version)
+
+        # Create a bar plot of the sentiment each source gave the story
+        show(
+            bar_chart(
+                df,
+                x="sentiment",
+                y="source",
+                title="Sentiment by Source",
+                x_title="Sentiment",
+                y_title="Source",
+            )
+        )
+        # Create a bar plot of the subjectivity each source gave the story
+        show(
+            bar_chart(
+                df,
+                x="subjectivity",
+                y="source",
+                title="Subjectivity by Source",
+                x_title="Subjectivity",
+                y_title="Source",
+            )
+        )
+
+        query = """
+        SELECT a.title, a.link, a.published, a.source, a.sentiment, a.subjectivity
+        FROM articles a JOIN story_signatures c ON c.hash = a.content_hash
+        WHERE c.cluster = ?
+        ORDER BY a.published
+        """
+        st.dataframe(
+            cached_query(query, (stories["cluster"][selected],), version),
+            column_config={"link": st.column_config.LinkColumn()},
+        )
+
+
+if selected_view == "Update News":
+    from news.worker import start_refresh, current_job, lock_owner
+
     st.markdown(
         """
     You can update the news articles by clicking the button below. This will fetch the latest news articles from the predefined RSS feeds and store them in the database.\
     
 
-    **Caution:**
-    This takes a long time, more than 5 minutes to run so I recommend exploring the rest of the project first as the results can be skewed while the update is running.
+    **Note:**
+    The update runs in the background, so you can keep exploring the rest of the project while it is running. Only one update runs at a time.
     """
     )
 
-    # Button to run the news/news_backend.py script
+    # Button to start a background refresh, shared by all sessions
     if st.button("Update news"):
-        st.write("Updating articles from RSS feeds...")
-        get_rss_feeds()
-        st.write("Finished updating articles from RSS feeds")
-        st.write("Updating sentiment of articles...")
-        get_links()
-        st.write("Finished updating sentiment of articles")
-        st.write("Clearing database")
-        clear_database()
-        st.write("Finished clearing database")
-        st.write("Clearing RSS feeds")
-        clear_RSS_feeds()
-        st.write("Finished clearing RSS feeds")
-        # Run the script
+        if start_refresh() is None:
+            st.write("An update started outside this app is already running")
+
+    @st.fragment(run_every=2)
+    def refresh_progress():
+        job = current_job()
+        if job is None:
+            if lock_owner() is not None:
+                st.write("An update started outside this app is running")
+            return
+        progress = job.progress()
+        stats = progress["stats"]
+        if job.running:
+            st.write(f"Update {progress['stage']}...")
+        elif progress["error"]:
+            st.write(f"Update failed: {progress['error']}")
+        else:
+            st.write("Last update finished")
+        st.write(
+            f"Feeds polled: {stats['feeds_polled'] + stats['feed_errors']}"
+            f"/{progress['feeds_total']} ({stats['feeds_skipped']} not due, "
+            f"{stats['feed_errors']} errors)"
+        )
+        st.write(
+            f"Articles: {stats['links_due']} found, {stats['fetched']} fetched, "
+            f"{stats['parsed']} parsed, {stats['scored']} scored, "
+            f"{stats['duplicates']} duplicates, "
+            f"{stats['written']} written, {stats['failed']} failed"
+        )
+        eta = progress["eta"]
+        st.write(
+            f"Elapsed: {progress['elapsed']:.0f}s, "
+            f"{progress['rate']:.1f} articles/s"
+            + (f", about {eta:.0f}s left" if eta is not None else "")
+        )
+
+    refresh_progress()
+
+
+if selected_view == "Pipeline Health":
+    run = latest_run()
+    st.markdown(
+        """
+    This page shows how the recent news updates went: how many articles each stage handled, how long each stage took per item and which news sources failed most often.
+    """
+    )
+
+    # Select statement to get the recent runs with their main counters
+    query = """
+    SELECT
+        r.run_id,
+        r.started,
+        ROUND(epoch(r.finished - r.started)) as seconds,
+        r.status,
+        SUM(c.value) FILTER (WHERE c.counter = 'links_due') as found,
+        SUM(c.value) FILTER (WHERE c.counter = 'written') as written,
+        SUM(c.value) FILTER (WHERE c.counter = 'duplicates') as duplicates,
+        SUM(c.value) FILTER (WHERE c.counter = 'failed') as failed,
+        (
+            SELECT ROUND(SUM(bytes) / 1e6, 1) FROM pipeline_sources s
+            WHERE s.run_id = r.run_id
+        ) as downloaded_mb,
+        r.error,
+    FROM pipeline_runs r LEFT JOIN pipeline_counters c USING (run_id)
+    GROUP BY ALL
+    ORDER BY r.started DESC
+    LIMIT 20
+    """
+    runs = cached_query(query, (), run)
+    if runs.empty:
+        st.write("No update has been recorded yet")
+    else:
+        st.header("Recent updates")
+        st.dataframe(runs, column_order=list(runs.columns[1:]))
+
+        selected = st.selectbox(
+            "Select Update",
+            runs.index,
+            format_func=lambda i: f"{runs['started'][i]} ({runs['status'][i]})",
+        )
+        run_id = runs["run_id"][selected]
+
+        # Stage latencies, with percentiles estimated from the histogram as
+        # the upper bound of the bucket they fall in
+        query = """
+        WITH buckets AS (
+            SELECT
+                stage,
+                le_ms,
+                SUM(observations) OVER (PARTITION BY stage ORDER BY le_ms) as seen,
+                SUM(observations) OVER (PARTITION BY stage) as total
+            FROM pipeline_latency
+            WHERE run_id = ?
+        )
+        SELECT
+            s.stage,
+            s.observations as items,
+            ROUND(1000 * s.total_seconds / NULLIF(s.observations, 0), 1) as mean_ms,
+            MIN(b.le_ms) FILTER (WHERE b.seen >= 0.5 * b.total) as p50_ms,
+            MIN(b.le_ms) FILTER (WHERE b.seen >= 0.95 * b.total) as p95_ms,
+            ROUND(1000 * s.max_seconds, 1) as max_ms,
+        FROM pipeline_stages s JOIN buckets b USING (stage)
+        WHERE s.run_id = ? AND s.observations > 0
+        GROUP BY ALL
+        ORDER BY mean_ms DESC NULLS LAST
+        """
+        stages = cached_query(query, (run_id, run_id), run)
+        st.header("Stage latency")
+        st.markdown(
+            """
+        Time per item in each stage. Articles are scored in batches, so each one counts with its share of its batch's time. The percentiles are the upper bound of the histogram bucket they fall in.
+        """
+        )
+        st.dataframe(stages)
+        show(
+            bar_chart(
+                stages,
+                x="mean_ms",
+                y="stage",
+                title="Mean Latency by Stage",
+                x_title="Milliseconds per Item",
+                y_title="Stage",
+            )
+        )
+
+        # Select statement to get the error rate of every source and stage
+        query = """
+        SELECT
+            source,
+            stage,
+            ok,
+            errors,
+            ROUND(errors / (ok + errors), 2) as error_rate,
+            ROUND(bytes / 1e6, 2) as downloaded_mb,
+        FROM pipeline_sources
+        WHERE run_id = ?
+        ORDER BY error_rate DESC, errors DESC
+        """
+        sources = cached_query(query, (run_id,), run)
+        st.header("Errors by source")
+        st.dataframe(sources)
+        failing = sources[sources["errors"] > 0]
+        if not failing.empty:
+            show(
+                bar_chart(
+                    failing,
+                    x="error_rate",
+                    y="source",
+                    hue="stage",
+                    title="Error Rate by Source",
+                    x_title="Error Rate",
+                    y_title="Source",
+                )
+            )
+
+        # Select statement to get the polling schedule of every feed
+        query = """
+        SELECT
+            source,
+            ROUND(rate * 24, 1) as articles_per_day,
+            last_success,
+            failures,
+            next_poll,
+            last_error,
+        FROM feed_registry
+        ORDER BY next_poll NULLS FIRST
+        """
+        schedule = cached_query(query, (), run)
+        st.header("Feed schedule")
+        st.markdown(
+            """
+        Busy feeds are polled often and quiet ones rarely. A feed that keeps failing is polled less and less often, up to once a week.
+        """
+        )
+        st.dataframe(schedule)
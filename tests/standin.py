@@ -0,0 +1,70 @@
+"""
+Local HTTP stand-in for news sites, serving the canned article pages of
+tests/pages.
+"""
+import os
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+PAGES_DIR = os.path.join(os.path.dirname(__file__), "pages")
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    /article/<name> is tests/pages/<name>.html, /slow/<name> the same page
+    after `delay` seconds, and anything else a 404. Every request is logged
+    as (monotonic time, path) in `requests`.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.requests.append((time.monotonic(), self.path))
+        kind, _, name = self.path.strip("/").partition("/")
+        page = os.path.join(PAGES_DIR, f"{name}.html")
+        if kind not in ("article", "slow") or not os.path.isfile(page):
+            self.send_error(404)
+            return
+        if kind == "slow":
+            time.sleep(self.server.delay)
+        with open(page, "rb") as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StandIn:
+    """
+    The stand-in running on a free local port, as a context manager.
+    `url(path)` is the address of `path` on it.
+    """
+
+    def __init__(self, delay=2.0):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        self.server.daemon_threads = True
+        self.server.delay = delay
+        self.server.requests = []
+
+    @property
+    def requests(self):
+        return self.server.requests
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.server.shutdown()
+        self.server.server_close()
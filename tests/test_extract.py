@@ -0,0 +1,44 @@
+import newspaper
+import pytest
+
+from newspaper.article import ArticleException
+
+from news.extract import extract_text
+from news.fetcher import make_config, parse_article, MIN_TEXT_WORDS
+from tests.standin import PAGES_DIR
+
+
+def page(name):
+    with open(f"{PAGES_DIR}/{name}.html", encoding="utf-8") as f:
+        return f.read()
+
+
+def downloaded(name):
+    article = newspaper.Article("http://localhost/article", config=make_config())
+    article.download(input_html=page(name))
+    return article
+
+
+def test_text_of_paragraphs_inside_a_form():
+    text = extract_text(page("webforms"))
+    assert text.startswith("The county council approved four new bus routes")
+    assert text.endswith("before it is fixed.")
+    assert text.count("\n\n") == 3
+
+
+def test_text_only_parse_falls_back_to_newspaper():
+    assert len(extract_text(page("linebreaks")).split()) < MIN_TEXT_WORDS
+    text = parse_article(downloaded("linebreaks"), text_only=True)
+    assert "The harbour reopened to fishing boats on Monday" in text
+    assert "driving up fuel costs for the whole fleet" in text
+
+
+def test_text_only_parse_keeps_the_extracted_text():
+    text = parse_article(downloaded("election"), text_only=True)
+    assert text == extract_text(page("election"))
+
+
+@pytest.mark.parametrize("text_only", [True, False])
+def test_pages_without_text_fail(text_only):
+    with pytest.raises(ArticleException):
+        parse_article(downloaded("nav_only"), text_only=text_only)
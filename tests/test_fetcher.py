@@ -0,0 +1,69 @@
+import pytest
+
+from news.extract import extract_text
+from news.fetcher import fetch_articles
+from tests.standin import StandIn, PAGES_DIR
+
+
+def canned_text(name):
+    with open(f"{PAGES_DIR}/{name}.html", encoding="utf-8") as f:
+        return extract_text(f.read())
+
+
+@pytest.fixture
+def standin():
+    with StandIn(delay=2.0) as server:
+        yield server
+
+
+def fetch(links, **kwargs):
+    kwargs.setdefault("per_host_rate", 0)
+    kwargs.setdefault("cache_dir", None)
+    results = fetch_articles(links, **kwargs)
+    return {link: (text, error) for link, text, error in results}
+
+
+def test_fetches_and_parses_every_link(standin):
+    links = [standin.url("/article/election"), standin.url("/article/storm")]
+    results = fetch(links, max_workers=2)
+    assert results == {
+        links[0]: (canned_text("election"), None),
+        links[1]: (canned_text("storm"), None),
+    }
+    assert "Voters turned out" in results[links[0]][0]
+    assert "Related" not in results[links[0]][0]
+
+
+def test_failed_links_are_yielded_with_their_error(standin):
+    ok, missing = standin.url("/article/storm"), standin.url("/article/missing")
+    results = fetch([ok, missing])
+    assert results[ok] == (canned_text("storm"), None)
+    text, error = results[missing]
+    assert text is None
+    assert error is not None
+
+
+def test_requests_time_out(standin):
+    slow = standin.url("/slow/storm")
+    text, error = fetch([slow], timeout=0.5)[slow]
+    assert text is None
+    assert error is not None
+
+
+def test_requests_to_a_host_are_rate_limited(standin):
+    links = [standin.url(f"/article/{name}") for name in ("election", "storm")] * 2
+    fetch(links, max_workers=4, per_host_rate=10)
+    times = sorted(t for t, _ in standin.requests)
+    assert len(times) == 4
+    # 10 requests per second is one every 0.1s. Single gaps shift with the
+    # jitter of when each request reaches the server, but the span of four
+    # requests holds three intervals
+    assert times[-1] - times[0] >= 3 * 0.1 * 0.9
+
+
+def test_cached_pages_are_not_requested_again(standin, tmp_path):
+    link = standin.url("/article/election")
+    first = fetch([link], cache_dir=str(tmp_path))
+    second = fetch([link], cache_dir=str(tmp_path))
+    assert first == second == {link: (canned_text("election"), None)}
+    assert len(standin.requests) == 1
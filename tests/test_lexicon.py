@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from news.extract import extract_text
+from news.lexicon import LexiconScorer, TOLERANCE
+from news.sentiment import TextBlobScorer
+from tests.standin import PAGES_DIR
+
+
+PROSE = [
+    "Results: (a) were not good at all!",
+    "The launch went well, and the team was happy with it :)",
+    "Oh great, another delay (!) at the very worst time.",
+    "It was good; D: the rest was bad.",
+    "I <3 this city. :-( But the traffic is terrible...",
+    "Mr. Smith said the plan was very good, e.g. for the poor.",
+    "They said: (AP) the results are not really bad, aren't they?",
+    "Don't worry - it's 'not that bad', he said. \"Really great\" work!!",
+    "See `.__main__` and open(path, 'rb').__next__ # a good example",
+    "The U.S. economy grew 2.5% in Q3, a strong result, analysts said.",
+    "Prices rose (sharply) -- a worrying sign;but traders were calm:relieved.",
+    "Not bad...not bad at all! Very, very good. X D and x D or xD.",
+]
+
+
+def pages():
+    return [
+        extract_text(open(f"{PAGES_DIR}/{name}.html", encoding="utf-8").read())
+        for name in ("election", "storm", "webforms")
+    ]
+
+
+@pytest.mark.parametrize("texts", [PROSE, pages()], ids=["prose", "pages"])
+def test_scores_match_textblob(texts):
+    polarity, subjectivity = LexiconScorer().score(texts)
+    expected_polarity, expected_subjectivity = TextBlobScorer().score(texts)
+    assert np.abs(polarity - expected_polarity).max() <= TOLERANCE
+    assert np.abs(subjectivity - expected_subjectivity).max() <= TOLERANCE
+
+
+def test_scores_match_textblob_in_one_batch():
+    # Texts TextBlob scores itself are put back in their place in the batch
+    texts = PROSE + pages() + ["", "good", "bad :("]
+    polarity, _ = LexiconScorer().score(texts)
+    expected, _ = TextBlobScorer().score(texts)
+    assert np.abs(polarity - expected).max() <= TOLERANCE